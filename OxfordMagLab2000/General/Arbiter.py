@@ -0,0 +1,193 @@
+import collections
+import contextlib
+import threading
+import time
+from concurrent import futures
+
+class ISOBUSArbiter:
+    """
+    This class is placed between the Cryostat objects (IPS, ILM and ITC) and the VISA session of the GPIB-to-ISOBUS link they share. Every command is put
+    in the queue of its ISOBUS adress (given by the '@n' prefix of the command, or '' for instruments not linked by ISOBUS) and a single worker thread
+    executes the queued commands one at a time, serving the queues in round robin order and waiting at least the command interval between two commands,
+    as required by the ISOBUS master. Replies are given back to the calling thread, so that all the cryostat components can be polled from different
+    threads without mixing up their replies.
+
+    The arbiter exposes the query, write and read functions of a VISA session, so it can be used by the Cryostat objects as their instrument. All the
+    other attributes (like read_termination or timeout) are those of the shared session. Commands that must not be separated (like a write followed by
+    its read) are sent inside a transaction (see the transaction function).
+
+    The worker thread does not take the lock of the board (see the board_lock function of the Manager class): the commands of the ISOBUS instruments are
+    serialized by the arbiter and by the locks of the Cryostat objects, and each of them is a complete VISA operation adressed to the ISOBUS master, so it
+    can be sent between the commands of the other instruments on the board. Taking the board lock would deadlock every thread that holds it (like inside
+    an atomic function of a Keithley driver or a configuration transaction) and then uses an Oxford driver, since it would wait for a worker that can
+    never acquire the lock.
+    """
+    def __init__(self, session, command_interval = 0.):
+        """
+        This function is used to initialize the arbiter and to start its worker thread.
+
+        Parameters:
+            - session: the VISA session of the GPIB adress shared by the ISOBUS instruments;
+            - command_interval: minimum time (in seconds) between the end of a command and the start of the next one.
+        """
+        object.__setattr__(self, 'session', session)
+        object.__setattr__(self, 'command_interval', command_interval)
+        object.__setattr__(self, 'queues', collections.OrderedDict())
+        object.__setattr__(self, 'condition', threading.Condition())
+        object.__setattr__(self, 'last_command_time', 0.)
+        object.__setattr__(self, 'commands_executed', collections.Counter())
+        object.__setattr__(self, 'running', True)
+        object.__setattr__(self, 'worker', threading.Thread(target = self._worker_, name = 'ISOBUSArbiter-{0}'.format(getattr(session, 'resource_name', '')), daemon = True))
+        self.worker.start()
+
+    def __getattr__(self, name):
+        if name == 'session':
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.session, name, value)
+
+    @staticmethod
+    def _radix_(message):
+        """
+        This function returns the ISOBUS prefix ('@n') of a command, or '' if the command is not ISOBUS adressed.
+
+        Parameters:
+            - message: the command string.
+        """
+        if message[:1] == '@' and message[1:2].isdigit():
+            return message[:2]
+        return ''
+
+    def submit(self, kind, message = None, delay = None):
+        """
+        This function is used to put a command in the queue of its ISOBUS adress, returning a Future that will give the reply of the instrument (or raise
+        the error raised by the session).
+
+        Parameters:
+            - kind: the session function used to execute the command ('query' or 'write'), or 'transaction' to obtain the exclusive use of the session
+                (see the transaction function);
+            - message: the command string (for a transaction, its ISOBUS prefix);
+            - delay: for a query, time (in seconds) waited between the write of the command and the read of the reply.
+        """
+        future = futures.Future()
+        with self.condition:
+            if not self.running:
+                raise RuntimeError('ISOBUS arbiter already closed')
+            radix = self._radix_(message) if message != None else ''
+            if radix not in self.queues:
+                self.queues[radix] = collections.deque()
+            self.queues[radix].append((kind, message, future, delay))
+            self.condition.notify_all()
+        return future
+
+    def query(self, message, delay = None):
+        """
+        This function is used to write a command to the ISOBUS instrument and to read back its reply, waiting for the arbiter to serve it.
+
+        Parameters:
+            - message: the command string;
+            - delay: time (in seconds) waited between the write of the command and the read of the reply (no wait if None).
+        """
+        return self.submit('query', message, delay).result()
+
+    def write(self, message):
+        """
+        This function is used to write a command to the ISOBUS instrument, waiting for the arbiter to serve it.
+
+        Parameters:
+            - message: the command string.
+        """
+        return self.submit('write', message).result()
+
+    def read(self):
+        """
+        This function is used to read a reply from the shared session, waiting for the arbiter to serve it. A read that must follow a given write has to be
+        done together with it in a transaction.
+        """
+        with self.transaction() as session:
+            return session.read()
+
+    @contextlib.contextmanager
+    def transaction(self, radix = ''):
+        """
+        This function is a context manager that gives the exclusive use of the shared session, when the arbiter serves the turn of the given ISOBUS adress:
+        no other command is sent until the context is exited, so that a sequence of commands (like a write and the read of its reply) cannot be mixed with
+        the commands of other threads.
+
+            with arbiter.transaction('@5') as session:
+                session.write('@5R1')
+                reply = session.read()
+
+        Parameters:
+            - radix: the ISOBUS prefix ('@n') of the instrument, or '' for instruments not linked by ISOBUS.
+        """
+        (session, release) = self.submit('transaction', radix).result()
+        try:
+            yield session
+        finally:
+            release.set()
+
+    def _next_command_(self):
+        """
+        This function pops the next command to be executed, taking it from the first non-empty queue and moving that queue at the end of the round robin
+        order. It must be called while holding the condition lock.
+        """
+        for radix in list(self.queues):
+            if self.queues[radix]:
+                command = self.queues[radix].popleft()
+                self.queues.move_to_end(radix)
+                return (radix, command)
+        return None
+
+    def _worker_(self):
+        """
+        This function is executed by the worker thread, serving the queued commands until the arbiter is closed.
+        """
+        while True:
+            with self.condition:
+                next_command = self._next_command_()
+                while next_command == None:
+                    if not self.running:
+                        return
+                    self.condition.wait()
+                    next_command = self._next_command_()
+            (radix, (kind, message, future, delay)) = next_command
+            if not future.set_running_or_notify_cancel():
+                continue
+            wait = self.last_command_time + self.command_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            if kind == 'transaction':
+                release = threading.Event()
+                future.set_result((self.session, release))
+                release.wait()
+            else:
+                try:
+                    if kind == 'query' and delay:
+                        self.session.write(message)
+                        time.sleep(delay)
+                        result = self.session.read()
+                    else:
+                        result = getattr(self.session, kind)(message)
+                except BaseException as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            object.__setattr__(self, 'last_command_time', time.time())
+            self.commands_executed[radix] += 1
+
+    def close(self):
+        """
+        This function is used to stop the worker thread after all the queued commands have been served. It does not close the shared session, which is
+        closed by the manager when its last user releases it.
+        """
+        with self.condition:
+            object.__setattr__(self, 'running', False)
+            self.condition.notify_all()
+        if threading.current_thread() != self.worker:
+            self.worker.join()
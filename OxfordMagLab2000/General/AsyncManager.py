@@ -0,0 +1,188 @@
+import asyncio
+import functools
+import inspect
+import threading
+from concurrent import futures
+from ..General import Manager
+
+class AsyncManager:
+    """
+    This class is an asyncio front-end for the Manager class. Every blocking call (opening a session, a query, a driver function) is dispatched to the
+    executor of the VISA adress of the instrument. Each adress has a single worker thread, so the calls to the same instrument (or to the instruments
+    sharing an ISOBUS master, like the IPS and the ILM) are executed one at a time, while the calls to instruments at different adresses (and the event
+    loop itself) run in parallel. The SCPI drivers still hold the lock of their board for each function, and the commands of the Oxford instruments
+    sharing an ISOBUS master are still sent one at a time by their arbiter (see the Locking.py and Arbiter.py code): the gain comes from the waits
+    between the commands (like the ISOBUS command interval) and from the instruments on different boards or adresses. Readings from several
+    instruments can then be collected with asyncio.gather.
+    """
+    def __init__(self, manager = None, **kwargs):
+        """
+        This function is used to initialize the asynchronous manager.
+
+        Parameters:
+            - manager: an istance of the Manager class. If None, a new Manager is created with the given keyword arguments (backend, discovery_ttl,
+                trust_adress, ISOBUS_command_interval, default_deadline...).
+        """
+        self.manager = manager if manager != None else Manager.Manager(**kwargs)
+        self.executors = {}
+        self.lock = threading.Lock()
+
+    def executor(self, adress):
+        """
+        This function returns the executor of the given adress, creating it the first time.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument.
+        """
+        key = adress.upper() if adress != None else ''
+        with self.lock:
+            if key not in self.executors:
+                self.executors[key] = futures.ThreadPoolExecutor(max_workers = 1, thread_name_prefix = 'AsyncManager-{0}'.format(key))
+            return self.executors[key]
+
+    async def run(self, adress, function, *args, **kwargs):
+        """
+        This function is used to execute a blocking function in the executor of the given adress, awaiting its result.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument;
+            - function: the blocking function to be executed;
+            - args, kwargs: the arguments of the function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor(adress), functools.partial(function, *args, **kwargs))
+
+    async def open_instrument(self, adress):
+        """
+        This function is used to open (or share) the session with the instrument at the given adress, returning an AsyncInstrument.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument.
+        """
+        session = await self.run(adress, self.manager.open_instrument, adress)
+        return AsyncInstrument(self, adress, session)
+
+    async def close_instrument(self, adress):
+        """
+        This function is used to release a session opened with the open_instrument function.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument.
+        """
+        await self.run(adress, self.manager.close_instrument, adress)
+
+    def close(self):
+        """
+        This function is used to stop all the board executors, after the commands already submitted have been executed.
+        """
+        with self.lock:
+            executors = list(self.executors.values())
+            self.executors = {}
+        for executor in executors:
+            executor.shutdown(wait = True)
+
+class AsyncInstrument:
+    """
+    This class wraps a VISA session, giving awaitable query, write and read functions that are executed by the executor of the session board.
+    """
+    def __init__(self, async_manager, adress, session):
+        """
+        Parameters:
+            - async_manager: the AsyncManager that opened the session;
+            - adress: the VISA adress of the session;
+            - session: the VISA session.
+        """
+        self.async_manager = async_manager
+        self.adress = adress
+        self.session = session
+        self.closed = False
+
+    async def query(self, message):
+        return await self.async_manager.run(self.adress, self.session.query, message)
+
+    async def write(self, message):
+        return await self.async_manager.run(self.adress, self.session.write, message)
+
+    async def read(self):
+        return await self.async_manager.run(self.adress, self.session.read)
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        await self.async_manager.close_instrument(self.adress)
+
+class AsyncDriver:
+    """
+    This class is the base of the asynchronous variants of the drivers (AsyncOxfordIPS, AsyncKeithley2400...). It wraps an object of the driver class:
+    all the functions of the driver become awaitable and are executed by the executor of the instrument adress. The properties of the driver (like the
+    lazy readings of the Oxford instruments, that may query the instrument) become awaitable too, and are read in the same executor, while all the
+    other attributes (like the status record) are read directly. The objects must be created with the create function, since the driver initialization
+    talks with the instrument:
+
+        ips = await OxfordIPS.AsyncOxfordIPS.create(async_manager, 'GPIB0::25::INSTR', ISOBUS_master = True)
+        itc = await OxfordITC.AsyncOxfordITC.create(async_manager, 'GPIB0::24::INSTR')
+        await asyncio.gather(ips.get_output_field_reading(), itc.get_sensor_1_temperature_reading())
+        inductance = await ips.magnet_inductance
+
+    Since the IPS and the ITC of the example have different adresses, their two readings run in parallel. Two readings of the IPS and of the ILM
+    linked to it are instead sent one after the other by their ISOBUS arbiter: gather does not make them faster than two awaits, it only leaves the
+    event loop free meanwhile (see the AsyncManager class).
+    """
+    driver_class = None
+
+    def __init__(self, async_manager, adress, driver):
+        """
+        Parameters:
+            - async_manager: an istance of the AsyncManager class;
+            - adress: the VISA adress of the instrument;
+            - driver: the object of the driver class to be wrapped.
+        """
+        self.async_manager = async_manager
+        self.adress = adress
+        self.driver = driver
+
+    @classmethod
+    async def create(cls, async_manager, adress, *args, **kwargs):
+        """
+        This function is used to create the driver object in the executor of the instrument board and to wrap it.
+
+        Parameters:
+            - async_manager: an istance of the AsyncManager class;
+            - adress: the VISA adress of the instrument;
+            - args, kwargs: all the other arguments of the driver class initialization function.
+        """
+        driver = await async_manager.run(adress, cls.driver_class, async_manager.manager, adress, *args, **kwargs)
+        return cls(async_manager, adress, driver)
+
+    def __getattr__(self, name):
+        if name == 'driver':
+            raise AttributeError(name)
+        if inspect.isdatadescriptor(getattr(type(self.driver), name, None)):
+            return self.async_manager.run(self.adress, getattr, self.driver, name)
+        attribute = getattr(self.driver, name)
+        if not callable(attribute) or name == 'instrument':
+            return attribute
+        async def function(*args, **kwargs):
+            return await self.async_manager.run(self.adress, attribute, *args, **kwargs)
+        function.__name__ = name
+        function.__doc__ = attribute.__doc__
+        return function
+
+    async def query(self, message):
+        """
+        This function is used to send a query to the instrument (through its driver session) without blocking the event loop.
+
+        Parameters:
+            - message: the command string.
+        """
+        return await self.async_manager.run(self.adress, self.driver.instrument.query, message)
+
+    async def write(self, message):
+        """
+        This function is used to write a command to the instrument (through its driver session) without blocking the event loop.
+
+        Parameters:
+            - message: the command string.
+        """
+        return await self.async_manager.run(self.adress, self.driver.instrument.write, message)
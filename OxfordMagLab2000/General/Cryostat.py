@@ -1,9 +1,183 @@
-from ..General import Errors
+import abc
+import functools
+import time
+import traceback
+from ..General import Errors, Locking
+
+class LazyReading:
+    """
+    This class is a descriptor used to turn a reading attribute of the Cryostat subclasses (like the magnet_inductance of the IPS) into a lazily fetched,
+    cached value: the first time the attribute is read, its getter function is called to query the instrument, then the cached value is returned until it
+    is overwritten (by the getter or by any assignment) or invalidated with the invalidate_readings function. Live readings (like the output current of
+    the IPS, that changes during the ramps) are not cached: their getter is called every time the attribute is read.
+    """
+    def __init__(self, getter, live = False):
+        """
+        Parameters:
+            - getter: the name of the function that queries the instrument and stores the reading in the attribute;
+            - live: if set to True, the instrument is queried every time the attribute is read.
+        """
+        self.getter = getter
+        self.live = live
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance == None:
+            return self
+        if self.live or self.name not in instance.__dict__:
+            getattr(instance, self.getter)()
+        return instance.__dict__.get(self.name)
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+    def __delete__(self, instance):
+        instance.__dict__.pop(self.name, None)
+
+class StatusRecord(abc.ABC):
+    """
+    This class is the base of the status records of the Oxford instruments (see the IPSStatus, ILMStatus and ITCStatus classes): compact, immutable
+    objects holding the fields of a status string (as returned by the X command) decoded with integer operations. The subclasses list their fields in
+    __slots__, decode them in the _fields_ function and render the text for the user in the _render_ function, which is only called (once) when the text
+    attribute is read or the record is converted to a string. Records are created by the decode function, which caches them per status string: a polling
+    loop that receives the same status many times decodes it only once.
+    """
+    __slots__ = ('raw', '_text_')
+    instrument = ''
+    value_names = {}
+
+    def __init__(self, raw, *values):
+        """
+        Parameters:
+            - raw: the status string;
+            - values: the values of the fields of the record, in the order of __slots__.
+        """
+        object.__setattr__(self, 'raw', raw)
+        object.__setattr__(self, '_text_', None)
+        for (name, value) in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def decode(cls, raw):
+        """
+        This function returns the record of the given status string (the same object for equal strings).
+
+        Parameters:
+            - raw: the status string.
+        """
+        return _decode_record_(cls, raw)
+
+    @classmethod
+    @abc.abstractmethod
+    def _fields_(cls, raw):
+        """
+        This function returns the values of the fields of the record (in the order of __slots__) decoded from the given status string.
+
+        Parameters:
+            - raw: the status string.
+        """
+
+    @abc.abstractmethod
+    def _render_(self):
+        """
+        This function returns the text of the status, as a message that can be understood by users.
+        """
+
+    def changes(self, previous):
+        """
+        This function returns the list of the fields that differ from the given previous record, as (field, previous value, value) tuples.
+
+        Parameters:
+            - previous: the previous status record of the same instrument.
+        """
+        return [(name, getattr(previous, name), getattr(self, name)) for name in self.__slots__ if getattr(previous, name) != getattr(self, name)]
+
+    @classmethod
+    def value_name(cls, field, value):
+        """
+        This function returns the name of the given value of a field (like 'at rest' for the value 0 of the sweeping field of the IPS), or the value
+        itself if it has no name.
+        """
+        return cls.value_names.get(field, {}).get(value, value)
+
+    @property
+    def text(self):
+        """
+        The status as a message that can be understood by users.
+        """
+        if self._text_ == None:
+            object.__setattr__(self, '_text_', self._render_())
+        return self._text_
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} objects are immutable'.format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{0} objects are immutable'.format(type(self).__name__))
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.raw == other.raw
+
+    def __hash__(self):
+        return hash((type(self), self.raw))
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return '{0}({1})'.format(type(self).__name__, ', '.join('{0}={1!r}'.format(name, getattr(self, name)) for name in self.__slots__))
+
+@functools.lru_cache(maxsize = 1024)
+def _decode_record_(record_class, raw):
+    return record_class(raw, *record_class._fields_(raw))
+
+class StatusChange:
+    """
+    This class is the event given to the status subscribers of an Oxford instrument (see the subscribe function of the Cryostat class) when a field of
+    its status changes, like the sweeping field of the IPS going from 'sweeping' to 'at rest'.
+    """
+    __slots__ = ('source', 'field', 'previous', 'current', 'status', 'time')
+
+    def __init__(self, source, field, previous, current, status, event_time):
+        """
+        Parameters:
+            - source: the driver of the instrument;
+            - field: the name of the changed field;
+            - previous, current: the previous and the new value of the field;
+            - status: the new status record;
+            - event_time: the time at which the new status has been received.
+        """
+        self.source = source
+        self.field = field
+        self.previous = previous
+        self.current = current
+        self.status = status
+        self.time = event_time
+
+    def __str__(self):
+        return '{0} {1}: {2} -> {3}'.format(self.status.instrument, self.field.replace('_', ' '), self.status.value_name(self.field, self.previous), self.status.value_name(self.field, self.current))
+
+    def __repr__(self):
+        return 'StatusChange({0!r}, {1!r}, {2!r})'.format(self.field, self.previous, self.current)
 
 class Cryostat():
     """
     This class is a wrapper of functions common to all the components of the Oxford MagLab2000 system in use at INRiM.
+
+    All the functions of this class and of its subclasses are atomic (see the Locking.py code), except the ones listed in the unlocked_functions
+    attribute of the subclasses: each of them is executed holding the lock of the instrument (see the instrument_lock function of the Manager class).
+    The board is never locked: the single commands are serialized by the ISOBUS arbiter that sends them, so that the IPS, the ILM and the ITC can be
+    used at the same time from different threads, also by a thread that holds the lock of the board (like inside an atomic function of a Keithley
+    driver).
     """
+    unlocked_functions = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Locking.lock_functions(cls, cls.unlocked_functions)
+
     def __init__(self, manager_int, GPIB_adress_int = None, read_terminator_int = 'CR', write_terminator_int = 'CR', ISOBUS_master_int = False, ISOBUS_linked_int = False, ISOBUS_adress_int = None):
         """
         This function is used to initialize an object corresponding to one of the Oxford MagLab2000 components.
@@ -30,13 +204,16 @@ class Cryostat():
         except Errors.InvalidManagerError as error:
             error.error_handler()
             raise
-        self.instrument = self.manager.open_instrument(GPIB_adress_int)
+        self.adress = GPIB_adress_int
+        self.instrument = self.manager.open_ISOBUS_instrument(self.adress)
+        self.closed = False
         if ISOBUS_master_int:
             self.buffer_radix = '@0'
         elif ISOBUS_linked_int:
             self.buffer_radix = '@{0:G}'.format(ISOBUS_adress_int)
         else:
             self.buffer_radix = ''
+        self.lock = self.manager.instrument_lock(self.adress, self.buffer_radix)
         try:
             if read_terminator_int == 'CR' or read_terminator_int == 'CRLF':
                 self.instrument.read_termination = '\r'
@@ -55,9 +232,75 @@ class Cryostat():
             raise
         self.identity = None
         self.last_queried_status = None
-        self.last_decodified_status = None
+        self.status = None
+        self.status_subscribers = []
         self.last_RAM_dump = None
         
+    @property
+    def last_decodified_status(self):
+        """
+        The last queried status as a message that can be understood by users, rendered only when it is read (see the StatusRecord class).
+        """
+        return self.status.text if self.status != None else None
+
+    def subscribe(self, callback, fields = None):
+        """
+        This function is used to register a function that is called with a StatusChange event every time a field of the instrument status changes (as seen
+        by the get_status function). Callbacks are called by the thread that queried the status, holding the lock of this instrument (see the
+        instrument_lock function of the Manager class), so they must be quick and they must not use other drivers: waiting for the lock of another
+        instrument while this one is held can deadlock with a thread doing the opposite. Their errors are printed and do not stop the driver. The function
+        returns the callback, so that it can be used as a decorator.
+
+        Parameters:
+            - callback: the function to be called;
+            - fields: names of the status fields whose changes must be notified (all the fields if None).
+        """
+        self.status_subscribers.append((callback, None if fields == None else frozenset(fields)))
+        return callback
+
+    def unsubscribe(self, callback):
+        """
+        This function is used to remove a function registered with the subscribe function.
+        """
+        self.status_subscribers = [subscriber for subscriber in self.status_subscribers if subscriber[0] != callback]
+
+    def _update_status_(self, raw, record_class):
+        """
+        This function is used by the status decoders of the drivers to update the status record. If the status string is equal to the previous one the
+        previous record is kept, otherwise the new record is decoded and the changes of its fields are notified to the subscribers.
+
+        Parameters:
+            - raw: the status string;
+            - record_class: the status record class of the instrument.
+        """
+        previous = self.status
+        if previous != None and previous.raw == raw:
+            return
+        self.status = record_class.decode(raw)
+        if previous != None and type(previous) == record_class and self.status_subscribers:
+            event_time = time.time()
+            for (field, previous_value, value) in self.status.changes(previous):
+                event = StatusChange(self, field, previous_value, value, self.status, event_time)
+                for (callback, fields) in list(self.status_subscribers):
+                    if fields == None or field in fields:
+                        try:
+                            callback(event)
+                        except Exception:
+                            traceback.print_exc()
+
+    def invalidate_readings(self, *names):
+        """
+        This function is used to discard the cached value of some lazy readings (see the LazyReading class), so that they will be queried again the next
+        time they are read.
+
+        Parameters:
+            - names: the names of the readings to be invalidated. If no name is given, all the lazy readings are invalidated.
+        """
+        if names == ():
+            names = [name for name in dir(type(self)) if isinstance(getattr(type(self), name, None), LazyReading)]
+        for name in names:
+            self.__dict__.pop(name, None)
+
     """
     Oxford MagLab 2000 instruments common commands.
     
@@ -168,7 +411,9 @@ class Cryostat():
 
     def get_status_string(self):
         """
-        This function is used to get the current Oxford Instrument status from the instrument.
+        This function is used to get the current Oxford Instrument status from the instrument. The status string is decoded by the _status_decoder_
+        function of the drivers (see the _update_status_ function), which keeps the previous status record if the string has not changed and notifies the
+        changes to the subscribers otherwise (see the subscribe function).
         """
         try:
             self.last_queried_status = self.instrument.query(self.buffer_radix +'X')
@@ -179,6 +424,7 @@ class Cryostat():
                     raise Errors.PSNotResponding
                 elif 'ITC' in self.identity:
                     raise Errors.TCNotResponding
+            self._status_decoder_(self.last_queried_status)
         except (Errors.LMNotResponding, Errors.PSNotResponding, Errors.TCNotResponding) as error:
             error.error_handler()
             raise
@@ -251,5 +497,10 @@ class Cryostat():
     These commands are supplied in order to give the user a simpler way to make something in the scripts, by combining more commands in one function.
     """
     def _general_close_(self):
+        if self.closed:
+            return
         self.set_control_mode(False, False)
-        self.instrument.close()
\ No newline at end of file
+        self.closed = True
+        self.manager.close_instrument(self.adress)
+
+Locking.lock_functions(Cryostat)
@@ -65,6 +65,41 @@ class InstrumentNotAvailableError(ManagerErrors):
         self.name = 'INSTRUMENT_NOT_AVAILABLE_ERROR'
         self.message = 'ERROR: The given adress does not correspond to any instrument available to the manager, even after refreshing.\nPlease check the links between string = self.instrument.query and computer and try again to initialize the manager.\nExecution aborted'
 
+class ReplayMismatchError(ManagerErrors):
+    """
+    This error is raised by a replay session when the command sent by a driver does not match the next command stored in the trace file for that adress.
+    """
+    def __init__(self, adress, expected, received):
+        self.code = 'MANAGERERROR4'
+        self.name = 'REPLAY_MISMATCH_ERROR'
+        self.message = 'ERROR: The command {0!r} sent to {1} does not match the recorded command {2!r}.\nThe driver behaviour differs from the recorded session.'.format(received, adress, expected)
+
+class InstrumentTimeoutError(ManagerErrors):
+    """
+    This error is raised by a deadline session (see the Transport.py code) when a command has not been answered within its deadline, even after a device
+    clear and the given number of retries. It is recoverable: the session has already been cleared, so the caller can handle it (for example skipping
+    the point of a measurement) and go on using the instrument.
+    """
+    def __init__(self, adress, command, deadline):
+        self.code = 'MANAGERERROR5'
+        self.name = 'INSTRUMENT_TIMEOUT_ERROR'
+        self.message = 'ERROR: The command {0!r} sent to {1} has not been answered within its deadline of {2:g} s.\nThe session has been cleared.'.format(command, adress, deadline)
+        self.adress = adress
+        self.command = command
+        self.deadline = deadline
+
+class DataWriterError(ManagerErrors):
+    """
+    This error is raised by a data writer (see the Writers.py code) when its background thread could not write the readings in the data file. The readings
+    given to the writer after the error are discarded.
+    """
+    def __init__(self, filename, error):
+        self.code = 'MANAGERERROR6'
+        self.name = 'DATA_WRITER_ERROR'
+        self.message = 'ERROR: The readings could not be written in the data file {0}:\n{1!r}'.format(filename, error)
+        self.filename = filename
+        self.error = error
+
 class CryostatErrors(Errors):
     """
     This class, that inherits Errors in order to become an error handling class, is used in order to catch all the exceptions generated by the Cryostat class.
@@ -240,6 +275,25 @@ class PSWrongFieldSweepRate(PowerSupplyErrors):
         self.code = 'IPSERROR4'
         self.name = 'IPS_WRONG_FIELD_SWEEP_RATE'
         self.message = 'ERROR: Supplied field sweep rate ({0:G} T per minute) is out of the available range (up to 1.2 T per minute).'
+
+class PSRampTimeout(PowerSupplyErrors):
+    """
+    This error will be rised when the Intelligent Power Supply is still sweeping after the maximum waiting time given to the wait_for_ramp function.
+    """
+    def __init__(self, timeout):
+        self.code = 'IPSERROR5'
+        self.name = 'IPS_RAMP_TIMEOUT'
+        self.message = 'ERROR: The IPS is still sweeping after {0:G} seconds.'.format(timeout)
+
+class PSSwitchHeaterNotSettled(PowerSupplyErrors):
+    """
+    This error will be rised when the status and the heater current of the Intelligent Power Supply do not confirm the state requested for the switch
+    heater within the settle timeout of the calibration profile of the magnet switch.
+    """
+    def __init__(self, opened, timeout):
+        self.code = 'IPSERROR6'
+        self.name = 'IPS_SWITCH_HEATER_NOT_SETTLED'
+        self.message = 'ERROR: The switch heater is not {0} after {1:G} seconds.'.format('on' if opened else 'off', timeout)
         
 class TemperatureControllerErrors(CryostatErrors):
     """
@@ -399,6 +453,21 @@ class ReportInstrumentInternalError(InstrumentsErrors):
         self.error_number = error_number
         self.error_message = error_message
 
+class ConfigurationTransactionError(InstrumentsErrors):
+    """
+    This error will be raised at the end of a configuration transaction (see the transaction function of the Instruments class) when the adressed
+        instrument reports one or more errors. Each error is reported together with the transaction or the configuration function that caused it.
+
+    Initialization parameters:
+        - errors = list of tuples (function name, error number, error message); the function name is the one of the whole transaction unless the
+            debug_transactions attribute of the instrument is True.
+    """
+    def __init__(self, errors):
+        self.code = 'INSTRUMENTERROR7'
+        self.name = 'CONFIGURATION_TRANSACTION_ERROR'
+        self.message = 'ERROR: The instrument reports the following errors at the end of the configuration transaction:\n' + '\n'.join('{0}: {1}, {2}'.format(*error) for error in errors)
+        self.errors = errors
+
 class Lakeshore340Errors(Errors):
     """
     This class, that inherits Errors in order to become an error handling class, is only a container for the errors that can be raised only in the
@@ -1,10 +1,33 @@
-from ..General import Errors
+import contextlib
+import time
+from ..General import Errors, Locking, Writers
 
 class Instruments:
+    """
+    All the functions of this class and of its subclasses are atomic (see the Locking.py code): each of them is executed holding the lock of the board to
+    which the instrument is connected, so that drivers can be shared between threads and instruments on different boards can be used in parallel. The
+    long acquisition functions of the subclasses are listed in their unlocked_functions attribute: they are not atomic as a whole, but each of their steps
+    (like a single ':READ?' and its output switching) is, so that the other instruments on the board can be used during the acquisition.
+    """
+    unlocked_functions = ()
+    max_message_length = 1024
+    use_shadow_registers = True
+    shadow_settings = ()
+    shadow_indexed_headers = ()
+    shadow_coupled = ()
+    shadow_resets = ('*RST', 'SYST:PRES')
+    data_flush_interval = 1.
+    debug_transactions = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Locking.lock_functions(cls, cls.unlocked_functions)
+
     def __init__(self, manager_int, adress_int, read_terminator_int = None, write_terminator_int = 'CRLF', end_or_identify_int = True):
         """
         This function is used to initialize an object corresponding to an SCPI-compliant instrument for use with PyVISA. It defines instrument's manager
-            and adress, opens the link between controlling computer and instrument, sets the instrument timeout to infinite and then request the
+            and adress, opens the link between controlling computer and instrument, sets the instrument timeout to the default deadline of the manager
+            (infinite if the manager does not use deadlines, see the Transport.DeadlineSession class) and then request the
             instrument's identity and creates an object propriety, called last_error, in which controller can store last answer to an error query given
             by the instrument.
         
@@ -25,7 +48,9 @@ class Instruments:
         except Errors.InvalidManagerError as error:
             error.error_handler()
         self.adress = adress_int
+        self.lock = self.manager.board_lock(self.adress)
         self.instrument = self.manager.open_instrument(self.adress)
+        self.closed = False
         try:
             if read_terminator_int == None:
                 self.instrument.read_terminator = ''
@@ -57,10 +82,14 @@ class Instruments:
         except Errors.InvalidWriteTerminatorError as error:
             error.error_handler()
         self.instrument.send_end = end_or_identify_int;
-        self.timeout = None
+        self.timeout = None if getattr(self.manager, 'default_deadline', None) == None else 1000. * self.manager.default_deadline
         self.instrument.timeout = self.timeout
         self.identity = self._identification_query_()
         self.last_internal_error = None
+        self.transaction_depth = 0
+        self.transaction_writes = []
+        self.transaction_callbacks = []
+        self.shadow_registers = {}
         
     """
     Common RS232/IEEE488(GPIB) commands
@@ -139,12 +168,14 @@ class Instruments:
         Parameters:
             - save_position = integer number indicating the configuration saving position in the internal memory.
         """
+        self.invalidate_shadow()
         self.instrument.write('*RCL {0:d}'.format(save_position))
         
     def _reset_command_(self):
         """
         This function is used to reset the adressed instrument to default conditions.
         """
+        self.invalidate_shadow()
         self.instrument.write('*RST')
         
     def _save_command_(self, save_position):
@@ -201,11 +232,266 @@ class Instruments:
         """
         self.instrument.write('*WAI')
         
+    def _configure_(self, buffer, function, operation_complete = True, committed = None):
+        """
+        This function is used by the configuration functions to send their buffer to the adressed instrument. Outside of a transaction the buffer is
+            written and followed by an operation complete query and an error query; inside a transaction (see the transaction function) it is only
+            stored, and sent when the transaction ends.
+
+        Parameters:
+            - buffer = the configuration commands string;
+            - function = name of the configuration function that sends the buffer, used to report the errors it causes;
+            - operation_complete = boolean parameter that enables (true) the operation complete query after the write;
+            - committed = function without arguments called once the instrument holds the settings of the buffer (right after the write outside of a
+                transaction, when the transaction is committed inside it, never if the write or the transaction fails). It is used to update the
+                attributes that mirror the settings, like the data format used to decode the readings.
+
+        Settings already held by the instrument (see the _shadow_write_ function) are removed from the buffer: if nothing is left, neither the write nor
+            the queries are sent.
+        """
+        with self._shadow_write_(buffer) as buffer:
+            if buffer == '':
+                pass
+            elif self.transaction_depth:
+                self.transaction_writes.append((function, buffer))
+            else:
+                self.instrument.write(buffer)
+                if operation_complete:
+                    self._operation_complete_query_()
+                self._error_query_()
+        if committed != None:
+            if self.transaction_depth:
+                self.transaction_callbacks.append(committed)
+            else:
+                committed()
+
+    def _shadow_commands_(self, buffer):
+        """
+        This function is used to split a buffer into its commands, returning a list of tuples (key, value, command). The key is the command header
+            (followed by its first argument for the headers listed in shadow_indexed_headers, like the input of the Lakeshore 340 commands) and the value
+            is the rest of the command. Commands without arguments are actions (like ':SYST:TIME:RES') and have None as key, unless they are listed in
+            shadow_settings.
+
+        Parameters:
+            - buffer = the commands string.
+        """
+        commands = []
+        for command in buffer.split(';'):
+            command = command.strip()
+            if command == '':
+                continue
+            (header, separator, value) = command.partition(' ')
+            header = header.lstrip(':').upper()
+            value = value.strip()
+            if header in self.shadow_indexed_headers:
+                (index, separator, value) = value.partition(',')
+                header += ' ' + index.strip()
+                value = value.strip()
+            elif value == '' and header not in self.shadow_settings:
+                header = None
+            commands.append((header, value, command))
+        return commands
+
+    def _shadow_filter_(self, buffer):
+        """
+        This function is used to compare a configuration buffer with the shadow registers, the mirror of the last settings written to the adressed
+            instrument. It returns a tuple (buffer, registers): the buffer is an empty string if the instrument already holds all its settings (so that
+            the write and its checks can be skipped), otherwise the buffer without the commands whose value is already held, and registers is the mirror
+            as it will be after the buffer is written. The mirror itself is not changed (see the _shadow_write_ function). Writing a setting forgets the
+            settings whose header contains it or is contained in it (like ':SOUR:VOLT:RANG' and ':SOUR:VOLT:RANG:AUTO'), unless they are set by the same
+            buffer, since the instrument can change them as a side effect; the headers grouped in shadow_coupled (like the NPLCs of the Keithley 2400
+            functions) are set together, and the commands in shadow_resets forget all the mirror.
+
+        Parameters:
+            - buffer = the configuration commands string.
+        """
+        registers = dict(self.shadow_registers)
+        if not self.use_shadow_registers:
+            return (buffer, registers)
+        commands = self._shadow_commands_(buffer)
+        final = {}
+        for (key, value, command) in commands:
+            final[key] = value
+        if None not in final and all(registers.get(key) == value for (key, value) in final.items()):
+            return ('', registers)
+        sent = []
+        for (key, value, command) in commands:
+            if key == None:
+                sent.append(command)
+                if command.lstrip(':').upper() in self.shadow_resets:
+                    registers.clear()
+                continue
+            if registers.get(key) != value:
+                sent.append(command)
+            registers[key] = value
+            for other in list(registers):
+                if other not in final and (other.startswith(key + ':') or key.startswith(other + ':')):
+                    del registers[other]
+            for group in self.shadow_coupled:
+                if key in group:
+                    for other in group:
+                        registers[other] = value
+        return (';'.join(sent) + (';' if buffer.rstrip()[-1:] == ';' else ''), registers)
+
+    @contextlib.contextmanager
+    def _shadow_write_(self, buffer):
+        """
+        This function returns a context manager used to write a configuration buffer keeping the shadow registers consistent with the adressed
+            instrument. It yields the buffer filtered by the _shadow_filter_ function (an empty string if nothing has to be written) and updates the
+            mirror only when the block ends without errors: if the write or its checks fail, the whole mirror is forgotten, since the instrument state
+            is no longer known.
+
+            with self._shadow_write_(buffer) as buffer:
+                if buffer:
+                    self.instrument.write(buffer)
+
+        Parameters:
+            - buffer = the configuration commands string.
+        """
+        (buffer, registers) = self._shadow_filter_(buffer)
+        try:
+            yield buffer
+        except BaseException:
+            self.invalidate_shadow()
+            raise
+        self.shadow_registers = registers
+
+    def invalidate_shadow(self):
+        """
+        This function is used to forget the shadow registers, so that the next configuration functions write all their settings again. It must be called
+            when the instrument settings are changed outside of its driver (like from the front panel).
+        """
+        self.shadow_registers.clear()
+
+    def _drain_error_queue_(self, max_errors = 100):
+        """
+        This function is used to read all the errors stored in the error queue of the adressed instrument, returning them as a list of tuples (error
+            number, error message).
+
+        Parameters:
+            - max_errors = maximum number of error queries sent.
+        """
+        errors = []
+        for i in range(max_errors):
+            error_query = self.instrument.query(':SYST:ERR?').strip().split(',', 1)
+            if int(error_query[0]) == 0:
+                break
+            errors.append((error_query[0], error_query[1].strip('"') if len(error_query) > 1 else ''))
+        return errors
+
+    def _join_buffers_(self, buffers):
+        """
+        This function is used to concatenate configuration buffers into as few messages as possible, each one shorter than max_message_length characters.
+
+        Parameters:
+            - buffers = list of the configuration commands strings.
+        """
+        messages = ['']
+        for buffer in buffers:
+            if buffer[-1:] != ';':
+                buffer += ';'
+            if messages[-1] and len(messages[-1]) + len(buffer) > self.max_message_length:
+                messages.append('')
+            messages[-1] += buffer
+        return [message for message in messages if message]
+
+    def _commit_transaction_(self):
+        """
+        This function is used to send the configuration buffers stored during a transaction, followed by a single operation complete query and by the
+            draining of the error queue; then the committed functions given to the _configure_ function are called. If the instrument reports errors,
+            they are attributed to the transaction as a whole (listing its configuration functions) and the committed functions are not called. Only when debug_transactions is True the buffers are sent again one at a time, each followed by its own error query, in order to
+            find out which configuration functions caused them: this sends every command twice, so it must be used only while developing a measurement
+            script (some commands, like the ones starting an acquisition or changing a source output, are not harmless when repeated).
+        """
+        writes = self.transaction_writes
+        callbacks = self.transaction_callbacks
+        self.transaction_writes = []
+        self.transaction_callbacks = []
+        if not writes:
+            for callback in callbacks:
+                callback()
+            return
+        try:
+            for message in self._join_buffers_([buffer for (function, buffer) in writes]):
+                self.instrument.write(message)
+            self._operation_complete_query_()
+            errors = self._drain_error_queue_()
+            if errors:
+                failures = []
+                if self.debug_transactions:
+                    for (function, buffer) in writes:
+                        self.instrument.write(buffer)
+                        self._operation_complete_query_()
+                        failures += [(function,) + error for error in self._drain_error_queue_()]
+                if not failures:
+                    functions = 'transaction ({0})'.format(', '.join(function for (function, buffer) in writes))
+                    failures = [(functions,) + error for error in errors]
+                self.last_internal_error = list(failures[-1][1:])
+                raise Errors.ConfigurationTransactionError(failures)
+        except Errors.ConfigurationTransactionError as error:
+            error.error_handler()
+            raise
+        for callback in callbacks:
+            callback()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        This function returns a context manager used to group configuration functions. Inside the transaction the configuration buffers are not sent
+            immediately: when the transaction ends they are concatenated into as few messages as possible, followed by a single operation complete query
+            and by the draining of the error queue, instead of two extra queries for each configuration function. The errors reported by the instrument
+            are reported for the whole transaction, or mapped back to the configuration functions that caused them when debug_transactions is True (see
+            the _commit_transaction_ function). The board lock is held for the whole transaction, and transactions can be
+            nested (buffers are sent when the outermost one ends). If the block raises an exception, the stored buffers are discarded, the shadow
+            registers are forgotten and the attributes that mirror the settings are left unchanged (see the committed parameter of the _configure_
+            function).
+
+            with k2400.transaction():
+                k2400.arm_configuration(count = 10)
+                k2400.trigger_configuration(count = 100)
+                k2400.voltage_sense_configuration(NPLCs = 1)
+        """
+        with self.lock:
+            self.transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.transaction_depth -= 1
+                if not self.transaction_depth:
+                    self.transaction_writes = []
+                    self.transaction_callbacks = []
+                    self.invalidate_shadow()
+                raise
+            self.transaction_depth -= 1
+            if not self.transaction_depth:
+                try:
+                    self._commit_transaction_()
+                except BaseException:
+                    self.invalidate_shadow()
+                    raise
+
+    def _open_writer_(self, filename, **metadata):
+        """
+        This function is used by the acquisition functions to open the data writer of the given file (see the Writers.py code, the format is chosen from
+            the extension), whose metadata are the given ones together with the identity and the adress of the instrument and the date of the measurement.
+
+        Parameters:
+            - filename = string giving the complete path of the data file.
+            - metadata = description of the measurement (sample, mode, T, H...).
+        """
+        description = {'instrument': self.identity.strip(), 'adress': self.adress, 'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+        description.update(metadata)
+        return Writers.open_writer(filename, description, self.data_flush_interval)
+
     def close(self):
         """
-        This function is used to close the instrument link with the controlling computer.
+        This function is used to close the instrument link with the controlling computer. The link is shared with all the objects opened at the same
+        adress, so it is really closed only when the last of them is closed. Closing an object more than once has no effect.
         """
-        self.instrument.close()
+        if self.closed:
+            return
+        self.closed = True
+        self.manager.close_instrument(self.adress)
         
     def type_dictionary(self, keys, buffers):
         """
@@ -224,4 +510,6 @@ class Instruments:
                 raise Errors.InvalidTypeDictionaryError
         except Errors.InvalidTypeDictionaryError as error:
             error.error_handler()
-            raise
\ No newline at end of file
+            raise
+
+Locking.lock_functions(Instruments)
@@ -0,0 +1,60 @@
+import functools
+import inspect
+
+def atomic(function):
+    """
+    This function is a decorator used to make a driver function atomic: the whole function (that is, the whole sequence of commands it sends to the
+    instrument) is executed holding the lock of the board (GPIB0, GPIB1, ASRL1...) to which the instrument is connected. Board locks are reentrant, so
+    atomic functions can call each other.
+
+    Generator functions (like the iter_* acquisition functions of the drivers) are atomic step by step: the lock is held while the generator runs up to
+    its next yield, and released while the consumer handles the yielded data, so that the other instruments on the board can be used meanwhile.
+
+    Parameters:
+        - function: the driver function to be decorated. Its first argument must be an object with a lock attribute.
+    """
+    if inspect.isgeneratorfunction(function):
+        @functools.wraps(function)
+        def atomic_generator(self, *args, **kwargs):
+            lock = getattr(self, 'lock', None)
+            generator = function(self, *args, **kwargs)
+            if lock == None:
+                return (yield from generator)
+            value = None
+            try:
+                while True:
+                    with lock:
+                        try:
+                            item = generator.send(value)
+                        except StopIteration as stop:
+                            return stop.value
+                    value = yield item
+            finally:
+                with lock:
+                    generator.close()
+        atomic_generator.atomic = True
+        return atomic_generator
+    @functools.wraps(function)
+    def atomic_function(self, *args, **kwargs):
+        lock = getattr(self, 'lock', None)
+        if lock == None:
+            return function(self, *args, **kwargs)
+        with lock:
+            return function(self, *args, **kwargs)
+    atomic_function.atomic = True
+    return atomic_function
+
+def lock_functions(cls, unlocked_functions = ()):
+    """
+    This function makes atomic all the functions defined in the given class, except the special (double underscore) ones and the ones listed in
+    unlocked_functions. These are functions that wait for a long time (like the magnet ramps of the IPS) and must leave the board to the other
+    instruments while waiting: the commands they send are still atomic, since they are sent through atomic functions.
+
+    Parameters:
+        - cls: the driver class;
+        - unlocked_functions: names of the functions that must not be made atomic.
+    """
+    for name, value in list(vars(cls).items()):
+        if inspect.isfunction(value) and not (name.startswith('__') and name.endswith('__')) and name not in unlocked_functions and not getattr(value, 'atomic', False):
+            setattr(cls, name, atomic(value))
+    return cls
@@ -1,49 +1,156 @@
+import threading
+import time
 import pyvisa as visa
-from ..General import Errors
+from ..General import Arbiter, Errors, Recorder, Transport
 
 class Manager:
     """
     This class is used to provide users with access to PyVisa resource management functions. It also implements a number of functions used to automate
     the manager refreshing process, in order to deal swiftly with new instruments and tools added after the first initialization. 
     """
-    def __init__(self):
+    def __init__(self, backend = None, discovery_ttl = 60., trust_adress = False, ISOBUS_command_interval = 0.01, instrumentation = None, recorder = None, default_deadline = None, command_retries = 1, watchdog_interval = 0.5):
         """
         Manager initialization function. It uses methods imported by the PyVISA (version > 1.8) package in order to create an object capable to manage the
         tools interfaced with the PC via IEEE standard interfaces, like GPIB (IEEE 488.1/.2 standards) and RS232 (EIA-RS232). It tries to open a 
         PyVisa.ResourceManager object and then, if succesfull, attempts to create a list of resources available to this Manager.
+
+        Parameters:
+            - backend: an object exposing the PyVISA ResourceManager interface (list_resources and open_resource functions), used instead of the
+                PyVISA ResourceManager. It is used to run all the drivers against the simulated instruments (see the SimulatedResourceManager class in the
+                Simulator.py code).
+            - discovery_ttl: time (in seconds) during which the list of resources found on an interface (GPIB0, GPIB1, ASRL1...) is trusted without scanning
+                the interface again. If None, the list never expires and the interfaces are scanned again only when an adress is not found;
+            - trust_adress: if true, the manager does not scan the interfaces during the initialization and opens the instruments directly at the given
+                adress, scanning their interface only if the opening fails;
+            - ISOBUS_command_interval: minimum time (in seconds) between two commands sent through the same ISOBUS arbiter;
+            - instrumentation: an istance of the Transport.Instrumentation class. If given, every session opened by the manager records the latency, the
+                mnemonic and the size of each command exchanged with the instrument (see the Transport.py code);
+            - recorder: an istance of the Recorder.SessionRecorder class. If given, every command exchanged with the instruments is written, with its
+                reply and timing, in a trace file that can be replayed with the Recorder.ReplayResourceManager backend;
+            - default_deadline: deadline (in seconds) of the commands for which neither the Transport.py code nor the drivers define a specific one. Every
+                session opened by the manager is wrapped in a Transport.DeadlineSession, that clears the session and raises a recoverable
+                InstrumentTimeoutError when a command misses its deadline. If None (the default), deadlines are not used: sessions are not wrapped, keep
+                the timeout set by the drivers and no watchdog is started;
+            - command_retries: number of times a read-only query that missed its deadline is sent again (after a device clear) before raising the error
+                (see the Transport.is_read_only function);
+            - watchdog_interval: time (in seconds) between two checks of the watchdog, that clears the sessions whose commands hang beyond their
+                deadline. If None, no watchdog is used.
         """
         try:
-            if float(visa.__version__[:3]) < 1.8:
+            if backend != None:
+                self.manager = backend
+            elif float(visa.__version__[:3]) < 1.8:
                 raise Errors.ManagerInitializationError
             else:
                 self.manager = visa.ResourceManager()
         except Errors.ManagerInitializationError as error:
             error.error_handler()
-        try:
-            self.resources = self.manager.list_resources()
-            if self.resources == ():
-                self._refresh_resources_()
-        except Errors.VoidManagerError as error:
-            error.error_handler()
+        self.discovery_ttl = discovery_ttl
+        self.trust_adress = trust_adress
+        self.discovered_resources = {}
+        self.resources = ()
+        self.sessions = {}
+        self.session_references = {}
+        self.arbiters = {}
+        self.board_locks = {}
+        self.instrument_locks = {}
+        self.lock = threading.RLock()
+        self.ISOBUS_command_interval = ISOBUS_command_interval
+        self.instrumentation = instrumentation
+        self.recorder = recorder
+        self.default_deadline = default_deadline
+        self.command_retries = command_retries
+        self.watchdog = Transport.Watchdog(watchdog_interval) if default_deadline != None and watchdog_interval != None else None
+        if not trust_adress:
+            try:
+                self._scan_resources_()
+                if self.resources == ():
+                    self._refresh_resources_()
+            except Errors.VoidManagerError as error:
+                error.error_handler()
+
+    @staticmethod
+    def _interface_(adress):
+        """
+        This function returns the interface (board) part of a VISA adress, like GPIB0 for GPIB0::24::INSTR or ASRL1 for ASRL1::INSTR.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument.
+        """
+        return adress.split('::')[0].upper()
+
+    def _scan_resources_(self, interface = None):
+        """
+        This function performs a bus enumeration (a list_resources call) of a single interface, or of all the interfaces if interface is None, storing
+        the resources found with the time of the scan. The resources attribute is then rebuilt joining the resources of all the scanned interfaces.
+
+        Parameters:
+            - interface: the interface to be scanned (like GPIB0 or ASRL1), or None to scan all of them.
+        """
+        now = time.time()
+        if interface == None:
+            found = self.manager.list_resources()
+            self.discovered_resources = {}
+        else:
+            found = self.manager.list_resources(interface + '::?*')
+            self.discovered_resources[interface] = (now, ())
+        for adress in found:
+            (timestamp, resources) = self.discovered_resources.get(self._interface_(adress), (now, ()))
+            self.discovered_resources[self._interface_(adress)] = (now, resources + (adress,))
+        self.resources = tuple(adress for key in sorted(self.discovered_resources) for adress in self.discovered_resources[key][1])
+
+    def _is_expired_(self, interface):
+        """
+        This function returns True when the resources of the given interface have never been scanned or their list is older than the discovery TTL.
+
+        Parameters:
+            - interface: the interface to be checked (like GPIB0 or ASRL1).
+        """
+        if interface not in self.discovered_resources:
+            return True
+        if self.discovery_ttl == None:
+            return False
+        return time.time() - self.discovered_resources[interface][0] > self.discovery_ttl
+
+    def invalidate_resources(self, interface = None):
+        """
+        This function is used to discard the cached list of resources of an interface (or of all the interfaces, if interface is None), so that the next
+        request of an instrument on it will scan it again. It must be called after connecting or disconnecting instruments.
+
+        Parameters:
+            - interface: the interface to be invalidated (like GPIB0 or ASRL1), or None to invalidate all of them.
+        """
+        with self.lock:
+            if interface == None:
+                self.discovered_resources = {}
+            else:
+                self.discovered_resources.pop(interface.upper(), None)
     
     def _is_resource_(self, adress):
         """
         This function was created to check that the address given is available for management by a given manager object. It simply return True when the
-        given adress is in the list of available resources for a manager, giving false otherwise.
+        given adress is in the list of available resources for a manager, giving false otherwise. The list of resources of the interface of the adress is
+        scanned again only if it is expired.
         
         Parameters:
             - adress: complete string giving the VISA adress of the instrument (for GPIB interfaces is something like GPIB0::01::INSTR).
         """
-        return adress in self.resources
+        interface = self._interface_(adress)
+        if self._is_expired_(interface):
+            self._scan_resources_(interface)
+        return adress in self.discovered_resources.get(interface, (None, ()))[1]
 
-    def _refresh_resources_(self):
+    def _refresh_resources_(self, interface = None):
         """
         This function is used all the times when it's necessary to refresh the list of resources available to the manager (like when we initialize the
         manager or we try to open a just connected instrument).
+
+        Parameters:
+            - interface: the interface to be refreshed (like GPIB0 or ASRL1), or None to refresh all of them.
         """
         try:
             initial_resources = self.resources
-            self.resources = self.manager.list_resources()
+            self._scan_resources_(interface)
             if self.resources == initial_resources:
                 if self.resources == ():
                     raise Errors.VoidManagerError
@@ -53,22 +160,124 @@ class Manager:
             error.error_handler()
             raise
             
+    def board_lock(self, adress):
+        """
+        This function returns the lock of the board (GPIB0, GPIB1, ASRL1...) of the given adress, creating it the first time. All the drivers of the
+        instruments connected to the same board share this lock, so that their command sequences never overlap, while instruments connected to
+        different boards can be used in parallel from different threads.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument.
+        """
+        interface = self._interface_(adress) if adress != None else ''
+        with self.lock:
+            if interface not in self.board_locks:
+                self.board_locks[interface] = threading.RLock()
+            return self.board_locks[interface]
+
+    def instrument_lock(self, adress, ISOBUS_radix = ''):
+        """
+        This function returns the lock of an Oxford instrument, identified by its adress and its ISOBUS prefix, creating it the first time. It is used by
+        the Cryostat objects instead of the board lock: their command sequences are atomic only with respect to the other users of the same instrument,
+        while the single commands are serialized by the ISOBUS arbiter, which never takes the board lock (see the ISOBUSArbiter class).
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument (or of its ISOBUS master);
+            - ISOBUS_radix: the ISOBUS prefix of the instrument ('@n'), or '' for instruments not linked by ISOBUS.
+        """
+        with self.lock:
+            key = (adress, ISOBUS_radix)
+            if key not in self.instrument_locks:
+                self.instrument_locks[key] = threading.RLock()
+            return self.instrument_locks[key]
+
     def open_instrument(self, adress):
         """
         This function is needed to create open the link between the computer and the instrument, creating an object corresponding to the instrument at
-        the given adress.
+        the given adress. Sessions are shared: if a session with the given adress is already open (like when the IPS, ILM and ITC share the GPIB adress
+        of their ISOBUS master) the same session is returned and its reference count is incremented, otherwise a new session is opened.
        
         Parameters:
             - adress: complete string giving the VISA adress of the instrument (for GPIB interfaces is something like GPIB0::1::INSTR or GPIB0::24::INSTR).
         """
+        with self.lock:
+            if adress in self.sessions:
+                self.session_references[adress] += 1
+                return self.sessions[adress]
+            session = self._open_resource_(adress)
+            if session != None:
+                if self.recorder != None:
+                    session = Recorder.RecordingSession(session, adress, self.recorder)
+                if self.instrumentation != None:
+                    session = Transport.InstrumentedSession(session, adress, self.instrumentation)
+                if self.default_deadline != None:
+                    session = Transport.DeadlineSession(session, adress, self.default_deadline, self.command_retries, self.watchdog)
+                self.sessions[adress] = session
+                self.session_references[adress] = 1
+            return session
+
+    def open_ISOBUS_instrument(self, adress):
+        """
+        This function is used by the Cryostat objects to open the link with an Oxford instrument. It opens (or shares) the session at the given adress as
+        done by the open_instrument function, and returns the ISOBUS arbiter of that session, that serializes the commands of all the instruments linked
+        to the same ISOBUS master.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument (or of its ISOBUS master).
+        """
+        with self.lock:
+            session = self.open_instrument(adress)
+            if session == None:
+                return None
+            if adress not in self.arbiters:
+                self.arbiters[adress] = Arbiter.ISOBUSArbiter(session, command_interval = self.ISOBUS_command_interval)
+            return self.arbiters[adress]
+
+    def close_instrument(self, adress):
+        """
+        This function is used to release a session obtained with the open_instrument function. The session is really closed only when its last user
+        releases it.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument.
+        """
+        with self.lock:
+            if adress not in self.sessions:
+                return
+            self.session_references[adress] -= 1
+            if self.session_references[adress] <= 0:
+                session = self.sessions.pop(adress)
+                self.session_references.pop(adress)
+                if adress in self.arbiters:
+                    self.arbiters.pop(adress).close()
+                session.close()
+
+    def _open_resource_(self, adress):
+        """
+        This function opens a new session with the instrument at the given adress. If the manager trusts the adresses, the instrument is opened directly
+        and its interface is scanned only if the opening fails; otherwise the adress is checked against the cached list of resources, scanning its
+        interface only if the list is expired or the adress is missing (once: a list just scanned because it was expired is not scanned again).
+       
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument.
+        """
         try:
+            if self.trust_adress:
+                try:
+                    return self.manager.open_resource(adress)
+                except visa.errors.VisaIOError:
+                    self._scan_resources_(self._interface_(adress))
+                    if self._is_resource_(adress):
+                        return self.manager.open_resource(adress)
+                    else:
+                        raise Errors.InstrumentNotAvailableError
+            scanned = self._is_expired_(self._interface_(adress))
             if self._is_resource_(adress):
                 return self.manager.open_resource(adress)
-            else:
-                self._refresh_resources_()
+            elif not scanned:
+                self._refresh_resources_(self._interface_(adress))
                 if self._is_resource_(adress):
                     return self.manager.open_resource(adress)
-                else:
-                    raise Errors.InstrumentNotAvailableError            
+            raise Errors.InstrumentNotAvailableError
         except Errors.InstrumentNotAvailableError as error:
-            error.error_handler()
\ No newline at end of file
+            error.error_handler()
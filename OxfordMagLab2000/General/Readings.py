@@ -0,0 +1,110 @@
+import numpy
+from pyvisa import util
+
+element_fields = {'READ': 'reading', 'TST': 'timestamp', 'RNUM': 'reading_number', 'STAT': 'status', 'CHAN': 'channel', 'UNIT': 'unit', 'VOLT': 'voltage',
+                  'CURR': 'current', 'RES': 'resistance', 'TIME': 'time', 'ETEM': 'external_temperature', 'HUM': 'humidity', 'VSO': 'source_voltage'}
+element_aliases = {'CUR': 'CURR', 'CURRENT': 'CURR', 'VOLTAGE': 'VOLT', 'RESISTANCE': 'RES', 'STATUS': 'STAT', 'READING': 'READ', 'TSTAMP': 'TST',
+                   'RNUMBER': 'RNUM', 'CHANNEL': 'CHAN', 'UNITS': 'UNIT', 'ETEMPERATURE': 'ETEM', 'HUMIDITY': 'HUM', 'VSOURCE': 'VSO'}
+text_elements = ('CHAN',)
+suffix_characters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#%'
+
+def element_list(elements):
+    """
+    This function returns the list of the elements of a data format string (like 'READ,RNUM,TST'), in upper case and without spaces.
+
+    Parameters:
+        - elements: the data elements string, as given to the :FORM:ELEM command.
+    """
+    return [element.strip().strip('"').upper() for element in elements.split(',') if element.strip().strip('"') != '']
+
+def ordered_elements(elements, output_order):
+    """
+    This function returns the list of the elements of a data format string in the order in which the instrument sends them: the order of the elements in
+    the output strings is fixed by the instrument (the output_elements attribute of the drivers) and does not depend on the one given to the :FORM:ELEM
+    command. The long forms and the other spellings of the elements (like 'CURRENT' or 'CUR') are replaced by their short forms.
+
+    Parameters:
+        - elements: the data elements string, as given to the :FORM:ELEM command or returned by the :FORM:ELEM? query;
+        - output_order: tuple of the short forms of all the elements, in the order in which the instrument sends them.
+    """
+    elements = [element_aliases.get(element, element) for element in element_list(elements)]
+    return [element for element in output_order if element in elements]
+
+def binary_dtype(elements, datatype = 'f', is_big_endian = False):
+    """
+    This function returns the NumPy structured data type of a binary reading composed by the given elements, each one stored as a float of the given
+    type ('f' for 32-bit and 'd' for 64-bit floats). The fields are named after the elements (see the element_fields dictionary).
+
+    Parameters:
+        - elements: list of the elements of each reading;
+        - datatype: 'f' or 'd';
+        - is_big_endian: True if the instrument sends the most significant byte first (normal byte order), False otherwise (swapped byte order).
+    """
+    return numpy.dtype([(element_fields.get(element, element.lower()), ('>' if is_big_endian else '<') + datatype) for element in elements])
+
+def decode_binary_block(block, elements, datatype = 'f', is_big_endian = False):
+    """
+    This function decodes an IEEE 488.2 binary block (definite or indefinite length, like '#0' followed by the data and the terminator) into a NumPy
+    structured array with one record for each reading, without copying the data.
+
+    Parameters:
+        - block: the bytes read from the instrument;
+        - elements: list of the elements of each reading, in the order in which they are sent;
+        - datatype: 'f' for 32-bit floats (REAL,32 and SREAL formats) or 'd' for 64-bit floats (REAL,64 and DREAL formats);
+        - is_big_endian: True for the normal byte order, False for the swapped one.
+    """
+    (offset, data_length) = util.parse_ieee_block_header(block)
+    if data_length == -1:
+        data_length = len(block) - offset
+    dtype = binary_dtype(elements, datatype, is_big_endian)
+    return numpy.frombuffer(block, dtype, data_length // dtype.itemsize, offset)
+
+def ascii_dtype(elements):
+    """
+    This function returns the NumPy structured data type of an ASCII reading composed by the given elements: the text elements (see the text_elements
+    tuple) are stored as strings, all the others as 64-bit floats.
+
+    Parameters:
+        - elements: list of the elements of each reading.
+    """
+    return numpy.dtype([(element_fields.get(element, element.lower()), 'U16' if element in text_elements else 'f8') for element in elements])
+
+def parse_ascii_readings(text, elements):
+    """
+    This function parses a comma separated ASCII response (like '+1.2345E-12NADC,+0000001.234secs,+00001RDNG#,...') into a NumPy
+    structured array with one record for each reading. The response is split once and each element is converted as a whole column: the unit and status
+    suffixes of the numeric elements (like NADC, secs or RDNG#) are stripped, while the text elements are kept as they are. An incomplete trailing
+    reading is discarded.
+
+    Parameters:
+        - text: the response of the instrument (or several responses joined by commas);
+        - elements: list of the elements sent for each reading, in the order in which they are sent (see the ordered_elements function; the elements
+            that only add a suffix to the others, like UNIT and STAT for the 6517A, must not be listed).
+    """
+    tokens = numpy.array(text.strip().split(','))
+    columns = len(elements)
+    tokens = tokens[:(len(tokens) // columns) * columns].reshape(-1, columns)
+    dtype = ascii_dtype(elements)
+    readings = numpy.empty(tokens.shape[0], dtype)
+    for (j, element) in enumerate(elements):
+        if element in text_elements:
+            readings[dtype.names[j]] = numpy.char.strip(tokens[:, j])
+        else:
+            readings[dtype.names[j]] = numpy.char.rstrip(numpy.char.strip(tokens[:, j]), suffix_characters).astype(float)
+    return readings
+
+def save_readings(filename, readings, fields = None, fmt = '%+.6E'):
+    """
+    This function writes the readings in a data file, one reading for each row and one comma separated column for each field (the numeric fields with the
+    given format, the text ones as they are).
+
+    Parameters:
+        - filename: the complete path of the data file;
+        - readings: NumPy structured array of the readings;
+        - fields: names of the fields to be written (all the fields if None);
+        - fmt: format of the numeric fields.
+    """
+    fields = list(fields) if fields != None else list(readings.dtype.names)
+    formats = ['%s' if readings.dtype[field].kind == 'U' else fmt for field in fields]
+    with open(filename, 'w') as out_file:
+        numpy.savetxt(out_file, readings[fields], fmt = formats, delimiter = ',')
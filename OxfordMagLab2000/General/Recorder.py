@@ -0,0 +1,242 @@
+import collections
+import gzip
+import json
+import threading
+import time
+import pyvisa as visa
+from pyvisa import constants
+from ..General import Errors
+
+def _open_trace_(filename, mode):
+    """
+    This function opens a trace file as text, compressing it with gzip when its name ends with '.gz'.
+    """
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode + 't', encoding = 'utf-8')
+    return open(filename, mode, encoding = 'utf-8')
+
+def _json_values_(values):
+    """
+    This function converts the values given by query_binary_values (a list, or any container like a NumPy array) to a list of Python numbers, that can
+    be written in JSON.
+    """
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+    return [value.item() if hasattr(value, 'item') else value for value in values]
+
+class SessionRecorder:
+    """
+    This class writes in a trace file every command exchanged with the instruments by the recording sessions (see the RecordingSession class). The trace
+    is a text file (gzip compressed if its name ends with '.gz') with a JSON header line followed by one JSON line for each command:
+
+        {"t": start time from the header time, "d": duration, "a": adress, "k": kind, "m": message, "r": reply}
+
+    where kind is 'w' (write), 'q' (query), 'r' (read), 'rr' (read_raw, reply encoded as latin-1), 'b' (query_binary_values, reply as a list of values)
+    or 'c' (device clear). Replies of the commands that raised an error are replaced by the error string ("e" key).
+    """
+    def __init__(self, filename):
+        """
+        Parameters:
+            - filename: the name of the trace file.
+        """
+        self.filename = filename
+        self.file = _open_trace_(filename, 'w')
+        self.start = time.time()
+        self.lock = threading.Lock()
+        self.file.write(json.dumps({'version': 1, 'start': self.start}) + '\n')
+
+    def record(self, adress, kind, message, reply, start, duration, error = None):
+        """
+        This function is used to write a command in the trace file.
+
+        Parameters:
+            - adress: the adress of the instrument;
+            - kind: the kind of command ('w', 'q', 'r', 'rr', 'b' or 'c');
+            - message: the command string (None for reads and clears);
+            - reply: the reply of the instrument (None for writes and clears);
+            - start: the time at which the command has been sent;
+            - duration: the wall time of the command;
+            - error: the exception raised by the command, if any.
+        """
+        event = {'t': round(start - self.start, 6), 'd': round(duration, 6), 'a': adress, 'k': kind}
+        if message != None:
+            event['m'] = message
+        if isinstance(reply, bytes):
+            event['r'] = reply.decode('latin-1')
+        elif reply is not None:
+            event['r'] = _json_values_(reply) if kind == 'b' else reply
+        if error != None:
+            event['e'] = repr(error)
+        line = json.dumps(event, separators = (',', ':')) + '\n'
+        with self.lock:
+            self.file.write(line)
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+
+    def close(self):
+        """
+        This function is used to close the trace file.
+        """
+        with self.lock:
+            self.file.close()
+
+class RecordingSession:
+    """
+    This class wraps a VISA session, writing in a SessionRecorder every command exchanged through it. All the other attributes (like read_termination or
+    timeout) are those of the wrapped session.
+    """
+    def __init__(self, session, adress, recorder):
+        """
+        Parameters:
+            - session: the VISA session to be wrapped;
+            - adress: the VISA adress of the session;
+            - recorder: the SessionRecorder object that writes the trace file.
+        """
+        object.__setattr__(self, 'session', session)
+        object.__setattr__(self, 'adress', adress)
+        object.__setattr__(self, 'recorder', recorder)
+
+    def __getattr__(self, name):
+        if name == 'session':
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.session, name, value)
+
+    def _call_(self, kind, message, function, *args, **kwargs):
+        start = time.time()
+        reply = None
+        error = None
+        try:
+            reply = function(*args, **kwargs)
+            return reply
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            self.recorder.record(self.adress, kind, message, reply if kind not in ('w', 'c') else None, start, time.time() - start, error)
+
+    def write(self, message, *args, **kwargs):
+        return self._call_('w', message, self.session.write, message, *args, **kwargs)
+
+    def query(self, message, *args, **kwargs):
+        return self._call_('q', message, self.session.query, message, *args, **kwargs)
+
+    def read(self, *args, **kwargs):
+        return self._call_('r', None, self.session.read, *args, **kwargs)
+
+    def read_raw(self, *args, **kwargs):
+        return self._call_('rr', None, self.session.read_raw, *args, **kwargs)
+
+    def query_binary_values(self, message, *args, **kwargs):
+        return self._call_('b', message, self.session.query_binary_values, message, *args, **kwargs)
+
+    def clear(self):
+        return self._call_('c', None, self.session.clear)
+
+class ReplayResourceManager:
+    """
+    This class is a stand-in for the PyVISA ResourceManager class that replays a trace file written by a SessionRecorder. It can be given to the Manager
+    class (as its backend): the drivers then talk with replay sessions, that check every command against the recorded one and return the recorded reply,
+    as fast as possible or at the recorded pace. This allows to run again a recorded measurement offline, in order to test, benchmark and profile the
+    drivers and the acquisition code.
+    """
+    def __init__(self, filename, paced = False, speed = 1., strict = True):
+        """
+        Parameters:
+            - filename: the name of the trace file;
+            - paced: if true, each replayed command lasts as long as the recorded one (divided by speed), otherwise replies are returned immediately;
+            - speed: speed factor used when paced is true;
+            - strict: if true, a ReplayMismatchError is raised when a driver sends a command different from the recorded one; otherwise the recorded
+                reply is returned anyway.
+        """
+        self.filename = filename
+        self.paced = paced
+        self.speed = speed
+        self.strict = strict
+        self.events = collections.defaultdict(collections.deque)
+        with _open_trace_(filename, 'r') as trace:
+            self.header = json.loads(trace.readline())
+            for line in trace:
+                if line.strip():
+                    event = json.loads(line)
+                    self.events[event['a']].append(event)
+
+    def list_resources(self, query = '?*::INSTR'):
+        return tuple(sorted(self.events))
+
+    def open_resource(self, adress, **kwargs):
+        if adress not in self.events:
+            raise visa.errors.VisaIOError(constants.StatusCode.error_resource_not_found)
+        session = ReplaySession(self, adress)
+        for key in kwargs:
+            setattr(session, key, kwargs[key])
+        return session
+
+    def remaining(self):
+        """
+        This function returns the number of recorded commands not yet replayed, for each adress.
+        """
+        return {adress: len(self.events[adress]) for adress in self.events}
+
+class ReplaySession:
+    """
+    This class mimics a PyVISA session, giving back the replies recorded in a trace file for its adress.
+    """
+    def __init__(self, manager, adress):
+        self.manager = manager
+        self.resource_name = adress
+        self.read_termination = None
+        self.write_termination = '\n'
+        self.send_end = True
+        self.timeout = None
+        self.lock = threading.Lock()
+
+    def _next_(self, kind, message = None):
+        """
+        This function pops the next recorded command for the adress of the session, checking that it matches the given one, and waits for its recorded
+        duration if the replay is paced.
+        """
+        with self.lock:
+            queue = self.manager.events[self.resource_name]
+            if not queue:
+                raise visa.errors.VisaIOError(constants.StatusCode.error_timeout)
+            event = queue.popleft()
+        if self.manager.strict and (event['k'] != kind or event.get('m') != message):
+            raise Errors.ReplayMismatchError(self.resource_name, event.get('m', event['k']), message if message != None else kind)
+        if self.manager.paced and event['d'] > 0:
+            time.sleep(event['d'] / self.manager.speed)
+        if 'e' in event:
+            if 'timeout' in event['e'].lower() or 'VI_ERROR_TMO' in event['e']:
+                raise visa.errors.VisaIOError(constants.StatusCode.error_timeout)
+            raise visa.errors.VisaIOError(constants.StatusCode.error_io)
+        return event.get('r')
+
+    def write(self, message, *args, **kwargs):
+        self._next_('w', message)
+        return len(message)
+
+    def query(self, message, *args, **kwargs):
+        return self._next_('q', message)
+
+    def read(self, *args, **kwargs):
+        return self._next_('r')
+
+    def read_raw(self, *args, **kwargs):
+        return self._next_('rr').encode('latin-1')
+
+    def query_binary_values(self, message, *args, **kwargs):
+        container = kwargs.get('container', list)
+        return container(self._next_('b', message))
+
+    def clear(self):
+        self._next_('c')
+
+    def close(self):
+        pass
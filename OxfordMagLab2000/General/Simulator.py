@@ -0,0 +1,928 @@
+import abc
+import collections
+import fnmatch
+import random
+import struct
+import threading
+import time
+import pyvisa as visa
+from pyvisa import constants, util
+
+class SimulatedResourceManager:
+    """
+    This class is a pure-Python stand-in for the PyVISA ResourceManager class. It can be given to the Manager class (as its backend) in order to open
+    simulated resources instead of real ones, so that all the drivers contained in this package can be run, profiled and benchmarked without the real
+    instruments. Every simulated resource answers to the Oxford ISOBUS command sets (IPS, ILM and ITC) or to the SCPI command sets (Keithley 2400, Keithley
+    6517A, Keithley 2182 and Lakeshore 340) with a configurable latency (and jitter) for each command.
+    """
+    def __init__(self, devices = None, latency = 0., jitter = 0., command_latencies = None, scan_latency = 0., time_scale = 1., seed = None):
+        """
+        This function is used to initialize the simulated resource manager.
+
+        Parameters:
+            - devices: dictionary that has VISA adresses as keys and, as values, a simulated device or a dictionary of simulated devices whose keys are
+                their ISOBUS adresses (0 is the ISOBUS master). If None, the default laboratory rig given by the simulated_rig function is used;
+            - latency: time (in seconds) spent by every simulated instrument before its answer is available to the controller;
+            - jitter: maximum random deviation (in seconds) added to or subtracted from the latency of each command;
+            - command_latencies: dictionary used to give a specific latency (in seconds) to some commands. Keys can be a full command ('R7', ':READ?'),
+                a SCPI header (':READ?', 'KRDG?') or an Oxford command letter ('X', 'R');
+            - scan_latency: time (in seconds) spent by every call to the list_resources function, in order to mimic a bus enumeration;
+            - time_scale: speed of the simulated physics (magnet ramps, temperature relaxation) with respect to the wall clock time;
+            - seed: seed of the random number generator used for jitter and measurement noise (the random number generator of each simulated device is
+                seeded from it, so that the whole simulation is reproducible).
+        """
+        if devices == None:
+            devices = simulated_rig()
+        self.random = random.Random(seed)
+        self.devices = {}
+        for adress in sorted(devices):
+            if isinstance(devices[adress], dict):
+                self.devices[adress] = dict(devices[adress])
+            else:
+                self.devices[adress] = {0: devices[adress]}
+            for ISOBUS_adress in sorted(self.devices[adress]):
+                device = self.devices[adress][ISOBUS_adress]
+                device.time_scale = time_scale
+                device.random.seed(self.random.getrandbits(64))
+        self.latency = latency
+        self.jitter = jitter
+        self.command_latencies = dict(command_latencies) if command_latencies != None else {}
+        self.scan_latency = scan_latency
+        self.opened_resources = []
+        self.scans = 0
+
+    def list_resources(self, query = '?*::INSTR'):
+        """
+        This function is used to list the simulated resources whose adress matches the given VISA resource expression.
+
+        Parameters:
+            - query: VISA resource regular expression (like '?*::INSTR' or 'GPIB0::?*').
+        """
+        self.scans += 1
+        if self.scan_latency > 0:
+            time.sleep(self.scan_latency)
+        pattern = query.replace('?*', '*')
+        return tuple(sorted(adress for adress in self.devices if fnmatch.fnmatchcase(adress, pattern)))
+
+    def open_resource(self, adress, **kwargs):
+        """
+        This function is used to open a session with the simulated instrument at the given adress. It raises the same VisaIOError raised by PyVISA when
+        the resource does not exist.
+
+        Parameters:
+            - adress: complete string giving the VISA adress of the instrument (like GPIB0::24::INSTR).
+        """
+        if adress not in self.devices:
+            raise visa.errors.VisaIOError(constants.StatusCode.error_resource_not_found)
+        resource = SimulatedResource(self, adress, self.devices[adress])
+        for key in kwargs:
+            setattr(resource, key, kwargs[key])
+        self.opened_resources.append(resource)
+        return resource
+
+    def close(self):
+        """
+        This function is used to close all the sessions opened by the simulated resource manager.
+        """
+        for resource in self.opened_resources:
+            resource.close()
+
+    def command_latency(self, command):
+        """
+        This function returns the time (in seconds) spent by a simulated instrument before answering to the given command.
+
+        Parameters:
+            - command: the command string, without terminators.
+        """
+        if command[:1] == '@' and command[1:2].isdigit():
+            command = command[2:]
+        header = command.split(' ')[0]
+        latency = self.latency
+        for key in (command, header, command[:1]):
+            if key in self.command_latencies:
+                latency = self.command_latencies[key]
+                break
+        if self.jitter > 0:
+            latency += self.random.uniform(-self.jitter, self.jitter)
+        return max(latency, 0.)
+
+class SimulatedResource:
+    """
+    This class mimics a PyVISA message based resource (i.e. an opened session). It forwards the commands written by the drivers to the simulated devices
+    linked to its adress (routing them through the ISOBUS '@n' prefixes if needed), and returns their replies after the configured latency. It also
+    counts the exchanged commands and bytes, in order to measure the driver overhead.
+    """
+    def __init__(self, manager, adress, devices):
+        """
+        This function is used to initialize the simulated session.
+
+        Parameters:
+            - manager: the SimulatedResourceManager instance that opened this session;
+            - adress: the VISA adress of the session;
+            - devices: dictionary of the simulated devices reachable from this adress, having their ISOBUS adresses as keys.
+        """
+        self.manager = manager
+        self.resource_name = adress
+        self.devices = devices
+        self.read_termination = None
+        self.write_termination = '\n'
+        self.send_end = True
+        self.timeout = 2000
+        self.closed = False
+        self.replies = collections.deque()
+        self.condition = threading.Condition()
+        self.clear_count = 0
+        self.write_count = 0
+        self.read_count = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.command_count = collections.Counter()
+
+    def _route_(self, command):
+        """
+        This function is used to find the simulated device adressed by a command, removing the ISOBUS prefix from it.
+
+        Parameters:
+            - command: the command string, without terminators.
+        """
+        if command[:1] == '@' and command[1:2].isdigit():
+            return (self.devices.get(int(command[1])), command[2:])
+        return (self.devices.get(0), command)
+
+    def write(self, message):
+        """
+        This function is used to send a message to the simulated instrument. The reply, if any, will be available after the command latency.
+
+        Parameters:
+            - message: the message to be sent.
+        """
+        if self.closed:
+            raise visa.errors.InvalidSession()
+        termination = self.write_termination if self.write_termination != None else ''
+        if termination and message.endswith(termination):
+            message = message[:-len(termination)]
+        command = message.rstrip('\r\n')
+        (device, command) = self._route_(command)
+        ready_time = time.time() + self.manager.command_latency(message)
+        with self.condition:
+            self.write_count += 1
+            self.bytes_written += len(message) + len(termination)
+            self.command_count[command.split(' ')[0] if not device or device.protocol == 'SCPI' else command[:1]] += 1
+            if device != None:
+                reply = device.handle(command)
+                if reply != None:
+                    self.replies.append((ready_time, reply, device.termination))
+            self.condition.notify_all()
+        return len(message) + len(termination)
+
+    def read_raw(self, size = None):
+        """
+        This function is used to read the next reply of the simulated instrument as bytes, including its terminator. It waits for the reply until the
+        session timeout (given in milliseconds, None means forever) expires, then raises a VisaIOError exactly like PyVISA does. A device clear issued
+        by another thread aborts the read.
+        """
+        if self.closed:
+            raise visa.errors.InvalidSession()
+        deadline = None if self.timeout == None else time.time() + self.timeout / 1000.
+        with self.condition:
+            clear_count = self.clear_count
+            while True:
+                now = time.time()
+                if self.clear_count != clear_count:
+                    raise visa.errors.VisaIOError(constants.StatusCode.error_abort)
+                if self.replies and self.replies[0][0] <= now:
+                    (ready_time, reply, termination) = self.replies.popleft()
+                    break
+                if deadline != None and now >= deadline:
+                    raise visa.errors.VisaIOError(constants.StatusCode.error_timeout)
+                waits = [moment - now for moment in (deadline, self.replies[0][0] if self.replies else None) if moment != None]
+                self.condition.wait(min(waits) if waits else None)
+            if isinstance(reply, str):
+                reply = (reply + termination).encode('latin-1')
+            else:
+                reply = reply + termination.encode('latin-1')
+            self.read_count += 1
+            self.bytes_read += len(reply)
+        return reply
+
+    def read(self, termination = None, encoding = None):
+        """
+        This function is used to read the next reply of the simulated instrument as a string. As PyVISA does, it removes the read termination only when
+        it has been set for the session.
+        """
+        reply = self.read_raw().decode('latin-1')
+        termination = termination if termination != None else self.read_termination
+        if termination and reply.endswith(termination):
+            reply = reply[:-len(termination)]
+        return reply
+
+    def query(self, message, delay = None):
+        """
+        This function is used to write a message to the simulated instrument and to read back its reply.
+
+        Parameters:
+            - message: the message to be sent;
+            - delay: time (in seconds) to wait between writing and reading.
+        """
+        self.write(message)
+        if delay:
+            time.sleep(delay)
+        return self.read()
+
+    def query_binary_values(self, message, datatype = 'f', is_big_endian = False, container = list, delay = None, header_fmt = 'ieee', expect_termination = True, data_points = 0, chunk_size = None):
+        """
+        This function is used to write a message to the simulated instrument and to read back its reply as an IEEE 488.2 binary block, decoded in the
+        given container exactly as PyVISA does.
+        """
+        self.write(message)
+        if delay:
+            time.sleep(delay)
+        return util.from_ieee_block(self.read_raw(), datatype, is_big_endian, container)
+
+    def assert_trigger(self):
+        """
+        This function mimics a GPIB Group Execute Trigger.
+        """
+        self.write('*TRG')
+
+    def clear(self):
+        """
+        This function mimics a device clear, discarding all the replies not yet read by the controller and aborting the pending reads.
+        """
+        with self.condition:
+            self.clear_count += 1
+            self.replies.clear()
+            self.condition.notify_all()
+
+    def close(self):
+        """
+        This function is used to close the simulated session.
+        """
+        self.closed = True
+
+class SimulatedDevice(abc.ABC):
+    """
+    This class is the base of all the simulated instruments. Each subclass must implement the handle function, that receives a command (without
+    terminators and ISOBUS prefix) and returns the reply string (or None when the command does not give any reply).
+    """
+    protocol = None
+    identity = ''
+    termination = '\n'
+
+    def __init__(self):
+        """
+        This function is used to initialize the simulated instrument.
+        """
+        self.time_scale = 1.
+        self.last_update = time.time()
+        self.random = random.Random()
+
+    def _elapsed_(self):
+        """
+        This function returns the simulated time (in seconds) elapsed since its last call.
+        """
+        now = time.time()
+        elapsed = (now - self.last_update) * self.time_scale
+        self.last_update = now
+        return elapsed
+
+    @abc.abstractmethod
+    def handle(self, command):
+        """
+        This function returns the reply of the simulated instrument to the given command (None if the command does not give any reply).
+
+        Parameters:
+            - command: the command, without terminators and ISOBUS prefix.
+        """
+
+class SimulatedOxfordInstrument(SimulatedDevice):
+    """
+    This class implements the behaviour common to all the simulated Oxford instruments: the V, C, Q, U, W, X, R and F commands. All the other commands
+    are dispatched to the _command_<letter>_ functions of the subclasses. Unknown commands are answered with a '?' followed by the command itself, as
+    done by the real instruments.
+    """
+    protocol = 'ISOBUS'
+    termination = '\r'
+
+    def __init__(self):
+        SimulatedDevice.__init__(self)
+        self.control_mode = 3
+        self.extended_resolution = False
+
+    def handle(self, command):
+        if command == '':
+            return '?'
+        letter = command[0]
+        argument = command[1:]
+        self._update_()
+        try:
+            if letter == 'V':
+                return self.identity
+            elif letter == 'C':
+                self.control_mode = int(argument)
+            elif letter == 'Q':
+                self.extended_resolution = bool(int(argument) & 4)
+                self.termination = '\r\n' if int(argument) & 2 else '\r'
+                return None
+            elif letter == 'X':
+                return self.status()
+            elif letter == 'R':
+                return 'R' + self.reading(int(argument))
+            elif letter in ('U', 'W', 'F', '~', '!'):
+                pass
+            elif hasattr(self, '_command_{0}_'.format(letter)):
+                getattr(self, '_command_{0}_'.format(letter))(argument)
+            else:
+                return '?' + command
+        except (ValueError, KeyError):
+            return '?' + command
+        return letter
+
+    def _update_(self):
+        """
+        This function is called before handling every command, in order to let the simulated physics evolve.
+        """
+        self._elapsed_()
+
+    @abc.abstractmethod
+    def status(self):
+        """
+        This function returns the status string of the simulated instrument (the reply to the X command).
+        """
+
+    @abc.abstractmethod
+    def reading(self, parameter):
+        """
+        This function returns the reply to the R command (without the leading 'R') for the given parameter number.
+
+        Parameters:
+            - parameter: the parameter number of the R command.
+        """
+
+class SimulatedIPS(SimulatedOxfordInstrument):
+    """
+    This class simulates an Oxford Intelligent Power Supply (IPS120-10) driving a superconductive magnet fitted with a persistent switch. Output current
+    ramps linearly towards the target at the set sweep rate, and the magnet current follows the output only when the switch heater is on.
+    """
+    identity = 'IPS120-10  Version 3.07  (c) OXFORD 1996'
+
+    def __init__(self, field_constant = 0.0711, lead_resistance = 15.6, magnet_inductance = 20.3, switch_heater_fitted = True):
+        """
+        Parameters:
+            - field_constant: magnet field to current ratio (in tesla per ampere);
+            - lead_resistance: resistance of the current leads (in milliohm);
+            - magnet_inductance: magnet inductance (in henry);
+            - switch_heater_fitted: if set to False, the magnet is simulated without a persistent switch.
+        """
+        SimulatedOxfordInstrument.__init__(self)
+        self.field_constant = field_constant
+        self.lead_resistance = lead_resistance
+        self.magnet_inductance = magnet_inductance
+        self.output_current = 0.
+        self.magnet_current = 0.
+        self.current_set_point = 0.
+        self.current_sweep_rate = 10.
+        self.activity = 0
+        self.switch_heater = 0 if switch_heater_fitted else 8
+        self.mode = 1
+        self.voltage = 0.
+        self.trip_current = 0.
+
+    def _update_(self):
+        elapsed = self._elapsed_()
+        if self.activity in (1, 2):
+            target = self.current_set_point if self.activity == 1 else 0.
+            step = self.current_sweep_rate * elapsed / 60.
+            difference = target - self.output_current
+            if abs(difference) <= step:
+                self.output_current = target
+                self.voltage = 0.
+            else:
+                self.output_current += step if difference > 0 else -step
+                self.voltage = self.magnet_inductance * self.current_sweep_rate / 60. * (1 if difference > 0 else -1)
+        elif self.activity == 4:
+            self.output_current = 0.
+            self.voltage = 0.
+        else:
+            self.voltage = 0.
+        if self.switch_heater in (1, 8):
+            self.magnet_current = self.output_current
+
+    def _sweeping_(self):
+        """
+        This function returns the sweeping digit of the M status field.
+        """
+        target = self.current_set_point if self.activity == 1 else 0.
+        if self.activity in (1, 2) and self.output_current != target:
+            return 1 if self.switch_heater in (1, 8) else 2
+        return 0
+
+    def status(self):
+        return 'X00A{0:d}C{1:d}H{2:d}M{3:d}{4:d}P02'.format(self.activity, self.control_mode, self.switch_heater, self.mode, self._sweeping_())
+
+    def reading(self, parameter):
+        current_format = '{0:+.4f}' if self.extended_resolution else '{0:+.3f}'
+        field_format = '{0:+.5f}' if self.extended_resolution else '{0:+.4f}'
+        values = {0: (current_format, self.output_current),
+                  1: ('{0:+.2f}', self.voltage + self.output_current * self.lead_resistance / 1000.),
+                  2: (current_format, self.magnet_current),
+                  5: (current_format, self.current_set_point),
+                  6: (current_format, self.current_sweep_rate),
+                  7: (field_format, self.output_current * self.field_constant),
+                  8: (field_format, self.current_set_point * self.field_constant),
+                  9: (field_format, self.current_sweep_rate * self.field_constant),
+                  15: ('{0:+.2f}', 5.),
+                  16: (current_format, self.magnet_current if self.switch_heater in (0, 2) else self.output_current),
+                  17: (current_format, self.trip_current),
+                  18: (field_format, (self.magnet_current if self.switch_heater in (0, 2) else self.output_current) * self.field_constant),
+                  19: (field_format, self.trip_current * self.field_constant),
+                  20: ('{0:+.1f}', 25. if self.switch_heater == 1 else 0.),
+                  21: (current_format, -98.46),
+                  22: (current_format, 98.46),
+                  23: ('{0:+.2f}', self.lead_resistance),
+                  24: ('{0:+.1f}', self.magnet_inductance)}
+        (string_format, value) = values[parameter]
+        return string_format.format(value)
+
+    def _command_A_(self, argument):
+        if int(argument) not in (0, 1, 2, 4):
+            raise ValueError
+        self.activity = int(argument)
+
+    def _command_H_(self, argument):
+        if self.switch_heater == 8:
+            return
+        if int(argument) == 1 or int(argument) == 2:
+            self.switch_heater = 1
+        else:
+            self.switch_heater = 2 if self.magnet_current != 0 else 0
+
+    def _command_I_(self, argument):
+        self.current_set_point = float(argument)
+
+    def _command_J_(self, argument):
+        self.current_set_point = float(argument) / self.field_constant
+
+    def _command_M_(self, argument):
+        mode = int(argument)
+        if mode in (8, 9):
+            self.mode = (self.mode & 4) | (mode & 1)
+        else:
+            self.mode = mode
+
+    def _command_P_(self, argument):
+        int(argument)
+
+    def _command_S_(self, argument):
+        self.current_sweep_rate = abs(float(argument))
+
+    def _command_T_(self, argument):
+        self.current_sweep_rate = abs(float(argument)) / self.field_constant
+
+class SimulatedILM(SimulatedOxfordInstrument):
+    """
+    This class simulates an Oxford Intelligent Level Meter (ILM200 series) with up to three level channels and a needle valve motor.
+    """
+    identity = 'ILM200  Version 1.08 (c) OXFORD 1994'
+
+    def __init__(self, channel_types = (2, 1, 0), levels = (75.5, 60., 0.)):
+        """
+        Parameters:
+            - channel_types: usage of the three channels (0 not in use, 1 nitrogen, 2 pulsed helium, 3 continuous helium, 9 error);
+            - levels: initial levels (in percent) of the three channels.
+        """
+        SimulatedOxfordInstrument.__init__(self)
+        self.channel_types = list(channel_types)
+        self.levels = list(levels)
+        self.channel_statuses = [(0x0C if channel_type in (2, 3) else 0x08) if channel_type else 0 for channel_type in channel_types]
+        self.relays = 0
+        self.needle_valve_position = 0.
+
+    def status(self):
+        return 'X{0:d}{1:d}{2:d}S{3:02X}{4:02X}{5:02X}R{6:02X}'.format(*(self.channel_types + self.channel_statuses + [self.relays]))
+
+    def reading(self, parameter):
+        if parameter in (1, 2, 3):
+            return '{0:04d}'.format(int(round(self.levels[parameter - 1] * 10)))
+        elif parameter == 10:
+            return '{0:04d}'.format(int(round(self.needle_valve_position * 10)))
+        raise KeyError(parameter)
+
+    def _command_G_(self, argument):
+        self.needle_valve_position = float(argument) / 10.
+
+    def _command_S_(self, argument):
+        channel = int(argument) - 1
+        self.channel_statuses[channel] = (self.channel_statuses[channel] & ~0x02) | 0x04
+
+    def _command_T_(self, argument):
+        channel = int(argument) - 1
+        self.channel_statuses[channel] = (self.channel_statuses[channel] & ~0x04) | 0x02
+
+class SimulatedITC(SimulatedOxfordInstrument):
+    """
+    This class simulates an Oxford Intelligent Temperature Controller (ITC503) with three sensors. The controlled temperature relaxes exponentially
+    towards the set point when the heater is in automatic mode.
+    """
+    identity = 'ITC503  Version 1.1  (c) OXFORD 1997'
+
+    def __init__(self, temperature = 300., time_constant = 60.):
+        """
+        Parameters:
+            - temperature: initial temperature (in kelvin) read by all the sensors;
+            - time_constant: time constant (in seconds) of the temperature relaxation towards the set point.
+        """
+        SimulatedOxfordInstrument.__init__(self)
+        self.temperatures = [temperature, temperature, temperature]
+        self.time_constant = time_constant
+        self.set_point = 0.
+        self.auto_mode = 0
+        self.heater_sensor = 1
+        self.auto_PIDs = 0
+        self.sweep_step = 0
+        self.heater = 0.
+        self.gas_flow = 0.
+        self.maximum_heater_output = 40.
+        self.PID = [5., 1., 0.]
+
+    def _update_(self):
+        elapsed = self._elapsed_()
+        if self.auto_mode & 1:
+            decay = 1. - pow(2.718281828, -elapsed / self.time_constant)
+            for i in range(3):
+                self.temperatures[i] += (self.set_point - self.temperatures[i]) * decay
+
+    def status(self):
+        return 'X0A{0:d}C{1:d}S{2:02d}H{3:d}L{4:d}'.format(self.auto_mode, self.control_mode, self.sweep_step, self.heater_sensor, self.auto_PIDs)
+
+    def reading(self, parameter):
+        values = {0: self.set_point, 1: self.temperatures[0], 2: self.temperatures[1], 3: self.temperatures[2],
+                  4: self.set_point - self.temperatures[self.heater_sensor - 1], 5: self.heater, 6: self.heater * self.maximum_heater_output / 100.,
+                  7: self.gas_flow, 8: self.PID[0], 9: self.PID[1], 10: self.PID[2]}
+        return '{0:+.3f}'.format(values[parameter])
+
+    def _command_A_(self, argument):
+        self.auto_mode = int(argument) & 3
+
+    def _command_D_(self, argument):
+        self.PID[2] = float(argument)
+
+    def _command_G_(self, argument):
+        self.gas_flow = float(argument)
+
+    def _command_H_(self, argument):
+        if int(argument) not in (1, 2, 3):
+            raise ValueError
+        self.heater_sensor = int(argument)
+
+    def _command_I_(self, argument):
+        self.PID[1] = float(argument)
+
+    def _command_L_(self, argument):
+        self.auto_PIDs = int(argument) & 1
+
+    def _command_M_(self, argument):
+        self.maximum_heater_output = float(argument)
+
+    def _command_O_(self, argument):
+        self.heater = float(argument)
+
+    def _command_P_(self, argument):
+        self.PID[0] = float(argument)
+
+    def _command_S_(self, argument):
+        self.sweep_step = int(argument)
+
+    def _command_T_(self, argument):
+        self.set_point = float(argument)
+
+class SimulatedSCPIInstrument(SimulatedDevice):
+    """
+    This class implements a simple SCPI parser common to all the simulated SCPI-compliant instruments. Messages are split in commands at each ';', each
+    setting command is stored in a dictionary of settings (keyed by its upper-case header without the leading ':') and each query returns the stored
+    value, unless the subclasses give a specific answer with their query function. IEEE 488.2 common commands and the error queue are handled here.
+    """
+    protocol = 'SCPI'
+    defaults = {}
+
+    def __init__(self):
+        SimulatedDevice.__init__(self)
+        self.settings = dict(self.defaults)
+        self.registers = {'*ESE': '0', '*SRE': '0'}
+        self.errors = collections.deque()
+
+    def handle(self, message):
+        replies = []
+        for command in message.split(';'):
+            command = command.strip()
+            if command == '':
+                continue
+            (header, separator, arguments) = command.partition(' ')
+            header = header.upper().lstrip(':')
+            arguments = arguments.strip()
+            if header.endswith('?'):
+                reply = self._common_query_(header[:-1], arguments)
+                if reply == None:
+                    reply = self.query(header[:-1], arguments)
+                if reply != None:
+                    replies.append(reply)
+            else:
+                if not self._common_command_(header, arguments):
+                    self.command(header, arguments)
+        if not replies:
+            return None
+        if any(isinstance(reply, bytes) for reply in replies):
+            return b';'.join(reply if isinstance(reply, bytes) else reply.encode('latin-1') for reply in replies)
+        return ';'.join(replies)
+
+    def _common_query_(self, header, arguments):
+        """
+        This function answers to the IEEE 488.2 common queries and to the error queue query.
+        """
+        if header == '*IDN':
+            return self.identity
+        elif header == '*OPC' or header == '*TST' or header == '*ESR' or header == '*STB':
+            return '1' if header == '*OPC' else '0'
+        elif header in self.registers:
+            return self.registers[header]
+        elif header == '*OPT':
+            return '0'
+        elif header in ('SYST:ERR', 'SYST:ERR:NEXT', 'SYSTEM:ERROR'):
+            if self.errors:
+                return self.errors.popleft()
+            return '0,"No error"'
+        return None
+
+    def _common_command_(self, header, arguments):
+        """
+        This function executes the IEEE 488.2 common commands, returning True when the command has been recognized.
+        """
+        if header == '*RST':
+            self.settings = dict(self.defaults)
+            self.reset()
+        elif header == '*CLS':
+            self.errors.clear()
+        elif header in self.registers:
+            self.registers[header] = arguments
+        elif header in ('*OPC', '*WAI', '*TRG', '*SAV', '*RCL'):
+            pass
+        else:
+            return False
+        return True
+
+    def reset(self):
+        """
+        This function is called when a '*RST' command is received, after the settings have been restored to their defaults.
+        """
+        pass
+
+    def add_error(self, error):
+        """
+        This function is used to push an error string (like '-222,"Data out of range"') in the simulated error queue.
+        """
+        self.errors.append(error)
+
+    def command(self, header, arguments):
+        """
+        This function executes a setting command, storing its value. Subclasses can override it to validate values or to trigger actions.
+        """
+        self.settings[header] = arguments
+
+    def query(self, header, arguments):
+        """
+        This function answers to a query, returning the stored setting. Boolean settings are returned as '1' or '0', as done by the real instruments.
+        """
+        value = self.settings.get(header, '0')
+        if value.upper() == 'ON':
+            return '1'
+        elif value.upper() == 'OFF':
+            return '0'
+        return value
+
+class SimulatedKeithley2400(SimulatedSCPIInstrument):
+    """
+    This class simulates a Keithley 2400 SourceMeter connected to a resistive load. ':READ?' returns arm count times trigger count readings, each one
+    composed by the elements selected with ':FORM:ELEM' (always sent in the VOLT, CURR, RES, TIME, STAT order), in ASCII or in binary (REAL,32) format.
+    """
+    identity = 'KEITHLEY INSTRUMENTS INC.,MODEL 2400,1234567,C30   Mar 17 2006 09:29:29/A02  /K/J'
+    defaults = {'SOUR:FUNC': 'VOLT', 'SOUR:VOLT': '0', 'SOUR:CURR': '0', 'SOUR:VOLT:MODE': 'FIX', 'SOUR:CURR:MODE': 'FIX', 'SOUR:SWE:SPAC': 'LIN',
+                'SOUR:SWE:POIN': '2500', 'SYST:RSEN': 'OFF', 'FORM': 'ASC', 'FORM:BORD': 'SWAP', 'FORM:ELEM': 'VOLT,CURR,RES,TIME,STAT', 'ARM:COUN': '1',
+                'TRIG:COUN': '1', 'OUTP:STAT': 'OFF'}
+
+    def __init__(self, load_resistance = 1e3):
+        """
+        Parameters:
+            - load_resistance: resistance (in ohm) of the simulated load.
+        """
+        SimulatedSCPIInstrument.__init__(self)
+        self.load_resistance = load_resistance
+        self.time_origin = time.time()
+
+    def command(self, header, arguments):
+        if header in ('ARM:COUN', 'TRIG:COUN') and not (1 <= int(float(arguments)) <= 2500):
+            self.add_error('-222,"Data out of range"')
+            return
+        if header == 'SYST:PRES':
+            self.settings = dict(self.defaults)
+            return
+        if header == 'SYST:TIME:RES':
+            self.time_origin = time.time()
+            return
+        if header in ('SOUR:VOLT:MODE', 'SOUR:CURR:MODE'):
+            arguments = arguments.upper()
+        SimulatedSCPIInstrument.command(self, header, arguments)
+
+    def _source_levels_(self, function):
+        """
+        This function returns the list of source levels of a single trigger sequence.
+        """
+        points = int(float(self.settings['TRIG:COUN']))
+        if self.settings.get('SOUR:{0}:MODE'.format(function), 'FIX') == 'SWE':
+            start = float(self.settings.get('SOUR:{0}:STAR'.format(function), '0'))
+            stop = float(self.settings.get('SOUR:{0}:STOP'.format(function), '0'))
+            if points == 1:
+                return [start]
+            if self.settings.get('SOUR:SWE:SPAC', 'LIN').startswith('LOG') and start > 0 and stop > 0:
+                return [start * pow(stop / start, i / (points - 1.)) for i in range(points)]
+            return [start + (stop - start) * i / (points - 1.) for i in range(points)]
+        return [float(self.settings.get('SOUR:{0}'.format(function), '0'))] * points
+
+    def query(self, header, arguments):
+        if header in ('READ', 'FETC', 'MEAS'):
+            return self.readings()
+        return SimulatedSCPIInstrument.query(self, header, arguments)
+
+    def readings(self):
+        """
+        This function builds the answer to a ':READ?' query.
+        """
+        function = 'CURR' if self.settings['SOUR:FUNC'].upper().startswith('CURR') else 'VOLT'
+        elements = [element for element in ('VOLT', 'CURR', 'RES', 'TIME', 'STAT') if element in self.settings['FORM:ELEM'].upper().split(',')]
+        values = []
+        for arm in range(int(float(self.settings['ARM:COUN']))):
+            for level in self._source_levels_(function):
+                if function == 'VOLT':
+                    (voltage, current) = (level, level / self.load_resistance)
+                else:
+                    (voltage, current) = (level * self.load_resistance, level)
+                current *= 1. + self.random.gauss(0., 1e-5)
+                reading = {'VOLT': voltage, 'CURR': current, 'RES': voltage / current if current != 0 else 9.91e37, 'TIME': time.time() - self.time_origin, 'STAT': 0.}
+                values += [reading[element] for element in elements]
+        if self.settings['FORM'].upper().startswith('REAL') or self.settings['FORM'].upper().startswith('SRE'):
+            byte_order = '>' if self.settings['FORM:BORD'].upper().startswith('NORM') else '<'
+            return b'#0' + struct.pack('{0}{1:d}f'.format(byte_order, len(values)), *values)
+        return ','.join('{0:+.6E}'.format(value) for value in values)
+
+class SimulatedKeithley6517A(SimulatedSCPIInstrument):
+    """
+    This class simulates a Keithley 6517A Electrometer measuring the current flowing in a high-resistance load biased by its internal voltage source.
+    ':DATA:FRES?' returns the latest reading, composed by the elements selected with ':FORM:ELEM' (always sent in the READ, TST, RNUM, CHAN order), in
+    ASCII (with the unit and status suffixes) or in binary (REAL,32, REAL,64, SREAL and DREAL) format.
+    """
+    identity = 'KEITHLEY INSTRUMENTS INC.,MODEL 6517A,1234567,A13/A02'
+    defaults = {'FUNC': "'CURR:DC'", 'SOUR:VOLT': '0', 'OUTP': 'OFF', 'FORM': 'ASC', 'FORM:BORD': 'SWAP', 'FORM:ELEM': 'READ,CHAN,RNUM,UNIT,TST,STAT',
+                'ARM:COUN': '1', 'TRIG:COUN': '1'}
+    units = {'CURR': 'ADC', 'VOLT': 'VDC', 'RES': 'OHM', 'CHAR': 'COUL'}
+
+    def __init__(self, load_resistance = 1e9):
+        """
+        Parameters:
+            - load_resistance: resistance (in ohm) of the simulated load.
+        """
+        SimulatedSCPIInstrument.__init__(self)
+        self.load_resistance = load_resistance
+        self.time_origin = time.time()
+        self.reading_number = 0
+
+    def command(self, header, arguments):
+        if header == 'SOUR:VOLT' and abs(float(arguments)) > 1000:
+            self.add_error('-222,"Data out of range"')
+            return
+        if header == 'SYST:PRES':
+            self.settings = dict(self.defaults)
+            return
+        if header == 'SYST:TST:REL:RES':
+            self.time_origin = time.time()
+            return
+        if header == 'SYST:RNUM:RES':
+            self.reading_number = 0
+            return
+        SimulatedSCPIInstrument.command(self, header, arguments)
+
+    def query(self, header, arguments):
+        if header in ('DATA:FRES', 'DATA:LAT', 'FETC', 'READ', 'MEAS'):
+            return self.reading()
+        return SimulatedSCPIInstrument.query(self, header, arguments)
+
+    def reading(self):
+        """
+        This function builds the answer to a ':DATA:FRES?' query.
+        """
+        function = self.settings['FUNC'].strip("'\"").split(':')[0].upper()
+        voltage = float(self.settings['SOUR:VOLT']) if self.settings['OUTP'].upper() in ('ON', '1') else 0.
+        current = voltage / self.load_resistance + self.random.gauss(0., 1e-15)
+        value = {'CURR': current, 'VOLT': voltage, 'RES': self.load_resistance, 'CHAR': current}.get(function, current)
+        self.reading_number += 1
+        selected = [element.strip() for element in self.settings['FORM:ELEM'].upper().split(',')]
+        elements = [element for element in ('READ', 'TST', 'RNUM', 'CHAN', 'UNIT', 'STAT') if element in selected]
+        data_format = self.settings['FORM'].upper()
+        if data_format.startswith('REAL') or data_format.startswith('SRE') or data_format.startswith('DRE'):
+            values = {'READ': value, 'RNUM': float(self.reading_number), 'TST': time.time() - self.time_origin, 'STAT': 0.}
+            binary_values = [values[element] for element in elements if element in values]
+            datatype = 'd' if data_format.startswith('DRE') or data_format.endswith('64') else 'f'
+            byte_order = '>' if self.settings['FORM:BORD'].upper().startswith('NORM') else '<'
+            return b'#0' + struct.pack('{0}{1:d}{2}'.format(byte_order, len(binary_values), datatype), *binary_values)
+        tokens = []
+        for element in elements:
+            if element == 'READ':
+                tokens.append('{0:+.4E}{1}{2}'.format(value, 'N' if 'STAT' in elements else '', self.units.get(function, 'ADC') if 'UNIT' in elements else ''))
+            elif element == 'CHAN':
+                tokens.append('00INTCHAN')
+            elif element == 'RNUM':
+                tokens.append('{0:+06d}RDNG#'.format(self.reading_number))
+            elif element == 'TST':
+                tokens.append('{0:+013.3f}secs'.format(time.time() - self.time_origin))
+        return ','.join(tokens)
+
+class SimulatedKeithley2182(SimulatedSCPIInstrument):
+    """
+    This class simulates a Keithley 2182 Nanovoltmeter measuring a constant voltage with a gaussian noise.
+    """
+    identity = 'KEITHLEY INSTRUMENTS INC.,MODEL 2182,1234567,C02  /A02'
+
+    def __init__(self, voltage = 1.2345e-6, noise = 1e-9):
+        """
+        Parameters:
+            - voltage: the simulated measured voltage (in volt);
+            - noise: standard deviation of the simulated measurement noise (in volt).
+        """
+        SimulatedSCPIInstrument.__init__(self)
+        self.voltage = voltage
+        self.noise = noise
+
+    def query(self, header, arguments):
+        if header in ('MEAS:VOLT', 'READ', 'FETC', 'SENS:DATA', 'SENS:DATA:FRES', 'DATA:FRES'):
+            return '{0:+.8E}'.format(self.voltage + self.random.gauss(0., self.noise))
+        return SimulatedSCPIInstrument.query(self, header, arguments)
+
+class SimulatedLakeshore340(SimulatedSCPIInstrument):
+    """
+    This class simulates a Lakeshore Model 340 temperature controller with two inputs (A and B). Setting commands whose first argument is an input are
+    stored separately for each input, so that the corresponding query returns the values last written for that input; like on the instrument, the
+    parameters omitted by a command (for example the alarm limits in 'ALARM A,0') keep their previous value.
+    """
+    identity = 'LSCI,MODEL340,340123,061407'
+    termination = '\r\n'
+    input_defaults = {'ALARM': '0,1,+320.000,+1.500,0,0', 'ALARMST': '0,0', 'FILTER': '1,10,2', 'INCRV': '1', 'INSET': '1,0', 'INTYPE': '2,1,1,0,0',
+                      'LINEAR': '1,+1.0000,1,1,+0.0000', 'MNMX': '1,1', 'MDATST': '0,0', 'LDATST': '0', 'RDGST': '000'}
+
+    def __init__(self, temperatures = (4.2, 4.5), noise = 1e-3):
+        """
+        Parameters:
+            - temperatures: temperatures (in kelvin) read on input A and B;
+            - noise: standard deviation of the simulated temperature noise (in kelvin).
+        """
+        SimulatedSCPIInstrument.__init__(self)
+        self.temperatures = {'A': temperatures[0], 'B': temperatures[1]}
+        self.noise = noise
+
+    def command(self, header, arguments):
+        (channel, separator, values) = arguments.partition(',')
+        if channel.strip() in self.temperatures:
+            previous = self.settings.get((header, channel.strip()), self.input_defaults.get(header, '')).split(',')
+            values = [value.strip() for value in values.split(',')]
+            self.settings[header, channel.strip()] = ','.join(values + previous[len(values):])
+        else:
+            SimulatedSCPIInstrument.command(self, header, arguments)
+
+    def query(self, header, arguments):
+        channel = arguments.strip()
+        if channel in self.temperatures:
+            temperature = self.temperatures[channel] + self.random.gauss(0., self.noise)
+            if header == 'KRDG':
+                return '{0:+.4E}'.format(temperature)
+            elif header == 'CRDG':
+                return '{0:+.4E}'.format(temperature - 273.15)
+            elif header == 'SRDG':
+                return '{0:+.4E}'.format(1000. / temperature)
+            elif header == 'LDAT':
+                return '{0:+.4E}'.format(temperature)
+            elif header == 'MDAT':
+                return '{0:+.4E},{1:+.4E}'.format(self.temperatures[channel] - 0.01, self.temperatures[channel] + 0.01)
+            if (header, channel) in self.settings:
+                return self.settings[header, channel]
+            return self.input_defaults.get(header, '0')
+        return SimulatedSCPIInstrument.query(self, header, arguments)
+
+def simulated_rig():
+    """
+    This function returns the devices of the default simulated rig, with the same adresses used by the scripts in the Tests folder: an ITC at
+    GPIB0::24::INSTR, an IPS (ISOBUS master) with an ILM at ISOBUS adress 5 on GPIB0::25::INSTR, a Keithley 2400 at GPIB0::23::INSTR, a Keithley 6517A at
+    GPIB0::27::INSTR, a Keithley 2182 at GPIB0::2::INSTR and a Lakeshore 340 at GPIB0::12::INSTR.
+    """
+    return {'GPIB0::2::INSTR': SimulatedKeithley2182(),
+            'GPIB0::12::INSTR': SimulatedLakeshore340(),
+            'GPIB0::23::INSTR': SimulatedKeithley2400(),
+            'GPIB0::24::INSTR': SimulatedITC(),
+            'GPIB0::25::INSTR': {0: SimulatedIPS(), 5: SimulatedILM()},
+            'GPIB0::27::INSTR': SimulatedKeithley6517A()}
@@ -0,0 +1,440 @@
+import bisect
+import collections
+import struct
+import threading
+import time
+import pyvisa as visa
+from pyvisa import constants
+from ..General import Errors
+
+CommandRecord = collections.namedtuple('CommandRecord', ('adress', 'mnemonic', 'kind', 'bytes_sent', 'bytes_received', 'start', 'wall_time', 'retried', 'error'))
+
+def command_mnemonic(message):
+    """
+    This function returns the mnemonic of a command, used to group the latencies of similar commands. The ISOBUS prefix ('@n') and the arguments are
+    removed: Oxford commands are reduced to their letter (with the parameter number for the R and F commands, like R7), SCPI messages to their headers
+    (like ':SOUR:VOLT;*OPC?' for ':SOUR:VOLT 1.5;*OPC?').
+
+    Parameters:
+        - message: the command string.
+    """
+    if message == None:
+        return ''
+    message = message.strip()
+    if message[:1] == '@' and message[1:2].isdigit():
+        message = message[2:]
+    if message[:1].isalpha() and message[:1].isupper() and (len(message) == 1 or not message[1:2].isalpha()):
+        if message[0] in ('R', 'F'):
+            digits = ''
+            for character in message[1:]:
+                if not character.isdigit():
+                    break
+                digits += character
+            return message[0] + digits
+        return message[0]
+    return ';'.join(command.strip().split(' ')[0] for command in message.split(';') if command.strip() != '')
+
+def command_instrument(adress, message):
+    """
+    This function returns the name of the instrument that receives a command, used to group its latencies: the VISA adress, followed by the ISOBUS prefix
+    for the commands sent to the Oxford instruments linked by ISOBUS (like GPIB0::25::INSTR@5 for the ILM linked to the IPS), since they share the same
+    adress.
+
+    Parameters:
+        - adress: the VISA adress of the session;
+        - message: the command string.
+    """
+    if message != None:
+        message = message.strip()
+        if message[:1] == '@' and message[1:2].isdigit():
+            return adress + message[:2]
+    return adress
+
+def is_read_only(message):
+    """
+    This function returns True when a query only reads from the instrument, so that it can be sent again after a timeout without changing its state: the
+    Oxford R (read parameter), X (status) and V (version) commands, and the SCPI messages made only of queries (like ':FORM:ELEM?' or '*IDN?'). All the
+    other queries, like the Oxford set commands (H1, I..., A1), which are sent as queries since the instrument echoes them, are not read-only.
+
+    Parameters:
+        - message: the command string.
+    """
+    mnemonic = command_mnemonic(message)
+    if mnemonic in ('X', 'V') or (mnemonic[:1] == 'R' and mnemonic[1:].isdigit()):
+        return True
+    return mnemonic != '' and all(header.endswith('?') for header in mnemonic.split(';'))
+
+class LatencyHistogram:
+    """
+    This class is a latency histogram with logarithmically spaced bins (from 10 us to 100 s, with 10 bins per decade), that also keeps the count, the total,
+    the minimum and the maximum of the recorded latencies.
+    """
+    edges = [10 ** (exponent / 10.) for exponent in range(-50, 21)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, latency):
+        """
+        This function is used to add a latency (in seconds) to the histogram.
+        """
+        self.counts[bisect.bisect_right(self.edges, latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.minimum = latency if self.minimum == None else min(self.minimum, latency)
+        self.maximum = latency if self.maximum == None else max(self.maximum, latency)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percentage):
+        """
+        This function returns an estimate of the given percentile (from 0 to 100) of the latencies, given by the upper edge of the bin that contains it.
+        """
+        if not self.count:
+            return None
+        threshold = self.count * percentage / 100.
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold and count:
+                return min(self.edges[index] if index < len(self.edges) else self.maximum, self.maximum)
+        return self.maximum
+
+class Instrumentation:
+    """
+    This class collects the records of all the commands exchanged by the instrumented sessions (see the InstrumentedSession class). For each command it
+    keeps the instrument (its adress, with the ISOBUS prefix for the Oxford instruments, see the command_instrument function), the command mnemonic, the bytes sent and received, the wall time and whether the command has been retried, and it
+    updates a latency histogram for each instrument and for each command of each instrument. Hooks (functions receiving a CommandRecord) can be added in
+    order to process the records as soon as they are produced.
+    """
+    def __init__(self, keep_records = 10000):
+        """
+        Parameters:
+            - keep_records: number of the most recent records kept in the records attribute.
+        """
+        self.records = collections.deque(maxlen = keep_records)
+        self.instrument_histograms = collections.defaultdict(LatencyHistogram)
+        self.command_histograms = collections.defaultdict(LatencyHistogram)
+        self.bytes_sent = collections.Counter()
+        self.bytes_received = collections.Counter()
+        self.retries = collections.Counter()
+        self.hooks = []
+        self.lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """
+        This function is used to add a function that will be called with each new CommandRecord.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def record(self, record):
+        """
+        This function is used to store a CommandRecord, updating the histograms and calling the hooks.
+        """
+        with self.lock:
+            self.records.append(record)
+            self.instrument_histograms[record.adress].add(record.wall_time)
+            self.command_histograms[record.adress, record.mnemonic].add(record.wall_time)
+            self.bytes_sent[record.adress] += record.bytes_sent
+            self.bytes_received[record.adress] += record.bytes_received
+            if record.retried:
+                self.retries[record.adress, record.mnemonic] += 1
+        for hook in list(self.hooks):
+            hook(record)
+
+    def summary(self):
+        """
+        This function returns a list of tuples (adress, mnemonic, count, total, mean, minimum, median, 95th percentile, maximum), one for each command of each
+        instrument, sorted by decreasing total time.
+        """
+        with self.lock:
+            rows = [(adress, mnemonic, histogram.count, histogram.total, histogram.mean(), histogram.minimum, histogram.percentile(50), histogram.percentile(95), histogram.maximum) for (adress, mnemonic), histogram in self.command_histograms.items()]
+        return sorted(rows, key = lambda row: row[3], reverse = True)
+
+    def report(self):
+        """
+        This function returns the summary as a printable table (times in milliseconds).
+        """
+        lines = ['{0:<20} {1:<30} {2:>7} {3:>10} {4:>9} {5:>9} {6:>9} {7:>9} {8:>9}'.format('adress', 'command', 'count', 'total', 'mean', 'min', 'p50', 'p95', 'max')]
+        for row in self.summary():
+            lines.append('{0:<20} {1:<30} {2:>7d} {3:>10.2f} {4:>9.3f} {5:>9.3f} {6:>9.3f} {7:>9.3f} {8:>9.3f}'.format(row[0], row[1][:30], row[2], *[1e3 * value for value in row[3:]]))
+        return '\n'.join(lines)
+
+    def reset(self):
+        """
+        This function is used to discard all the records and histograms.
+        """
+        with self.lock:
+            self.records.clear()
+            self.instrument_histograms.clear()
+            self.command_histograms.clear()
+            self.bytes_sent.clear()
+            self.bytes_received.clear()
+            self.retries.clear()
+
+class InstrumentedSession:
+    """
+    This class wraps a VISA session, recording in an Instrumentation object every query, write and read made through it. All the other attributes (like
+    read_termination or timeout) are those of the wrapped session.
+    """
+    def __init__(self, session, adress, instrumentation):
+        """
+        Parameters:
+            - session: the VISA session to be wrapped;
+            - adress: the VISA adress of the session;
+            - instrumentation: the Instrumentation object that collects the records.
+        """
+        object.__setattr__(self, 'session', session)
+        object.__setattr__(self, 'adress', adress)
+        object.__setattr__(self, 'instrumentation', instrumentation)
+        object.__setattr__(self, 'retrying', False)
+
+    def __getattr__(self, name):
+        if name == 'session':
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.session, name, value)
+
+    def _call_(self, kind, message, function, *args, **kwargs):
+        """
+        This function executes a session function, measuring its wall time and recording it.
+
+        Parameters:
+            - kind: the name of the session function ('query', 'write', 'read'...);
+            - message: the command string sent (None for the reads);
+            - function: the session function;
+            - args, kwargs: its arguments.
+        """
+        bytes_sent = len(message) + len(getattr(self.session, 'write_termination', None) or '') if message != None else 0
+        start = time.time()
+        error = None
+        reply = None
+        try:
+            reply = function(*args, **kwargs)
+            return reply
+        except BaseException as exception:
+            error = exception
+            raise
+        finally:
+            wall_time = time.time() - start
+            if isinstance(reply, (str, bytes)):
+                bytes_received = len(reply) + (len(getattr(self.session, 'read_termination', None) or '') if isinstance(reply, str) else 0)
+            elif kind == 'query_binary_values' and reply != None:
+                bytes_received = struct.calcsize(kwargs.get('datatype', args[1] if len(args) > 1 else 'f')) * len(reply)
+            else:
+                bytes_received = 0
+            self.instrumentation.record(CommandRecord(command_instrument(self.adress, message), command_mnemonic(message), kind, bytes_sent, bytes_received, start, wall_time, self.retrying, error))
+
+    def write(self, message, *args, **kwargs):
+        return self._call_('write', message, self.session.write, message, *args, **kwargs)
+
+    def query(self, message, *args, **kwargs):
+        return self._call_('query', message, self.session.query, message, *args, **kwargs)
+
+    def read(self, *args, **kwargs):
+        return self._call_('read', None, self.session.read, *args, **kwargs)
+
+    def read_raw(self, *args, **kwargs):
+        return self._call_('read_raw', None, self.session.read_raw, *args, **kwargs)
+
+    def query_binary_values(self, message, *args, **kwargs):
+        return self._call_('query_binary_values', message, self.session.query_binary_values, message, *args, **kwargs)
+
+default_deadlines = {'*OPC?': 30., '*TST?': 60., '*RST;*OPC?': 30., '*CAL?': 120.}
+
+class Watchdog:
+    """
+    This class watches the commands in flight on the deadline sessions (see the DeadlineSession class). A daemon thread checks them periodically and,
+    when a command is still waiting for its reply after its deadline plus a grace time (for example because the bus is stuck and the VISA timeout never
+    fires), issues a device clear on its session, so that the blocked call is aborted and the driver gets back a recoverable timeout error.
+    """
+    def __init__(self, check_interval = 0.5, grace = 1.):
+        """
+        Parameters:
+            - check_interval: time (in seconds) between two checks of the commands in flight;
+            - grace: time (in seconds) given to a command after its deadline before its session is cleared.
+        """
+        self.check_interval = check_interval
+        self.grace = grace
+        self.calls = {}
+        self.clears = collections.Counter()
+        self.counter = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def watch(self, session, adress, deadline):
+        """
+        This function is used to register a command in flight, returning the token that must be given to the release function when it ends.
+
+        Parameters:
+            - session: the session executing the command;
+            - adress: the VISA adress of the session;
+            - deadline: the deadline (in seconds) of the command.
+        """
+        with self.lock:
+            self.counter += 1
+            self.calls[self.counter] = [session, adress, time.time() + deadline + self.grace, False]
+            if self.thread == None:
+                self.stopped.clear()
+                self.thread = threading.Thread(target = self._worker_, name = 'Watchdog', daemon = True)
+                self.thread.start()
+            return self.counter
+
+    def release(self, token):
+        """
+        This function is used to unregister a command, returning True if the watchdog has cleared its session.
+
+        Parameters:
+            - token: the token given by the watch function.
+        """
+        with self.lock:
+            call = self.calls.pop(token, None)
+        return call != None and call[3]
+
+    def _worker_(self):
+        while not self.stopped.wait(self.check_interval):
+            now = time.time()
+            with self.lock:
+                expired = [call for call in self.calls.values() if not call[3] and now > call[2]]
+                for call in expired:
+                    call[3] = True
+            for (session, adress, limit, cleared) in expired:
+                self.clears[adress] += 1
+                try:
+                    session.clear()
+                except Exception:
+                    pass
+
+    def stop(self):
+        """
+        This function is used to stop the watchdog thread.
+        """
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        self.stopped.set()
+        if thread != None:
+            thread.join()
+
+class DeadlineSession:
+    """
+    This class wraps a VISA session, giving each command a deadline instead of a fixed (or infinite) timeout. Before each query or read the timeout of
+    the session is set to the deadline of the command, taken from the deadlines dictionary (having the command mnemonics as keys, see the
+    command_mnemonic function) or the default one. Values of the dictionary can be numbers (seconds) or functions receiving the command string and
+    returning its deadline, so that drivers can register deadlines that depend on their configuration (like the :READ? deadline of the Keithley2400,
+    that depends on the NPLCs and the trigger count). When a command times out, the session is cleared (device clear) and the read-only queries (see the
+    is_read_only function) are sent again up to the given number of retries; if they still time out, or the command cannot be sent again safely, a
+    recoverable InstrumentTimeoutError is raised. A Watchdog object can be given in order to
+    clear the sessions whose commands hang beyond their deadline.
+    """
+    timeout_codes = (constants.StatusCode.error_timeout, constants.StatusCode.error_abort)
+
+    def __init__(self, session, adress, default_deadline = 10., retries = 1, watchdog = None, deadlines = None):
+        """
+        Parameters:
+            - session: the VISA session to be wrapped;
+            - adress: the VISA adress of the session;
+            - default_deadline: deadline (in seconds) of the commands missing from the deadlines dictionary;
+            - retries: number of times a read-only query that timed out is sent again before raising an InstrumentTimeoutError;
+            - watchdog: a Watchdog object, or None;
+            - deadlines: dictionary of the deadlines of the commands, added to the default_deadlines of this module.
+        """
+        object.__setattr__(self, 'session', session)
+        object.__setattr__(self, 'adress', adress)
+        object.__setattr__(self, 'default_deadline', default_deadline)
+        object.__setattr__(self, 'retries', retries)
+        object.__setattr__(self, 'watchdog', watchdog)
+        object.__setattr__(self, 'deadlines', dict(default_deadlines, **(deadlines or {})))
+        object.__setattr__(self, 'last_deadline', default_deadline)
+        object.__setattr__(self, 'timeouts', 0)
+
+    def __getattr__(self, name):
+        if name == 'session':
+            raise AttributeError(name)
+        return getattr(self.session, name)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.session, name, value)
+
+    def deadline(self, message):
+        """
+        This function returns the deadline (in seconds) of a command.
+
+        Parameters:
+            - message: the command string.
+        """
+        deadline = self.deadlines.get(command_mnemonic(message), self.default_deadline)
+        return deadline(message) if callable(deadline) else deadline
+
+    def _set_retrying_(self, value):
+        if 'retrying' in getattr(self.session, '__dict__', {}):
+            self.session.retrying = value
+
+    def _call_(self, kind, message, function, *args, **kwargs):
+        """
+        This function executes a session function within the deadline of its command, clearing the session and retrying the read-only queries when it
+        times out.
+
+        Parameters:
+            - kind: the name of the session function ('query', 'write', 'read'...);
+            - message: the command string sent (None for the reads, that use the deadline of the last command written);
+            - function: the session function;
+            - args, kwargs: its arguments.
+        """
+        deadline = self.deadline(message) if message != None else self.last_deadline
+        if kind == 'write':
+            self.last_deadline = deadline
+        attempts = 1 + (self.retries if kind in ('query', 'query_binary_values') and is_read_only(message) else 0)
+        try:
+            for attempt in range(attempts):
+                self._set_retrying_(attempt > 0)
+                self.session.timeout = 1000. * deadline
+                token = self.watchdog.watch(self.session, self.adress, deadline) if self.watchdog != None else None
+                try:
+                    return function(*args, **kwargs)
+                except visa.errors.VisaIOError as exception:
+                    if exception.error_code not in self.timeout_codes:
+                        raise
+                finally:
+                    if token != None:
+                        self.watchdog.release(token)
+                self.timeouts += 1
+                try:
+                    self.session.clear()
+                except visa.errors.VisaIOError:
+                    pass
+            raise Errors.InstrumentTimeoutError(self.adress, message, deadline)
+        finally:
+            self._set_retrying_(False)
+
+    def write(self, message, *args, **kwargs):
+        return self._call_('write', message, self.session.write, message, *args, **kwargs)
+
+    def query(self, message, *args, **kwargs):
+        return self._call_('query', message, self.session.query, message, *args, **kwargs)
+
+    def read(self, *args, **kwargs):
+        return self._call_('read', None, self.session.read, *args, **kwargs)
+
+    def read_raw(self, *args, **kwargs):
+        return self._call_('read_raw', None, self.session.read_raw, *args, **kwargs)
+
+    def query_binary_values(self, message, *args, **kwargs):
+        return self._call_('query_binary_values', message, self.session.query_binary_values, message, *args, **kwargs)
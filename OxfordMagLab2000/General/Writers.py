@@ -0,0 +1,289 @@
+import abc
+import json
+import os
+import queue
+import threading
+import time
+import numpy
+from numpy.lib import recfunctions
+from ..General import Errors
+
+running_writers = set()
+running_writers_lock = threading.Lock()
+
+class DataWriter(abc.ABC):
+    """
+    This class is the base of the data writers: it receives the readings of an acquisition (NumPy structured arrays, like those given by the Readings.py
+    functions) and writes them in a data file on a background thread, so that the acquisition never waits for the disk or for the formatting of the
+    values. The readings are queued by the write function and written by the thread in the order in which they have been given, flushing the file every
+    flush_interval seconds, when the flush function is called and when the writer is closed. The subclasses define the file format, implementing the
+    _open_, _write_chunk_, _flush_ and _close_ functions, which are only called by the writer thread.
+
+    An error raised by the writer thread is printed and raised again, as a DataWriterError, by the next call to write, flush or close. A writer that is
+    never closed (like when an acquisition is interrupted by an error) is closed by its thread when the main thread of the script ends, so that the
+    readings already queued are written and the interpreter can exit.
+    """
+    def __init__(self, filename, metadata = None, flush_interval = 1.):
+        """
+        Parameters:
+            - filename: the complete path of the data file;
+            - metadata: dictionary with the description of the measurement (sample, mode, temperature, field, instrument...), written in the header or in
+                the sidecar of the data file according to its format;
+            - flush_interval: maximum time (in seconds) for which written readings can stay in the memory buffers before being flushed to the disk.
+        """
+        self.filename = filename
+        self.metadata = dict(metadata) if metadata != None else {}
+        self.flush_interval = flush_interval
+        self.dtype = None
+        self.rows = 0
+        self.error = None
+        self.closed = False
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target = self._worker_, name = 'DataWriter-{0}'.format(os.path.basename(filename)))
+        with running_writers_lock:
+            running_writers.add(self)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def _check_(self):
+        """
+        This function raises the error of the writer thread, if any.
+        """
+        if self.error != None:
+            raise self.error
+
+    def write(self, readings):
+        """
+        This function is used to queue readings for writing, returning immediately. The given array must not be modified afterwards.
+
+        Parameters:
+            - readings: NumPy structured array of the readings (all the arrays given to a writer must have the same fields).
+        """
+        self._check_()
+        self.queue.put(('data', readings))
+
+    def flush(self):
+        """
+        This function is used to wait until all the queued readings have been written and flushed to the disk.
+        """
+        done = threading.Event()
+        self.queue.put(('flush', done))
+        done.wait()
+        self._check_()
+
+    def close(self, wait = True):
+        """
+        This function is used to close the writer: the readings still in the queue are written and then the data file is completed and closed.
+
+        Parameters:
+            - wait: if true, the function waits for the writer thread to finish, otherwise it returns immediately (the thread goes on until the file is
+                closed, also if the script ends meanwhile).
+        """
+        if not self.closed:
+            self.closed = True
+            self.queue.put(('close', None))
+        if wait:
+            self.thread.join()
+            self._check_()
+
+    def _worker_(self):
+        last_flush = time.monotonic()
+        opened = False
+        while True:
+            try:
+                (kind, item) = self.queue.get(timeout = self.flush_interval)
+            except queue.Empty:
+                (kind, item) = ('timeout', None)
+                if not threading.main_thread().is_alive():
+                    self.closed = True
+                    kind = 'close'
+            try:
+                if self.error == None:
+                    if kind == 'data':
+                        readings = recfunctions.repack_fields(numpy.asarray(item))
+                        if self.dtype is None:
+                            self.dtype = readings.dtype
+                            self._open_()
+                            opened = True
+                        elif readings.dtype != self.dtype:
+                            raise TypeError('readings with fields {0} given to a writer of {1}'.format(readings.dtype.names, self.dtype.names))
+                        self._write_chunk_(readings)
+                        self.rows += len(readings)
+                    if opened and (kind in ('flush', 'close') or time.monotonic() - last_flush >= self.flush_interval):
+                        self._flush_()
+                        last_flush = time.monotonic()
+                    if opened and kind == 'close':
+                        self._close_()
+            except Exception as exception:
+                self.error = Errors.DataWriterError(self.filename, exception)
+                self.error.warning_handler()
+            if kind == 'flush':
+                item.set()
+            elif kind == 'close':
+                with running_writers_lock:
+                    running_writers.discard(self)
+                return
+
+    @abc.abstractmethod
+    def _open_(self):
+        """
+        This function is used to create the data file, when the first readings are written (the dtype attribute is then known).
+        """
+
+    @abc.abstractmethod
+    def _write_chunk_(self, readings):
+        """
+        This function is used to write a chunk of readings in the data file.
+
+        Parameters:
+            - readings: NumPy structured array with the readings.
+        """
+
+    def _flush_(self):
+        pass
+
+    def _close_(self):
+        pass
+
+    def _write_sidecar_(self):
+        """
+        This function writes the sidecar of the data file (a JSON file with the same name and the '.json' extension added), with the metadata, the fields
+        of the readings and the number of readings written.
+        """
+        with open(self.filename + '.json', 'w') as sidecar:
+            json.dump({'metadata': self.metadata, 'descr': numpy.lib.format.dtype_to_descr(self.dtype), 'rows': self.rows}, sidecar, indent = 1, default = str)
+
+class CSVWriter(DataWriter):
+    """
+    This class writes the readings in a comma separated text file, one reading for each row, with the same layout of the data files written by the
+    acquisition functions before the data writers were introduced: the file holds only the values, while the metadata and the names of the fields are
+    written in the sidecar of the file (see the _write_sidecar_ function), which is updated at every flush. If header is true, they are written instead
+    in a header of comment lines (starting with '#', so that the file can still be read with numpy.loadtxt) and no sidecar is written.
+    """
+    def __init__(self, filename, metadata = None, flush_interval = 1., fmt = '%+.6E', header = False):
+        """
+        Parameters:
+            - filename, metadata, flush_interval: see the DataWriter class;
+            - fmt: format of the numeric fields (the default one is the ASCII format of the Keithley readings);
+            - header: if true, the metadata and the names of the fields are written in a header of comment lines instead of the sidecar.
+        """
+        self.fmt = fmt
+        self.header = header
+        DataWriter.__init__(self, filename, metadata, flush_interval)
+
+    def _open_(self):
+        self.file = open(self.filename, 'w')
+        if self.header:
+            for key in self.metadata:
+                self.file.write('# {0} = {1}\n'.format(key, self.metadata[key]))
+            self.file.write('# ' + ','.join(self.dtype.names) + '\n')
+        self.formats = ['%s' if self.dtype[field].kind == 'U' else self.fmt for field in self.dtype.names]
+
+    def _write_chunk_(self, readings):
+        numpy.savetxt(self.file, readings, fmt = self.formats, delimiter = ',')
+
+    def _flush_(self):
+        self.file.flush()
+        if not self.header:
+            self._write_sidecar_()
+
+    def _close_(self):
+        self.file.close()
+
+class BinaryWriter(DataWriter):
+    """
+    This class appends the readings, as raw records, to a binary file: each chunk is written as it is, without any conversion. The fields of the records
+    and the metadata are written in the sidecar of the file (see the _write_sidecar_ function), which is updated at every flush; the file can be read
+    with the read_binary function.
+    """
+    def _open_(self):
+        self.file = open(self.filename, 'wb')
+
+    def _write_chunk_(self, readings):
+        self.file.write(numpy.ascontiguousarray(readings).tobytes())
+
+    def _flush_(self):
+        self.file.flush()
+        self._write_sidecar_()
+
+    def _close_(self):
+        self.file.close()
+
+class NpyWriter(BinaryWriter):
+    """
+    This class appends the readings to a NumPy .npy file: the header, which holds the number of readings, is written again at every flush, so that the
+    file can be loaded with numpy.load while the acquisition is still going on. The metadata are written in the sidecar of the file.
+    """
+    def _header_(self, rows):
+        header = repr({'descr': numpy.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False, 'shape': (rows,)})
+        return numpy.lib.format.magic(1, 0) + numpy.uint16(self.header_length - 10).tobytes() + (header + ' ' * (self.header_length - 11 - len(header)) + '\n').encode('latin-1')
+
+    def _open_(self):
+        self.header_length = 64 * ((len(repr({'descr': numpy.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False, 'shape': (10 ** 18,)})) + 11) // 64 + 1)
+        BinaryWriter._open_(self)
+        self.file.write(self._header_(0))
+
+    def _flush_(self):
+        self.file.seek(0)
+        self.file.write(self._header_(self.rows))
+        self.file.seek(0, os.SEEK_END)
+        BinaryWriter._flush_(self)
+
+class NpzWriter(DataWriter):
+    """
+    This class writes the readings in a NumPy .npz file, as the 'readings' array, together with the metadata (as a JSON string in the 'metadata' array).
+    Since the members of a .npz file cannot be appended to, the readings are kept in memory by the writer thread and the file is written when the writer
+    is closed.
+    """
+    def _open_(self):
+        self.chunks = []
+
+    def _write_chunk_(self, readings):
+        self.chunks.append(readings)
+
+    def _close_(self):
+        numpy.savez(self.filename, readings = numpy.concatenate(self.chunks), metadata = json.dumps(self.metadata, default = str))
+
+writer_types = {'.csv': CSVWriter, '.txt': CSVWriter, '.dat': CSVWriter, '.bin': BinaryWriter, '.npy': NpyWriter, '.npz': NpzWriter}
+
+def open_writer(filename, metadata = None, flush_interval = 1., **kwargs):
+    """
+    This function returns the data writer for the given file, choosing its format from the extension of the filename (see the writer_types dictionary;
+    unknown extensions are written as CSV text).
+
+    Parameters:
+        - filename: the complete path of the data file;
+        - metadata: dictionary with the description of the measurement;
+        - flush_interval: maximum time (in seconds) for which written readings can stay in the memory buffers before being flushed to the disk;
+        - kwargs: other arguments of the writer class (like fmt and header for the CSV writer).
+    """
+    writer_type = writer_types.get(os.path.splitext(filename)[1].lower(), CSVWriter)
+    return writer_type(filename, metadata, flush_interval, **kwargs)
+
+def wait_writers():
+    """
+    This function waits until all the writers closed without waiting (like those of the acquisition functions of the drivers) have completed their data
+    files.
+    """
+    with running_writers_lock:
+        writers = list(running_writers)
+    for writer in writers:
+        if writer.closed:
+            writer.thread.join()
+
+def read_binary(filename):
+    """
+    This function reads a binary file written by a BinaryWriter, returning the NumPy structured array of the readings and the dictionary of the metadata.
+
+    Parameters:
+        - filename: the complete path of the data file.
+    """
+    with open(filename + '.json') as sidecar:
+        description = json.load(sidecar)
+    dtype = numpy.lib.format.descr_to_dtype([tuple(field) for field in description['descr']])
+    return (numpy.fromfile(filename, dtype), description['metadata'])
@@ -1,2 +1,10 @@
+from OxfordMagLab2000.General import Arbiter
+from OxfordMagLab2000.General import AsyncManager
 from OxfordMagLab2000.General import Errors
+from OxfordMagLab2000.General import Locking
 from OxfordMagLab2000.General import Manager
+from OxfordMagLab2000.General import Readings
+from OxfordMagLab2000.General import Recorder
+from OxfordMagLab2000.General import Simulator
+from OxfordMagLab2000.General import Transport
+from OxfordMagLab2000.General import Writers
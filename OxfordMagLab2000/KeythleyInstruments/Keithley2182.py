@@ -1,9 +1,10 @@
-from ..General import Errors,Instruments
+from ..General import AsyncManager,Errors,Instruments
 
 class Keithley2182(Instruments.Instruments):
     """
     This class is a wrapper that contains all the necessary functions to setup an electrical measurement with a Keithley model 2182 Nan0voltmeter.
     """
+    shadow_settings = ('SENS:FUNC:VOLT',)
 
     def __init__(self, manager, adress, read_terminator = 'LF', write_terminator = 'LF', end_or_identify = True, reset = True):
         """
@@ -68,7 +69,9 @@ class Keithley2182(Instruments.Instruments):
         """
         try:
             if 'KEITHLEY' in self.identity and '2182' in self.identity:
-                self.instrument.write('SENS:FUNC:VOLT;SENS:VOLT:CHAN1:RANG:AUTO ON;')
+                with self._shadow_write_('SENS:FUNC:VOLT;SENS:VOLT:CHAN1:RANG:AUTO ON;') as buffer:
+                    if buffer:
+                        self.instrument.write(buffer)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -81,9 +84,17 @@ class Keithley2182(Instruments.Instruments):
         try:
             if 'KEITHLEY' in self.identity and '2182' in self.identity:
                 string = self.instrument.query('MEAS:VOLT?')
+                self.invalidate_shadow()
             else:
                 raise Errors.IncorrectInstrumentError
             self.last_measurement = float(string)
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
             error.error_handler()
-            raise
\ No newline at end of file
+            raise
+
+class AsyncKeithley2182(AsyncManager.AsyncDriver):
+    """
+    This class is the asynchronous variant of the Keithley2182 class: all its functions are awaitable and are executed by the executor of the board of the
+    Keithley model 2182 Nanovoltmeter (see the AsyncManager.py code).
+    """
+    driver_class = Keithley2182
@@ -1,12 +1,16 @@
 import sys
-from ..General import Errors,Instruments
+from ..General import AsyncManager,Errors,Instruments,Readings
 
 class Keithley2400(Instruments.Instruments):
     """
     This class is a wrapper that contains all the necessary functions to setup an electrical measurement with a Keithley model 2400 SourceMeterUnit.
     """
+    unlocked_functions = ('acquire_measurements', 'acquire_sweeps')
+    shadow_settings = ('SENS:FUNC:ALL',)
+    shadow_coupled = (('SENS:CURR:NPLC', 'SENS:VOLT:NPLC', 'SENS:RES:NPLC'),)
+    output_elements = ('VOLT', 'CURR', 'RES', 'TIME', 'STAT')
 
-    def __init__(self, manager, adress, read_terminator = 'LF', write_terminator = 'LF', end_or_identify = True, reset = True):
+    def __init__(self, manager, adress, read_terminator = 'LF', write_terminator = 'LF', end_or_identify = True, reset = True, line_frequency = 50.):
         """
         This function is used in order to initialize the link to a Keithley 2400 SourceMeterUnit (SMU). It inherits from the Instruments class (contained in
             the Instruments.py code) the general SCPI-Instrument initialization, and then specifies it adding some attributes specific to this instrument.
@@ -19,11 +23,20 @@ class Keithley2400(Instruments.Instruments):
             - write_terminator: parameter used to set the appropriate write terminator for the instrument. Available values are None or any possible combination of 'CR' (\r) and 'LF' (\n)
                 characters. Result must be parsed into a string;
             - end_or_identify: parameter used to set if the instrument can use EOI (End Or Identify) line to tell the controller if the message sending has ended.
-            - reset = boolean parameter that enables (when true) or disables (otherwise) the instrument resetting function execution.
+            - reset = boolean parameter that enables (when true) or disables (otherwise) the instrument resetting function execution;
+            - line_frequency = frequency (in Hz) of the power line, used to compute the integration time of the measurements from their NPLCs.
         """
         Instruments.Instruments.__init__(self, manager, adress, read_terminator_int = read_terminator, write_terminator_int = write_terminator, end_or_identify_int = end_or_identify)
         self.arm_count = None
         self.trigger_count = None
+        self.NPLCs = 1
+        self.filter_count = 1
+        self.line_frequency = line_frequency
+        self.configuration_cache = {}
+        self.data_format = 'ASC'
+        self.byte_order_normal = False
+        if hasattr(self.instrument, 'deadlines'):
+            self.instrument.deadlines[':READ?'] = self._read_deadline_
         self.sweep_steps = None
         self.output_status = None
         self.options = None
@@ -46,6 +59,54 @@ class Keithley2400(Instruments.Instruments):
             error.error_handler()
             raise
 
+    def _read_deadline_(self, message):
+        """
+        This function returns the deadline (in seconds) of a :READ? query, registered in the deadline session of the instrument (see the Transport.py code).
+            It is the default deadline of the manager plus three times the expected duration of the acquisition: each of the arm count times trigger count
+            readings takes up to three concurrent conversions (voltage, current and resistance) of NPLCs power line cycles, doubled by the auto zero and
+            multiplied by the filter count.
+
+        Parameters:
+            - message: the command string.
+        """
+        readings = (self.arm_count or 1) * (self.trigger_count or 1)
+        duration = readings * self.filter_count * 3 * 2 * self.NPLCs / self.line_frequency
+        return self.manager.default_deadline + 3 * duration
+
+    def _configuration_query_(self, command):
+        """
+        This function returns the reply to a configuration query (like ':FORM:ELEM?'), sending it to the instrument only when it is not in the
+            configuration cache. The cache is filled by the configuration functions that set the queried values (_sweep_configuration_,
+            system_configuration and format_configuration) and emptied whenever the instrument settings may have been changed otherwise.
+
+        Parameters:
+            - command = the query string.
+        """
+        if command not in self.configuration_cache:
+            self.configuration_cache[command] = self.instrument.query(command)
+        return self.configuration_cache[command]
+
+    def invalidate_shadow(self):
+        """
+        This function is used to forget the shadow registers and the configuration cache (see the _configuration_query_ function).
+        """
+        Instruments.Instruments.invalidate_shadow(self)
+        self.configuration_cache.clear()
+
+    def _read_readings_(self):
+        """
+        This function is used to send a ':READ?' query, returning the readings as a NumPy structured array with one record for each reading and one field
+            for each element selected with the format_configuration function (voltage, current, resistance, time and status). ASCII responses are parsed
+            in one pass by the Readings.parse_ascii_readings function, while binary formats (REAL,32 and SREAL) are decoded directly from the IEEE 488.2
+            block as 32-bit floats, honouring the byte order set with the format_configuration function (normal order is big endian, swapped is little
+            endian).
+        """
+        elements = Readings.ordered_elements(self._configuration_query_(':FORM:ELEM?'), self.output_elements)
+        if self.data_format == 'ASC':
+            return Readings.parse_ascii_readings(self.instrument.query(':READ?'), elements)
+        self.instrument.write(':READ?')
+        return Readings.decode_binary_block(self.instrument.read_raw(), elements, 'f', self.byte_order_normal)
+
     def _output_off_(self):
         """
         This function is used to set the instrument source off whenever required, registering the action in the appropriate attribute in the object.
@@ -113,6 +174,7 @@ class Keithley2400(Instruments.Instruments):
             directions = dict(self.type_dictionary(('up','down'),('UP','DOWN')))
             range_modes = dict(self.type_dictionary(('best','auto','fixed'),('BEST','AUTO','FIX')))
             abort_modes = dict(self.type_dictionary(('never','early','late'),('NEV','EARL','LATE')))
+            self.configuration_cache[':SOUR:SWE:SPAC?'] = spacing_types[spacing]
             buffer = ':SOUR:SWE:SPAC {!s};:SOUR:SWE:POIN {!s};:SOUR:SWE:DIR {!s};:SOUR:SWE:RANG {!s};:SOUR:SWE:CAB {!s};'.format(spacing_types[spacing], points, directions[direction], range_modes[sweep_range_mode], abort_modes[abort_on_compliance])
             return buffer
         except Errors.InvalidTypeDictionaryKeyError as error:
@@ -131,6 +193,8 @@ class Keithley2400(Instruments.Instruments):
             if 'KEITHLEY' in self.identity and '2400' in self.identity:
                 self._self_test_query_()
                 self._reset_command_()
+                self.data_format = 'ASC'
+                self.byte_order_normal = False
                 self._clear_status_()
                 self._event_enable_(enable_number = 255)
                 self._event_enable_query_()
@@ -158,39 +222,21 @@ class Keithley2400(Instruments.Instruments):
             - mode  = string specifing the measurement mode  (R vs T, MR, etc.).
             - T = string specifing the (absolute) temperature at which measurement is taken (if not explicitly defined is an empty string).
             - H = string specifing the (magnetizing) field H at which measurement is taken (if not explicitly defined is an empty string).
-            - extension = extension to the data file (.txt if not explicitly defined).
+            - extension = extension to the data file (.txt if not explicitly defined), which selects its format (see the Writers.py code).
             - print_datas = boolean value that specifies if the script must print datas on screen after taking them (if true) or not.
         """
         try:
             if 'KEITHLEY' in self.identity and '2400' in self.identity:
-                self._output_on_()
-                data = []
-                string = self.instrument.query(':READ?')[:-1]
-                self._operation_complete_query_()
-                self._error_query_()
-                self._output_off_()
-                string_split = string.split(',')
-                filename = folder + sample + '_' + mode  + '_T = {!s} K_H = {!s} Oe'.format(T,H) + '_fixed source_'
-                if '0' in self.instrument.query(':SYST:RSEN?'):
-                    filename += '_2 wires'
-                else:
-                    filename += '_4 wires'
-                filename += extension
-                element_number = len(self.instrument.query(':FORM:ELEM?').split(','))
-                with open(filename, 'w') as out_file:
-                    for i in range(self.trigger_count):
-                        row = ''
-                        for j in range(element_number):
-                            row += string_split[((i * element_number) + j)]
-                            if j != (element_number - 1):
-                                row += ','
-                        data.append(row)
-                        if i != self.trigger_count:
-                            out_file.write(row + '\n')
-                        else:
-                            out_file.write(row)
-                if print_datas:
-                    print(data)
+                wires = 2 if '0' in self._configuration_query_(':SYST:RSEN?') else 4
+                filename = folder + sample + '_' + mode  + '_T = {!s} K_H = {!s} Oe'.format(T,H) + '_fixed source_' + '_{!s} wires'.format(wires) + extension
+                writer = self._open_writer_(filename, sample = sample, mode = mode, T = T, H = H, source = 'fixed', wires = wires)
+                try:
+                    for data in self.iter_measurements():
+                        writer.write(data)
+                        if print_datas:
+                            print(data)
+                finally:
+                    writer.close(wait = False)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -207,44 +253,70 @@ class Keithley2400(Instruments.Instruments):
             - mode  = string specifing the measurement mode  (R vs T, MR, etc.).
             - T = string specifing the (absolute) temperature at which measurement is taken (if not explicitly defined is an empty string).
             - H = string specifing the (magnetizing) field H at which measurement is taken (if not explicitly defined is an empty string).
-            - extension = extension to the data file (.txt if not explicitly defined).
+            - extension = extension to the data file (.txt if not explicitly defined), which selects its format (see the Writers.py code).
             - print_datas = boolean value that specifies if the script must print datas on screen after taking them (if true) or not.
         """
+        try:
+            if 'KEITHLEY' in self.identity and '2400' in self.identity:
+                for (i, data) in enumerate(self.iter_sweeps()):
+                    source = 'linear sweep' if 'LIN' in self._configuration_query_(':SOUR:SWE:SPAC?') else 'logarithmic sweep'
+                    wires = 2 if '0' in self._configuration_query_(':SYST:RSEN?') else 4
+                    filename = folder + sample + '_' + mode  + '_T = {!s} K_H = {!s} Oe'.format(T,H) + '_{!s} number {!s}_{!s} wires'.format(source, (i + 1), wires) + extension
+                    writer = self._open_writer_(filename, sample = sample, mode = mode, T = T, H = H, source = source, sweep = (i + 1), wires = wires)
+                    try:
+                        writer.write(data)
+                    finally:
+                        writer.close(wait = False)
+                    if print_datas:
+                        print(data)
+            else:
+                raise Errors.IncorrectInstrumentError
+        except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
+            error.error_handler()
+
+    def iter_measurements(self, repetitions = 1):
+        """
+        This function is a generator used to repeat the measurement with a fixed source value, yielding the readings of each repetition (as a NumPy
+            structured array, see the _read_readings_ function) as soon as they have been read, so that they can be plotted, reduced or stored while the
+            acquisition goes on. The source output is switched on before the first measurement and off after the last one, also if the consumer stops the
+            iteration before its end.
+
+        Parameters:
+            - repetitions = integer number of measurements (if None, measurements are repeated until the consumer stops the iteration).
+        """
+        try:
+            if 'KEITHLEY' in self.identity and '2400' in self.identity:
+                self._output_on_()
+                try:
+                    repetition = 0
+                    while repetitions == None or repetition < repetitions:
+                        data = self._read_readings_()[:self.trigger_count]
+                        repetition += 1
+                        yield data
+                    self._operation_complete_query_()
+                    self._error_query_()
+                finally:
+                    self._output_off_()
+            else:
+                raise Errors.IncorrectInstrumentError
+        except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
+            error.error_handler()
+
+    def iter_sweeps(self):
+        """
+        This function is a generator used to acquire the sweeps of the internal source of the instrument (configured with the correspondent public
+            methods), one for each arm, yielding the readings of each sweep (as a NumPy structured array, see the _read_readings_ function) as soon as
+            they have been read. The source output is switched on before each sweep and off after it.
+        """
         try:
             if 'KEITHLEY' in self.identity and '2400' in self.identity:
                 for i in range(self.arm_count):
                     self._output_on_()
-                    data = []
-                    string = self.instrument.query(':READ?')[:-1]
+                    data = self._read_readings_()[:self.trigger_count]
                     self._operation_complete_query_()
                     self._error_query_()
                     self._output_off_()
-                    string_split = string.split(',')
-                    filename = folder + sample + '_' + mode  + '_T = {!s} K_H = {!s} Oe'.format(T,H)
-                    if 'LIN' in self.instrument.query(':SOUR:SWE:SPAC?'):
-                        filename += '_linear sweep number {!s}'.format((i + 1))
-                    else:
-                        filename += '_logarithmic sweep number {!s}'.format((i + 1))
-                    if '0' in self.instrument.query(':SYST:RSEN?'):
-                        filename += '_2 wires'
-                    else:
-                        filename += '_4 wires'
-                    filename += extension
-                    element_number = len(self.instrument.query(':FORM:ELEM?').split(','))
-                    with open(filename, 'w') as out_file:
-                        for j in range(self.trigger_count):
-                            row = ''
-                            for k in range(element_number):
-                                row += string_split[((j * element_number) + k)]
-                                if k != (element_number - 1):
-                                    row += ','
-                            data.append(row)
-                            if j != self.trigger_count:
-                                out_file.write(row + '\n')
-                            else:
-                                out_file.write(row)
-                    if print_datas:
-                        print(data)
+                    yield data
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -264,9 +336,7 @@ class Keithley2400(Instruments.Instruments):
                     if count <= 2500:
                         self.arm_count = count
                         buffer = ':ARM:COUN {!s};:ARM:SOUR IMM;'.format(count)
-                        self.instrument.write(buffer)
-                        self._operation_complete_query_()
-                        self._error_query_()
+                        self._configure_(buffer, 'arm_configuration')
                     else:
                         raise Errors.Keithley2400TooManyArms
                 else:
@@ -293,10 +363,9 @@ class Keithley2400(Instruments.Instruments):
                     buffer += ':SENS:CURR:RANG:AUTO ON;'
                 else:
                     buffer += ':SENS:CURR:RANG:AUTO OFF;:SENS:CURR:RANG {!s};'.format(manual_range)
-                    buffer += ':SENS:CURR:NPLC {!s};'.format(NPLCs)
-                    self.instrument.write(buffer)
-                    self._operation_complete_query_()
-                    self._error_query_()
+                buffer += ':SENS:CURR:NPLC {!s};'.format(NPLCs)
+                self._configure_(buffer, 'current_sense_configuration')
+                self.NPLCs = NPLCs
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -341,9 +410,7 @@ class Keithley2400(Instruments.Instruments):
                     else:
                         buffer += ':SOUR:CURR:TRIG:SFAC OFF;'
                 buffer += ':SENS:VOLT:PROT {!s};'.format(compliance_value)
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'current_source_fixed_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -381,9 +448,7 @@ class Keithley2400(Instruments.Instruments):
                 buffer += ':SOUR:FUNC CURR;:SOUR:CURR:mode SWE;:SOUR:CURR:STAR {!s};:SOUR:CURR:STOP {!s};'.format(start_level, stop_level)
                 buffer += self._sweep_configuration_(spacing, points, direction, sweep_range_mode, abort_on_compliance)
                 buffer += ':SENS:VOLT:PROT {!s};'.format(compliance_value)
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'current_source_sweep_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -409,9 +474,7 @@ class Keithley2400(Instruments.Instruments):
                         buffer += ':DISP:DIG {!s};'.format(digits)
                 else:
                     buffer =':DISP:ENAB OFF;'
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'display_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -431,10 +494,11 @@ class Keithley2400(Instruments.Instruments):
                 if active:
                     buffer = ':SENS:AVER:STAT ON;'
                     filter_types = dict(self.type_dictionary(('moving', 'repeat'), ('MOV', 'REP')))
-                    buffer += ':SENS:AVER:TCON {0:G};:SENS:AVER:COUN {1!s}'.format((filter_types[mode ],counts))
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                    buffer += ':SENS:AVER:TCON {0!s};:SENS:AVER:COUN {1!s};'.format(filter_types[mode], counts)
+                else:
+                    buffer = ':SENS:AVER:STAT OFF;'
+                self._configure_(buffer, 'filter_measurements')
+                self.filter_count = counts if active else 1
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -449,10 +513,12 @@ class Keithley2400(Instruments.Instruments):
             - sreg_format = string defining the status register read/write format. 'Ascii' stands for decimal format, 'hexadecimal', 'octal' and 'binary' are
                 self explaining formats.
             - data_format = string defining the data read/write format. 'Ascii' stands for decimal format, 'real' and 'real32' for 32-bit real data format
-                and 'sreal' is for standard single-precision real format.
+                and 'sreal' is for standard single-precision real format. Binary formats are decoded by the acquisition functions (see the _read_readings_
+                function), moving about four times fewer bytes than the ASCII format.
             - normal_order = when set to true restores normal byte ordering in the output strings (instrument predefined is 'swapped' ordering).
-            - data_elements = allows the user to specify of which elements the measurement output string must be composed ('VOLT' stands for voltage, 'CUR'
-                for current, 'RES' for resistance and 'TIME' for the timestamp).
+            - data_elements = allows the user to specify of which elements the measurement output string must be composed ('VOLT' stands for voltage, 'CURR'
+                (or 'CUR') for current, 'RES' for resistance, 'TIME' for the timestamp and 'STAT' for the status). Whatever their order, the instrument sends
+                them in the VOLT, CURR, RES, TIME, STAT order (see the output_elements attribute).
             - calc_enable = allows the user to define if calc (internal calculation) output must be enabled or not.
             - calc_elements = allows the user to define calc output string elements (predefined is 'CALC', calculation results only).
             - source2_enable = allows the user to enable the source2 status read/write register.
@@ -468,14 +534,17 @@ class Keithley2400(Instruments.Instruments):
                     buffer += ':FORM:BORD NORM;'
                 else:
                     buffer += ':FORM:BORD SWAP;'
-                buffer += ':FORM:ELEM {!s};'.format(data_elements.upper())
+                elements = ','.join(Readings.ordered_elements(data_elements, self.output_elements))
+                buffer += ':FORM:ELEM {!s};'.format(elements)
                 if calc_enable:
                     buffer += ':FORM:CALC:ELEM {!s}'.format(calc_elements.upper())
                 if source2_enable:
                     buffer += ':FORM:SOUR {!s}'.format(format_types[source2_format])
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                def committed():
+                    self.data_format = element_types[data_format]
+                    self.byte_order_normal = normal_order
+                    self.configuration_cache[':FORM:ELEM?'] = elements
+                self._configure_(buffer, 'format_configuration', committed = committed)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -498,9 +567,7 @@ class Keithley2400(Instruments.Instruments):
                     buffer = ':OUTP:ENAB OFF;'
                 types = dict(self.type_dictionary(('hi-z', 'normal', 'zero', 'guard'), ('HIMP', 'NORM', 'ZERO', 'GUAR')))
                 buffer += ':OUTP:SMODE {!s};'.format(types[output_off_mode])
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'output_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -536,9 +603,8 @@ class Keithley2400(Instruments.Instruments):
                 else:
                     buffer += ':SENS:RES:RANG:AUTO OFF;:SENS:RES:RANG {!s};'.format(manual_range)
                 buffer += ':SENS:RES:NPLC {!s};'.format(NPLCs)
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'resistance_sense_configuration')
+                self.NPLCs = NPLCs
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -552,9 +618,7 @@ class Keithley2400(Instruments.Instruments):
             if 'KEITHLEY' in self.identity and '2400' in self.identity:
                 types = dict(self.type_dictionary(('front', 'rear'), ('FRON', 'REAR')))
                 buffer = ':ROUT:TERM {!s};'.format(types[terminals])
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'route_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -585,9 +649,9 @@ class Keithley2400(Instruments.Instruments):
                     buffer += ':SYST:RSEN ON;'
                 else:
                     buffer += ':SYST:RSEN OFF;'
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self.configuration_cache.clear()
+                self.configuration_cache[':SYST:RSEN?'] = '1' if remote_sense else '0'
+                self._configure_(buffer, 'system_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -609,9 +673,7 @@ class Keithley2400(Instruments.Instruments):
                         buffer = ':TRIG:SOUR IMM;:TRIG:COUN %s;' %count
                         if delay != 0:
                             buffer += ':TRIG:DEL %s;' %delay
-                        self.instrument.write(buffer)
-                        self._operation_complete_query_()
-                        self._error_query_()
+                        self._configure_(buffer, 'trigger_configuration')
                     else:
                         raise Errors.Keithley2400TooManyTriggers
                 else:
@@ -639,9 +701,8 @@ class Keithley2400(Instruments.Instruments):
                 else:
                     buffer += ':SENS:VOLT:RANG:AUTO OFF;:SENS:VOLT:RANG {!s};'.format(manual_range)
                 buffer += ':SENS:VOLT:NPLC {!s};'.format(NPLCs)
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'voltage_sense_configuration')
+                self.NPLCs = NPLCs
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -690,9 +751,7 @@ class Keithley2400(Instruments.Instruments):
                     print("You did not choose a correct mode for this instrument's source. Execution aborted.")
                     sys.exit()
                 buffer += ':SENS:CURR:PROT {!s};'.format(compliance_value)
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'voltage_source_fixed_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -731,10 +790,15 @@ class Keithley2400(Instruments.Instruments):
                 buffer += ':SOUR:FUNC VOLT;:SOUR:VOLT:mode SWE;:SOUR:VOLT:PROT {!s};:SOUR:VOLT:STAR {!s};:SOUR:VOLT:STOP {!s};'.format(voltage_protection, start_level, stop_level)
                 buffer += self._sweep_configuration_(spacing, points, direction, sweep_range_mode, abort_on_compliance)
                 buffer += ':SENS:CURR:PROT {!s};'.format(compliance_value)
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'voltage_source_sweep_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
-            error.error_handler()
\ No newline at end of file
+            error.error_handler()
+
+class AsyncKeithley2400(AsyncManager.AsyncDriver):
+    """
+    This class is the asynchronous variant of the Keithley2400 class: all its functions are awaitable and are executed by the executor of the board of the
+    Keithley model 2400 SourceMeter (see the AsyncManager.py code).
+    """
+    driver_class = Keithley2400
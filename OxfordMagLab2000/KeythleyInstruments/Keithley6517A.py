@@ -1,10 +1,15 @@
 import math
-from ..General import Errors,Instruments
+import numpy
+from ..General import AsyncManager,Errors,Instruments,Readings
 
 class Keithley6517A(Instruments.Instruments):
     """
     This class is a wrapper that contains all the necessary functions to setup an electrical measurement with a Keithley model 6517A Electrometer.
     """
+    unlocked_functions = ('acquire_linear_sweeps', 'acquire_logarithmic_sweeps', 'acquire_measurements')
+    output_elements = ('READ', 'TST', 'RNUM', 'CHAN', 'ETEM', 'HUM', 'VSO', 'STAT')
+    binary_elements = ('READ', 'TST', 'RNUM', 'STAT')
+    suffix_elements = ('UNIT', 'STAT')
 
     def __init__(self, manager, adress, read_terminator = 'LF', write_terminator = 'LF', end_or_identify = True, reset = True):
         """
@@ -26,6 +31,9 @@ class Keithley6517A(Instruments.Instruments):
         self.trigger_count = None
         self.sweep_steps = None
         self.output_status = None
+        self.data_format = 'ASC'
+        self.byte_order_normal = False
+        self.data_elements = Readings.ordered_elements('READ,CHAN,RNUM,UNIT,TST,STAT', self.output_elements)
         if reset:
             self._system_reset_()
     
@@ -126,6 +134,9 @@ class Keithley6517A(Instruments.Instruments):
             if 'KEITHLEY' in self.identity and '6517A' in self.identity:
                 self._self_test_query_()
                 self._reset_command_()
+                self.data_format = 'ASC'
+                self.byte_order_normal = False
+                self.data_elements = Readings.ordered_elements('READ,CHAN,RNUM,UNIT,TST,STAT', self.output_elements)
                 self._clear_status_()
                 self._event_enable_(enable_number = 253)
                 self._event_enable_query_()
@@ -142,6 +153,107 @@ class Keithley6517A(Instruments.Instruments):
             error.error_handler()
             raise
             
+    def _read_fresh_(self):
+        """
+        This function is used, when a binary data format (REAL,32, REAL,64, SREAL or DREAL) has been selected with the format_configuration function, to
+            send a ':DATA:FRES?' query and to decode the IEEE 488.2 block of the reply. It returns a NumPy structured array with one record for each
+            reading, whose fields are the READ, TST, RNUM and STAT elements selected (the only ones sent in binary formats), as 32-bit or 64-bit floats
+            in the configured byte order.
+        """
+        datatype = 'd' if self.data_format in ('REAL,64', 'DRE') else 'f'
+        self.instrument.write(':DATA:FRES?')
+        block = self.instrument.read_raw()
+        return Readings.decode_binary_block(block, [element for element in self.data_elements if element in self.binary_elements], datatype, self.byte_order_normal)
+
+    def _save_readings_(self, filename, readings, fields = None, **metadata):
+        """
+        This function is used to write the readings in a data file, through a data writer (see the Writers.py code) whose format is chosen from the
+            extension of the filename. The function returns as soon as the readings have been queued: they are written on the writer thread.
+
+        Parameters:
+            - filename = string giving the complete path of the data file.
+            - readings = NumPy structured array of the readings.
+            - fields = names of the fields to be written (all the fields if None).
+            - metadata = description of the measurement (sample, mode, T, H...).
+        """
+        writer = self._open_writer_(filename, **metadata)
+        try:
+            writer.write(readings[list(fields)] if fields != None else readings)
+        finally:
+            writer.close(wait = False)
+
+    def _parse_fresh_(self, responses):
+        """
+        This function is used, when the ASCII data format has been selected, to parse the given ':DATA:FRES?' responses in one pass (see the
+            Readings.parse_ascii_readings function). It returns a NumPy structured array with one record for each reading, whose fields are the selected
+            elements but UNIT and STAT, which only add the unit and status suffixes to the other elements, in the order in which the instrument sends
+            them (see the output_elements attribute; with the default elements a reply is like '+1.0362E-12NADC,+0000012.445secs,+00023RDNG#,00EXTCHAN').
+
+        Parameters:
+            - responses = list of the responses of the instrument.
+        """
+        return Readings.parse_ascii_readings(','.join([response.strip() for response in responses]), [element for element in self.data_elements if element not in self.suffix_elements])
+
+    def _fresh_reading_(self):
+        """
+        This function is used to take a fresh reading, returning the ':DATA:FRES?' response in ASCII format or its decoded records in binary formats (see
+            the _read_fresh_ function). The readings taken in this way are joined by the _join_fresh_ function.
+        """
+        if self.data_format == 'ASC':
+            return self.instrument.query(':DATA:FRES?')
+        return self._read_fresh_()
+
+    def _join_fresh_(self, readings):
+        """
+        This function is used to join the given fresh readings (as returned by the _fresh_reading_ function) in a single NumPy structured array.
+
+        Parameters:
+            - readings = list of the fresh readings.
+        """
+        if self.data_format == 'ASC':
+            return self._parse_fresh_(readings)
+        return numpy.concatenate(readings)
+
+    def _iter_sweeps_(self, num_sweeps, levels, auto_range, manual_range):
+        """
+        This function is a generator used by the sweep acquisition functions to take a fresh reading at each of the given source levels, repeating the
+            sweep num_sweeps times and yielding the readings of each sweep, as a NumPy structured array, as soon as the sweep is over. The source output
+            is switched off at the end of the sweeps, also if the consumer stops the iteration before.
+
+        Parameters:
+            - num_sweeps = integer number of sweeps.
+            - levels = list of the voltage source levels of a sweep.
+            - auto_range = if 'on' enables current auto-range mode, so current range will be automatically selected by the instrument at each sweep step.
+            - manual_range = if auto_range mode is 'off', specify here the current measurement manual range.
+        """
+        self.current_sense_configuration(auto_range = auto_range, manual_range = manual_range)
+        self.arm_configuration()
+        self.trigger_configuration()
+        self._output_on_()
+        try:
+            for i in range(num_sweeps):
+                data = []
+                for voltage_level in levels:
+                    self.voltage_source_configuration(voltage = voltage_level, meter_connect = True)
+                    data.append(self._fresh_reading_())
+                    self._operation_complete_query_()
+                yield self._join_fresh_(data)
+            self._operation_complete_query_()
+            self._error_query_()
+        finally:
+            self._output_off_()
+
+    def _save_sweep_(self, filename, data, **metadata):
+        """
+        This function is used to write the timestamps and the readings of a sweep (as given by the _iter_sweeps_ function) in a data file.
+
+        Parameters:
+            - filename = string giving the complete path of the data file.
+            - data = the data of the sweep.
+            - metadata = description of the measurement (sample, mode, T, H...).
+        """
+        self._save_readings_(filename, data, [field for field in ('timestamp', 'reading') if field in data.dtype.names], **metadata)
+
     def acquire_linear_sweeps(self, num_sweeps, start_level, stop_level, points, folder, sample, mode, T = '', H = '', extension = '.txt', auto_range = 'On', manual_range = 2e-2, print_datas = True):
         """
         This function is used to acquire 1 or more measurements making a linear sweep of the internal source of the instrument (configured within this
@@ -157,40 +269,18 @@ class Keithley6517A(Instruments.Instruments):
             - mode = string specifing the measurement mode (R vs T, MR, etc.).
             - T = string specifing the (absolute) temperature at which measurement is taken (if not explicitly defined is an empty string).
             - H = string specifing the (magnetizing) field H at which measurement is taken (if not explicitly defined is an empty string).
-            - extension = extension to the data file (.txt if not explicitly defined).
+            - extension = extension to the data file (.txt if not explicitly defined), which selects its format (see the Writers.py code).
             - auto_range = if 'on' enables current auto-range mode, so current range will be automatically selected by the instrument at each sweep step.
             - manual_range = if auto_range mode is 'off', specify here the current measurement manual range.
             - print_datas = boolean value that specifies if the script must print datas on screen after taking them (if true) or not.
         """
         try:
             if 'KEITHLEY' in self.identity and '6517A' in self.identity:
-                self.current_sense_configuration(auto_range = auto_range, manual_range = manual_range)
-                self.arm_configuration()
-                self.trigger_configuration()
-                self._output_on_()
-                for i in range(num_sweeps):
-                    data = []
-                    for j in range(points):
-                        voltage_level = start_level + (j * (stop_level - start_level) / (points - 1))
-                        self.voltage_source_configuration(voltage = voltage_level, meter_connect = True)
-                        string = self.instrument.query(':DATA:FRES?')[:-1]
-                        self._operation_complete_query_()
-                        string_split = string.split(',')
-                        save_string = string_split[1] + ',' + string_split[0]
-                        data.append(save_string)
+                for (i, data) in enumerate(self.iter_linear_sweeps(num_sweeps, start_level, stop_level, points, auto_range, manual_range)):
+                    filename = folder + sample + '_' + mode + '_T = {!s} K_H = {!s} Oe_linear sweep number {!s}_2 wires'.format(T, H, (i + 1)) + extension
+                    self._save_sweep_(filename, data, sample = sample, mode = mode, T = T, H = H, source = 'linear sweep', sweep = (i + 1), wires = 2)
                     if print_datas:
                         print(data)
-                self._operation_complete_query_()
-                self._error_query_()
-                self._output_off_()
-                for i in range(num_sweeps):
-                    filename = folder + sample + '_' + mode + '_T = {!s} K_H = {!s} Oe_linear sweep number {!s}_2 wires'.format(T, H, (i + 1)) + extension
-                    with open(filename, 'w') as out_file:
-                        for j in range(points):
-                            if j != points:
-                                out_file.write(data[j] + '\n')
-                            else:
-                                out_file.write(data[j])
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
             error.error_handler()
 
@@ -209,40 +299,18 @@ class Keithley6517A(Instruments.Instruments):
             - mode = string specifing the measurement mode (R vs T, MR, etc.).
             - T = string specifing the (absolute) temperature at which measurement is taken (if not explicitly defined is an empty string).
             - H = string specifing the (magnetizing) field H at which measurement is taken (if not explicitly defined is an empty string).
-            - extension = extension to the data file (.txt if not explicitly defined).
+            - extension = extension to the data file (.txt if not explicitly defined), which selects its format (see the Writers.py code).
             - auto_range = if 'on' enables current auto-range mode, so current range will be automatically selected by the instrument at each sweep step.
             - manual_range = if auto_range mode is 'off', specify here the current measurement manual range.
             - print_datas = boolean value that specifies if the script must print datas on screen after taking them (if true) or not.
         """
         try:
             if 'KEITHLEY' in self.identity and '6517A' in self.identity:
-                self.current_sense_configuration(auto_range = auto_range, manual_range = manual_range)
-                self.arm_configuration()
-                self.trigger_configuration()
-                self._output_on_()
-                for i in range(num_sweeps):
-                    data = []
-                    for j in range(points):
-                        voltage_level = 10 ** (math.log10(start_level) + (j * ((math.log10(stop_level) - math.log10(start_level)) / (points - 1))))
-                        self.voltage_source_configuration(voltage = voltage_level, meter_connect = True)
-                        string = self.instrument.query(':DATA:FRES?')[:-1]
-                        self._operation_complete_query_()
-                        string_split = string.split(',')
-                        save_string = string_split[1] + ',' + string_split[0]
-                        data.append(save_string)
+                for (i, data) in enumerate(self.iter_logarithmic_sweeps(num_sweeps, start_level, stop_level, points, auto_range, manual_range)):
+                    filename = folder + sample + '_' + mode + '_T = {!s} K_H = {!s} Oe_logarithmic sweep number {!s}_2 wires'.format(T, H, (i + 1)) + extension
+                    self._save_sweep_(filename, data, sample = sample, mode = mode, T = T, H = H, source = 'logarithmic sweep', sweep = (i + 1), wires = 2)
                     if print_datas:
                         print(data)
-                self._operation_complete_query_()
-                self._error_query_()
-                self._output_off_()
-                for i in range(num_sweeps):
-                    filename = folder + sample + '_' + mode + '_T = {!s} K_H = {!s} Oe_logarithmic sweep number {!s}_2 wires'.format(T, H, (i + 1)) + extension
-                    with open(filename, 'w') as out_file:
-                        for j in range(points):
-                            if j != points:
-                                out_file.write(data[j] + '\n')
-                            else:
-                                out_file.write(data[j])
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
             error.error_handler()
             
@@ -258,49 +326,96 @@ class Keithley6517A(Instruments.Instruments):
             - mode = string specifing the measurement mode (R vs T, MR, etc.).
             - T = string specifing the (absolute) temperature at which measurement is taken (if not explicitly defined is an empty string).
             - H = string specifing the (magnetizing) field H at which measurement is taken (if not explicitly defined is an empty string).
-            - extension = extension to the data file (.txt if not explicitly defined).
+            - extension = extension to the data file (.txt if not explicitly defined), which selects its format (see the Writers.py code).
             - print_datas = boolean value that specifies if the script must print datas on screen after taking them (if true) or not.
         """
         try:
             if 'KEITHLEY' in self.identity and '6517A' in self.identity:
-                self._output_on_()
-                data = []
-                split_data = []
-                for i in range(self.trigger_count):
-                    string = self.instrument.query(':DATA:FRES?')[:-1]
-                    data.append(string)
-                self._operation_complete_query_()
-                self._error_query_()
-                self._output_off_()
                 filename = folder + sample + '_' + mode + '_T = {!s} K_H = {!s} Oe_fixed source_2 wires'.format(T, H) + extension
-                element_number = len(self.instrument.query(':FORM:ELEM?').split(','))
-                if element_number == 1:
-                    with open(filename, 'w') as out_file:
-                        for i in range(self.trigger_count):
-                            row = str(data[i])
-                            if i != self.trigger_count:
-                                out_file.write(row + '\n')
-                            else:
-                                out_file.write(row)
-                else:    
-                    with open(filename, 'w') as out_file:
-                        for i in range(self.trigger_count):
-                            row = ''
-                            string = data[i]
-                            for j in range(element_number):
-                                row += data[i][((i * element_number) + j)]
-                                if j != (element_number - 1):
-                                    row += ','
-                            split_data.append(row)
-                            if i != self.trigger_count:
-                                out_file.write(row + '\n')
-                            else:
-                                out_file.write(row)
-                if print_datas:
-                    print(data)
+                writer = self._open_writer_(filename, sample = sample, mode = mode, T = T, H = H, source = 'fixed', wires = 2)
+                try:
+                    for data in self.iter_measurements():
+                        writer.write(data)
+                        if print_datas:
+                            print(data)
+                finally:
+                    writer.close(wait = False)
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
             error.error_handler()
             
+    def iter_linear_sweeps(self, num_sweeps, start_level, stop_level, points, auto_range = 'On', manual_range = 2e-2):
+        """
+        This function is a generator used to acquire 1 or more linear sweeps of the internal source of the instrument (configured within this function by
+            means of using the correspondent public methods), yielding the readings of each sweep (as a NumPy structured array) as soon as the sweep is
+            over, so that they can be plotted, reduced or stored while the acquisition goes on.
+
+        Parameters:
+            - num_sweeps = integer number of sweeps user wants to be measured by the instrument.
+            - start_level = internal voltage source start level for sweep.
+            - stop_level = internal voltage source stop level for sweep.
+            - points = integer number of points of which the sweep must be composed.
+            - auto_range = if 'on' enables current auto-range mode, so current range will be automatically selected by the instrument at each sweep step.
+            - manual_range = if auto_range mode is 'off', specify here the current measurement manual range.
+        """
+        try:
+            if 'KEITHLEY' in self.identity and '6517A' in self.identity:
+                levels = [start_level + (j * (stop_level - start_level) / (points - 1)) for j in range(points)]
+                yield from self._iter_sweeps_(num_sweeps, levels, auto_range, manual_range)
+        except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
+            error.error_handler()
+
+    def iter_logarithmic_sweeps(self, num_sweeps, start_level, stop_level, points, auto_range = 'On', manual_range = 2e-2):
+        """
+        This function is a generator used to acquire 1 or more logarithmic sweeps of the internal source of the instrument (configured within this function
+            by means of using the correspondent public methods), yielding the readings of each sweep (as a NumPy structured array) as soon as the sweep is
+            over, so that they can be plotted, reduced or stored while the acquisition goes on.
+
+        Parameters:
+            - num_sweeps = integer number of sweeps user wants to be measured by the instrument.
+            - start_level = internal voltage source start level for sweep.
+            - stop_level = internal voltage source stop level for sweep.
+            - points = integer number of points of which the sweep must be composed.
+            - auto_range = if 'on' enables current auto-range mode, so current range will be automatically selected by the instrument at each sweep step.
+            - manual_range = if auto_range mode is 'off', specify here the current measurement manual range.
+        """
+        try:
+            if 'KEITHLEY' in self.identity and '6517A' in self.identity:
+                levels = [10 ** (math.log10(start_level) + (j * ((math.log10(stop_level) - math.log10(start_level)) / (points - 1)))) for j in range(points)]
+                yield from self._iter_sweeps_(num_sweeps, levels, auto_range, manual_range)
+        except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
+            error.error_handler()
+
+    def iter_measurements(self, chunk_size = None):
+        """
+        This function is a generator used to acquire the one shot measurements (as many as the trigger count) with the internal source of the instrument
+            fixed to a value (that has been setup previously by users calling the correspondent public method), yielding the readings in chunks of
+            chunk_size readings (as NumPy structured arrays) as soon as they have been taken. The source output is switched off at the end of the
+            measurements, also if the consumer stops the iteration before.
+
+        Parameters:
+            - chunk_size = integer number of readings of each chunk (if None, all the readings are yielded in a single chunk).
+
+        The number of readings is the trigger count set with the trigger_configuration function (1, the instrument default, if it has not been set).
+        """
+        try:
+            if 'KEITHLEY' in self.identity and '6517A' in self.identity:
+                trigger_count = self.trigger_count if self.trigger_count != None else 1
+                chunk_size = chunk_size if chunk_size != None else trigger_count
+                self._output_on_()
+                try:
+                    data = []
+                    for i in range(trigger_count):
+                        data.append(self._fresh_reading_())
+                        if len(data) == chunk_size or i == (trigger_count - 1):
+                            yield self._join_fresh_(data)
+                            data = []
+                    self._operation_complete_query_()
+                    self._error_query_()
+                finally:
+                    self._output_off_()
+        except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
+            error.error_handler()
+
     def arm_configuration(self, count = 1):
         """
         This function is used to setup the instrument arm_layer, i.e. telling the instrument how many times the source must get a certain value.
@@ -312,8 +427,7 @@ class Keithley6517A(Instruments.Instruments):
             if 'KEITHLEY' in self.identity and '6517A' in self.identity:
                 self.arm_count = count
                 buffer = ':ARM:SOUR IMM;:ARM:COUN {!s};'.format(count)
-                self.instrument.write(buffer)
-                self._error_query_()
+                self._configure_(buffer, 'arm_configuration', operation_complete = False)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -359,9 +473,7 @@ class Keithley6517A(Instruments.Instruments):
                 else:
                     buffer += ':CHAR:ADIS OFF;'
                 buffer += ':SYST:ZCH OFF;'                
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'charge_sense_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -408,9 +520,7 @@ class Keithley6517A(Instruments.Instruments):
                 else:
                     buffer += ':CURR:DAMP OFF;'
                 buffer += ':SYST:ZCH OFF;'                 
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'current_sense_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -435,9 +545,7 @@ class Keithley6517A(Instruments.Instruments):
                         buffer += ':DISP:SMES OFF;'
                 else:
                     buffer =':DISP:ENAB OFF;'
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'display_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -453,7 +561,9 @@ class Keithley6517A(Instruments.Instruments):
                 and 'dreal' and 'real64' is for standard double-precision real format.
             - normal_order = when set to true restores normal byte ordering in the output strings (instrument predefined is 'swapped' ordering).
             - data_elements = allows the user to specify of which elements the measurement output string must be composed (READ stands for reading, CHAN for
-                channel, RNUM for reading number, UNIT is measurement unit, TST is the timestamp and STAT is instrument status).
+                channel, RNUM for reading number, UNIT is measurement unit, TST is the timestamp and STAT is instrument status). In binary formats only the
+                READ, TST, RNUM and STAT elements are sent, and the acquisition functions decode them into NumPy arrays (see the _read_fresh_ function).
+                Whatever the order given, the instrument sends the elements in a fixed order (see the output_elements attribute).
         """
         try:
             if 'KEITHLEY' in self.identity and '6517A' in self.identity:
@@ -464,9 +574,11 @@ class Keithley6517A(Instruments.Instruments):
                 else:
                     buffer += ':FORM:BORD SWAP;'
                 buffer += ':FORM:ELEM {!s};'.format(data_elements.upper())
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                def committed():
+                    self.data_format = element_types[data_format]
+                    self.byte_order_normal = normal_order
+                    self.data_elements = Readings.ordered_elements(data_elements, self.output_elements)
+                self._configure_(buffer, 'format_configuration', committed = committed)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -527,9 +639,7 @@ class Keithley6517A(Instruments.Instruments):
                 else:
                     buffer += ':RES:DAMP OFF;'
                 buffer += ':SYST:ZCH OFF;'               
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'resistance_sense_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -572,9 +682,7 @@ class Keithley6517A(Instruments.Instruments):
                     buffer += ':SYST:HSC ON;'
                 else:
                     buffer += ':SYST:HSC OFF;'
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'system_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -594,9 +702,7 @@ class Keithley6517A(Instruments.Instruments):
                 buffer = ':TRIG:SOUR IMM;:TRIG:COUN {!s};'.format(count)
                 if delay != 0:
                     buffer += ':TRIG:DEL {!s};'.format(delay)
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'trigger_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -648,9 +754,7 @@ class Keithley6517A(Instruments.Instruments):
                 else:
                     buffer += ':VOLT:XFE OFF;'
                 buffer += ':SYST:ZCH OFF;' 
-                self.instrument.write(buffer)
-                self._operation_complete_query_()
-                self._error_query_()
+                self._configure_(buffer, 'voltage_sense_configuration')
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.InvalidTypeDictionaryKeyError) as error:
@@ -695,13 +799,18 @@ class Keithley6517A(Instruments.Instruments):
                         buffer += ':SOUR:CURR:RLIMIT:STAT ON;:SOUR:CURR:LIM {!s};'.format(current_limit)
                     else:
                         buffer += ':SOUR:CURR:RLIMIT:STAT OFF;'
-                    self.instrument.write(buffer)
-                    self._operation_complete_query_()
-                    self._error_query_()
+                    self._configure_(buffer, 'voltage_source_configuration')
                 else:
                     raise Errors.Keithley6517AIncorrectSourceValueError
             else:
                 raise Errors.IncorrectInstrumentError 
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError, Errors.Keithley6517AIncorrectSourceValueError) as error:
             error.error_handler()
-            raise
\ No newline at end of file
+            raise
+
+class AsyncKeithley6517A(AsyncManager.AsyncDriver):
+    """
+    This class is the asynchronous variant of the Keithley6517A class: all its functions are awaitable and are executed by the executor of the board of the
+    Keithley model 6517A Electrometer (see the AsyncManager.py code).
+    """
+    driver_class = Keithley6517A
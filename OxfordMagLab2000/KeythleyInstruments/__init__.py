@@ -1,3 +1,3 @@
-import Keithley2182
-import Keithley2400
-import Keithley6517A
+from OxfordMagLab2000.KeythleyInstruments import Keithley2182
+from OxfordMagLab2000.KeythleyInstruments import Keithley2400
+from OxfordMagLab2000.KeythleyInstruments import Keithley6517A
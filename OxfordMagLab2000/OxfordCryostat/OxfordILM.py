@@ -1,4 +1,126 @@
-from ..General import Cryostat,Errors
+import functools
+from ..General import AsyncManager,Cryostat,Errors
+
+"""
+Status decoding
+
+The messages of the status string given by the get_status function are built once, when the module is imported, and each part of the status string is
+decodified on demand from the bit masks of its bytes. Decodified strings are cached, so that the same status is decodified only once.
+"""
+
+channel_messages = {'0': 'Channel {0} not in use.', '1': 'Channel {0} used for nitrogen level metering.', '2': 'Channel {0} used for pulsed helium level metering.', '3': 'Channel {0} used for continuous helium level metering.', '9': 'Error on channel {0}.'}
+X_messages = tuple({usage: channel_messages[usage].format(channel) for usage in channel_messages} for channel in (1, 2, 3))
+S_bit_messages = ((0x01, 'CURRENT FLOWING in helium probe.'), (0x02, 'Helium probe in FAST rate.'), (0x04, 'Helium probe in SLOW rate.'))
+S_filling_messages = {(0, 0): 'END FILLING.', (0, 1): 'NOT FILLING.', (1, 0): 'FILLING.', (1, 1): 'START FILLING.'}
+S_high_bit_messages = ((0x20, 'LOW STATE is active.'), (0x40, 'ALARM requested.'), (0x80, 'PRE-PULSE CURRENT is flowing.'))
+R_bit_messages = ((0x01, 'In SHUT DOWN state.'), (0x02, 'Alarm is SOUNDING.'), (0x04, 'In ALARM state.'), (0x08, 'Alarm SILENCING is prohibited.'), (0x10, 'RELAY 1 is active.'), (0x20, 'RELAY 2 is active.'), (0x40, 'RELAY 3 is active.'), (0x80, 'RELAY 4 is active.'))
+
+def _bit_messages_(byte, bit_messages):
+    return [message if byte & mask else '' for (mask, message) in bit_messages]
+
+@functools.lru_cache(maxsize = None)
+def decode_channel_usage(usage):
+    """
+    This function decodifies the X part of the status string (like 'X123'), which gives the usage of the three channels.
+    """
+    return ' '.join(X_messages[i][usage[i + 1]] for i in range(3)) + '\n'
+
+@functools.lru_cache(maxsize = None)
+def decode_channel_status(channel, byte):
+    """
+    This function decodifies the status byte of a channel (one of the three bytes of the S part of the status string).
+
+    Parameters:
+        - channel: the channel number (1, 2 or 3);
+        - byte: the status byte of the channel, as an integer.
+    """
+    filling = S_filling_messages[(byte >> 3) & 1, (byte >> 4) & 1]
+    return ' '.join(['Channel {0}'.format(channel)] + _bit_messages_(byte, S_bit_messages) + [filling] + _bit_messages_(byte, S_high_bit_messages)) + '\n'
+
+@functools.lru_cache(maxsize = None)
+def decode_relay_status(byte):
+    """
+    This function decodifies the byte of the R part of the status string (alarms and relays).
+    """
+    return ' '.join(_bit_messages_(byte, R_bit_messages))
+
+@functools.lru_cache(maxsize = 256)
+def decode_status(status):
+    """
+    This function decodifies the status string given by the ILM (like 'X123S000000R00') in a message that can be understood by users.
+
+    Parameters:
+        - status: string obtained by the get_status function.
+    """
+    decodified_status = []
+    for part in (status[:4], status[4:11], status[11:]):
+        if len(part) == 3:
+            decodified_status.append(decode_relay_status(int(part[1:], 16)))
+        elif len(part) == 4:
+            decodified_status.append(decode_channel_usage(part))
+        else:
+            decodified_status.extend(decode_channel_status(channel, int(part[(2 * channel - 1):(2 * channel + 1)], 16)) for channel in (1, 2, 3))
+    return ''.join(decodified_status)
+
+class ILMStatus(Cryostat.StatusRecord):
+    """
+    This class is the status record of the Oxford Intelligent Level Meter, decoded from a status string like 'X210S0C0800R00' (see the StatusRecord
+    class). Its fields are:
+        - channel_modes: tuple with the usage of the three channels (0 not in use, 1 nitrogen, 2 pulsed helium, 3 continuous helium, 9 error);
+        - channel_statuses: tuple with the status bytes of the three channels (see the S_bit_messages, S_filling_messages and S_high_bit_messages
+            tables);
+        - relays: the alarms and relays status byte (see the R_bit_messages table).
+    Its text is rendered by the decode_status function. Its changes (see the changes function) are given for each channel, as the channel_N_mode,
+    channel_N_filling and channel_N_flags fields (the flags are the status bits but the filling ones).
+    """
+    __slots__ = ('channel_modes', 'channel_statuses', 'relays')
+    instrument = 'ILM'
+    value_names = dict([('channel_{0}_mode'.format(channel), {0: 'not in use', 1: 'nitrogen', 2: 'pulsed helium', 3: 'continuous helium', 9: 'error'}) for channel in (1, 2, 3)] +
+                       [('channel_{0}_filling'.format(channel), {0: 'end filling', 1: 'filling', 2: 'not filling', 3: 'start filling'}) for channel in (1, 2, 3)])
+
+    @classmethod
+    def _fields_(cls, raw):
+        return (tuple(int(mode, 16) for mode in raw[1:4]), tuple(int(raw[i:(i + 2)], 16) for i in (5, 7, 9)), int(raw[12:14], 16))
+
+    def _render_(self):
+        return decode_status(self.raw)
+
+    def _channel_fields_(self):
+        fields = {'relays': self.relays}
+        for channel in (1, 2, 3):
+            byte = self.channel_statuses[channel - 1]
+            fields['channel_{0}_mode'.format(channel)] = self.channel_modes[channel - 1]
+            fields['channel_{0}_filling'.format(channel)] = (byte >> 3) & 3
+            fields['channel_{0}_flags'.format(channel)] = byte & ~0x18
+        return fields
+
+    def changes(self, previous):
+        """
+        This function returns the list of the per channel fields that differ from the given previous record, as (field, previous value, value) tuples.
+
+        Parameters:
+            - previous: the previous status record of the ILM.
+        """
+        (previous_fields, fields) = (previous._channel_fields_(), self._channel_fields_())
+        return [(name, previous_fields[name], fields[name]) for name in fields if previous_fields[name] != fields[name]]
+
+    def helium_channel(self, channel):
+        """
+        This function returns True if the given channel (1, 2 or 3) is used for helium level metering.
+        """
+        return self.channel_modes[channel - 1] in (2, 3)
+
+    def fast_rate(self, channel):
+        """
+        This function returns True if the helium probe of the given channel (1, 2 or 3) is in fast rate.
+        """
+        return bool(self.channel_statuses[channel - 1] & 0x02)
+
+    def slow_rate(self, channel):
+        """
+        This function returns True if the helium probe of the given channel (1, 2 or 3) is in slow rate.
+        """
+        return bool(self.channel_statuses[channel - 1] & 0x04)
 
 class OxfordILM(Cryostat.Cryostat):
     """
@@ -29,22 +151,21 @@ class OxfordILM(Cryostat.Cryostat):
         self.get_version_string()
         self.set_control_mode(True, True)
         self.set_communication_protocol(line_feed)
-        self.messages = self._messages_dictionary_()
         self.channel_1_level = None
         self.channel_2_level = None
         self.channel_3_level = None
         self.needle_valve_position = None
         self.ignore_low_LHe_level = ignore_low_LHe_level
         self.get_status()
-        if not (self.last_queried_status[1] == '0'):
+        if not (self.status.channel_modes[0] == 0):
             self.get_channel_1_level_reading()
         else:
             self.channel_1_level = None
-        if not (self.last_queried_status[2] == '0'):
+        if not (self.status.channel_modes[1] == 0):
             self.get_channel_2_level_reading()
         else:
             self.channel_2_level = None
-        if not (self.last_queried_status[3] == '0'):
+        if not (self.status.channel_modes[2] == 0):
             self.get_channel_3_level_reading()
         else:
             self.channel_3_level = None
@@ -81,18 +202,18 @@ class OxfordILM(Cryostat.Cryostat):
         try:
             if 'ILM' in self.identity:
                 self.get_status()
-                if self.last_queried_status[1] == 0:
+                if self.status.channel_modes[0] == 0:
                     raise Errors.LMChannelNotUsed(1)
-                elif self.last_queried_status[1] == 9:
+                elif self.status.channel_modes[0] == 9:
                     raise Errors.LMErrorOnChannel(1)
                 else:
                     string = self.instrument.query(self.buffer_radix + 'R1')[1:]
                     if '?' in string:
                         raise Errors.LMNotResponding
                     self.channel_1_level = float(string) / 10.
-                if self.channel_1_level <= 20. and (self.last_queried_status[1] == '2' or self.last_queried_status[1] == '3') and not(self.ignore_low_LHe_level):
+                if self.channel_1_level <= 20. and self.status.helium_channel(1) and not(self.ignore_low_LHe_level):
                     raise Errors.Low_LHe_level
-                elif self.channel_1_level <= 10. and self.last_queried_status[1] == '1':
+                elif self.channel_1_level <= 10. and self.status.channel_modes[0] == 1:
                     raise Errors.Low_LN2_level
             else:
                 raise Errors.IncorrectInstrumentError
@@ -106,18 +227,18 @@ class OxfordILM(Cryostat.Cryostat):
         try:
             if 'ILM' in self.identity:
                 self.get_status()
-                if self.last_queried_status[2] == 0:
+                if self.status.channel_modes[1] == 0:
                     raise Errors.LMChannelNotUsed(2)
-                elif self.last_queried_status[2] == 9:
+                elif self.status.channel_modes[1] == 9:
                     raise Errors.LMErrorOnChannel(2)
                 else:
                     string = self.instrument.query(self.buffer_radix + 'R2')[1:]
                     if '?' in string:
                         raise Errors.LMNotResponding
                     self.channel_2_level = float(string) / 10.
-                if self.channel_2_level <= 20. and (self.last_queried_status[1] == '2' or self.last_queried_status[1] == '3') and not(self.ignore_low_LHe_level):
+                if self.channel_2_level <= 20. and self.status.helium_channel(2) and not(self.ignore_low_LHe_level):
                     raise Errors.Low_LHe_level
-                elif self.channel_2_level <= 10. and self.last_queried_status[1] == '1':
+                elif self.channel_2_level <= 10. and self.status.channel_modes[1] == 1:
                     raise Errors.Low_LN2_level
             else:
                 raise Errors.IncorrectInstrumentError
@@ -131,18 +252,18 @@ class OxfordILM(Cryostat.Cryostat):
         try:
             if 'ILM' in self.identity:
                 self.get_status()
-                if self.last_queried_status[3] == 0:
+                if self.status.channel_modes[2] == 0:
                     raise Errors.LMChannelNotUsed(3)
-                elif self.last_queried_status[3] == 9:
+                elif self.status.channel_modes[2] == 9:
                     raise Errors.LMErrorOnChannel(3)
                 else:
                     string = self.instrument.query(self.buffer_radix + 'R3')[1:]
                     if '?' in string:
                         raise Errors.LMNotResponding
                     self.channel_3_level = float(string) / 10.
-                if self.channel_3_level <= 20. and (self.last_queried_status[1] == '2' or self.last_queried_status[1] == '3') and not(self.ignore_low_LHe_level):
+                if self.channel_3_level <= 20. and self.status.helium_channel(3) and not(self.ignore_low_LHe_level):
                     raise Errors.Low_LHe_level
-                elif self.channel_3_level <= 10. and self.last_queried_status[1] == '1':
+                elif self.channel_3_level <= 10. and self.status.channel_modes[2] == 1:
                     raise Errors.Low_LN2_level
             else:
                 raise Errors.IncorrectInstrumentError
@@ -171,9 +292,6 @@ class OxfordILM(Cryostat.Cryostat):
         try:
             if 'ILM' in self.identity:
                 self.get_status_string()
-                if '?' in self.last_queried_status:
-                    raise Errors.LMNotResponding
-                self._status_decoder_(self.last_queried_status)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LMNotResponding, Errors.IncorrectInstrumentError) as error:
@@ -256,10 +374,10 @@ class OxfordILM(Cryostat.Cryostat):
         try:
             if 'ILM' in self.identity:
                 if channel_number >= 1 and channel_number <= 3:
-                    if self.last_queried_status[channel_number] == '2' or self.last_queried_status[channel_number] == '3': 
+                    if self.status.helium_channel(channel_number):
                         self.instrument.query(self.buffer_radix + 'S{0:G}'.format(channel_number))
                         self.get_status()
-                        if (channel_number == 1 and bin(int(self.last_queried_status[5:7],16))[2:].zfill(8)[5] == '0') or (channel_number == 2 and bin(int(self.last_queried_status[7:9],16))[2:].zfill(8)[5] == '0') or (channel_number == 3 and bin(int(self.last_queried_status[9:11],16))[2:].zfill(8)[5] == '0'):
+                        if not self.status.slow_rate(channel_number):
                             raise Errors.LMNotResponding
                     else:
                         raise Errors.LMNotHeliumChannel(channel_number)
@@ -280,19 +398,19 @@ class OxfordILM(Cryostat.Cryostat):
         try:
             if 'ILM' in self.identity:
                 if channel_number >= 1 and channel_number <= 3:
-                    if self.last_queried_status[channel_number] == '2' or self.last_queried_status[channel_number] == '3': 
+                    if self.status.helium_channel(channel_number):
                         self.instrument.query(self.buffer_radix + 'T{0:G}'.format(channel_number))
                         self.get_status()
                         if channel_number == 1:
-                            if bin(int(self.last_queried_status[5:7],16))[2:].zfill(8)[6] == '0':
+                            if not self.status.fast_rate(1):
                                 raise Errors.LMNotResponding
                             self.get_channel_1_level_reading()
                         elif channel_number == 2:
-                            if bin(int(self.last_queried_status[7:9],16))[2:].zfill(8)[6] == '0':
+                            if not self.status.fast_rate(2):
                                 raise Errors.LMNotResponding
                             self.get_channel_2_level_reading()
                         else:
-                            if bin(int(self.last_queried_status[9:11],16))[2:].zfill(8)[6] == '0':
+                            if not self.status.fast_rate(3):
                                 raise Errors.LMNotResponding
                             self.get_channel_3_level_reading() 
                     else:
@@ -310,91 +428,28 @@ class OxfordILM(Cryostat.Cryostat):
     These commands are supplied in order to automating some of the tasks connected with the use of this class.
     """
 
-    def _messages_dictionary_(self):
-        """
-        This function is used to create a dictionary of the possible messages given by the get_status function, in order to give them to the
-        status_decoder function in order to translate the status string into a comprehensible message for the user.
-        """
-        keys = ('X', 'S', 'R')
-        channel_1_messages = {'0': 'Channel 1 not in use.', '1': 'Channel 1 used for nitrogen level metering.', '2': 'Channel 1 used for pulsed helium level metering.', '3': 'Channel 1 used for continuous helium level metering.', '9': 'Error on channel 1.'}
-        channel_2_messages = {'0': 'Channel 2 not in use.', '1': 'Channel 2 used for nitrogen level metering.', '2': 'Channel 2 used for pulsed helium level metering.', '3': 'Channel 2 used for continuous helium level metering.', '9': 'Error on channel 2.'}
-        channel_3_messages = {'0': 'Channel 3 not in use.', '1': 'Channel 3 used for nitrogen level metering.', '2': 'Channel 3 used for pulsed helium level metering.', '3': 'Channel 3 used for continuous helium level metering.', '9': 'Error on channel 3.'}
-        channels = {'1': 'Channel 1', '2': 'Channel 2', '3': 'Channel 3'}
-        S_bit_0_messages = {'0': '', '1': 'CURRENT FLOWING in helium probe.'}
-        S_bit_1_messages = {'0': '', '1': 'Helium probe in FAST rate.'}
-        S_bit_2_messages = {'0': '', '1': 'Helium probe in SLOW rate.'}
-        S_bit_3_4_messages = {'00': 'END FILLING.', '01': 'NOT FILLING.', '10': 'FILLING.', '11': 'START FILLING.'}
-        S_bit_5_messages = {'0': '', '1': 'LOW STATE is active.'}
-        S_bit_6_messages = {'0': '', '1': 'ALARM requested.'}
-        S_bit_7_messages = {'0': '', '1': 'PRE-PULSE CURRENT is flowing.'}
-        R_bit_0_messages = {'0': '', '1': 'In SHUT DOWN state.'}
-        R_bit_1_messages = {'0': '', '1': 'Alarm is SOUNDING.'}
-        R_bit_2_messages = {'0': '', '1': 'In ALARM state.'}
-        R_bit_3_messages = {'0': '', '1': 'Alarm SILENCING is prohibited.'}
-        R_bit_4_messages = {'0': '', '1': 'RELAY 1 is active.'}
-        R_bit_5_messages = {'0': '', '1': 'RELAY 2 is active.'}
-        R_bit_6_messages = {'0': '', '1': 'RELAY 3 is active.'}
-        R_bit_7_messages = {'0': '', '1': 'RELAY 4 is active.'}
-        messages = {}
-        for key in keys:
-            if key == 'X':
-                for i in channel_1_messages:
-                    for j in channel_2_messages:
-                        for k in channel_3_messages:
-                                messages[key, i, j, k] = channel_1_messages[i] + ' ' + channel_2_messages[j] + ' ' + channel_3_messages[k] + '\n'
-            elif key == 'S':
-                for channel in channels:
-                    for i in S_bit_0_messages:
-                        for j in S_bit_1_messages:
-                            for k in S_bit_2_messages:
-                                for l in S_bit_3_4_messages:
-                                    for m in S_bit_5_messages:
-                                        for n in S_bit_6_messages:
-                                            for o in S_bit_7_messages:
-                                                messages[key, channel, i, j, k, l, m, n, o] = channels[channel] + ' ' + S_bit_0_messages[i] + ' ' + S_bit_1_messages[j] + ' ' +  S_bit_2_messages[k] + ' ' + S_bit_3_4_messages[l] + ' ' + S_bit_5_messages[m] + ' ' + S_bit_6_messages[n] + ' ' + S_bit_7_messages[o] + '\n'
-            elif key == 'R':
-                for i in R_bit_0_messages:
-                    for j in R_bit_1_messages:
-                        for k in R_bit_2_messages:
-                            for l in R_bit_3_messages:
-                                for m in R_bit_4_messages:
-                                    for n in R_bit_5_messages:
-                                        for o in R_bit_6_messages:
-                                            for p in R_bit_7_messages:
-                                                messages[key, i, j, k, l, m, n, o, p] = R_bit_0_messages[i] + ' ' + R_bit_1_messages[j] + ' ' +  R_bit_2_messages[k] + ' ' + R_bit_3_messages[l] + ' ' + R_bit_4_messages[m] + ' ' + R_bit_5_messages[n] + ' ' + R_bit_6_messages[o] + ' ' + R_bit_7_messages[p]
-        return messages
-        
     def _status_decoder_(self, status):
         """
-        This function is used to decodify the status string (obtained by the examine function) in a message that can be understood by users.
+        This function is used to decodify the status string (obtained by the examine function) in a status record (see the ILMStatus class), whose text
+        can be understood by users.
         
         Parameters:
             - status: string obtained by the get_status function.
         """
-        self.last_decodified_status = ""
-        status_split = (status[:4], status[4:11], status[11:])
-        for status in status_split:
-            if len(status) == 3:
-                key = status[0]
-                (bit_7, bit_6, bit_5, bit_4, bit_3, bit_2, bit_1, bit_0) = bin(int(status[1:],16))[2:].zfill(8)
-                self.last_decodified_status = self.last_decodified_status + self.messages[key, bit_0, bit_1, bit_2, bit_3, bit_4, bit_5, bit_6, bit_7]
-            elif len(status) == 4:
-                key = status[0]
-                (channel_1, channel_2, channel_3) = status[1:]
-                self.last_decodified_status = self.last_decodified_status + self.messages[key, channel_1, channel_2, channel_3]
-            else:
-                key = status[0]
-                channels = ('1', '2', '3')
-                channel_statuses = (bin(int(status[1:3],16))[2:].zfill(8), bin(int(status[3:5],16))[2:].zfill(8), bin(int(status[5:],16))[2:].zfill(8))
-                for i in channels:
-                    (bit_7, bit_6, bit_5, bits_43, bit_2, bit_1, bit_0) = (channel_statuses[int(i) - 1][0], channel_statuses[int(i) - 1][1], channel_statuses[int(i) - 1][2], channel_statuses[int(i) - 1][4] + channel_statuses[int(i) - 1][3], channel_statuses[int(i) - 1][5], channel_statuses[int(i) - 1][6], channel_statuses[int(i) - 1][7])
-                    self.last_decodified_status = self.last_decodified_status + self.messages[key, i, bit_0, bit_1, bit_2, bits_43, bit_5, bit_6, bit_7]
-                    if i != channels[-1]:
-                        self.last_decodified_status = self.last_decodified_status
+        self._update_status_(status, ILMStatus)
 
     def close(self):
         """
         This function is used to put the ILM in a safe state, in which the ILM can be used in LOCAL mode before cutting the link between controller and instrument.
         """
+        if self.closed:
+            return
         self.set_needle_valve_position(0)
-        self._general_close_()
\ No newline at end of file
+        self._general_close_()
+
+class AsyncOxfordILM(AsyncManager.AsyncDriver):
+    """
+    This class is the asynchronous variant of the OxfordILM class: all its functions are awaitable and are executed by the executor of the board of the
+    Oxford Intelligent Level Meter (see the AsyncManager.py code).
+    """
+    driver_class = OxfordILM
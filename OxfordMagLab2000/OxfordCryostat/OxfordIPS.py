@@ -1,11 +1,103 @@
-from ..General import Cryostat,Errors
+import time
+from ..General import AsyncManager,Cryostat,Errors
+
+"""
+Calibration profiles of the superconductive switches of the magnets, used by the settle_switch_heater function of the OxfordIPS class:
+    - heating_time: minimum time (in seconds) between the switch heater turning on and the first sweep of the magnet current (time needed by the switch to
+        become resistive);
+    - cooling_time: minimum time (in seconds) between the switch heater turning off and the first sweep of the output current (time needed by the switch to
+        become superconductive again);
+    - minimum_heater_current: switch heater current reading (in milliampere) above which the heater is considered on;
+    - settle_timeout: maximum time (in seconds) waited for the status and the heater current to confirm the new state of the heater.
+The 'default' profile waits 20 seconds after each change of the heater; profiles measured on a magnet can be added to the dictionary and selected by name, or given
+directly as a dictionary, when the OxfordIPS object is created.
+"""
+switch_heater_profiles = {'default': {'heating_time': 20., 'cooling_time': 20., 'minimum_heater_current': 1., 'settle_timeout': 60.}}
+
+class IPSStatus(Cryostat.StatusRecord):
+    """
+    This class is the status record of the Oxford Intelligent Power Supply, decoded from a status string like 'X00A0C3H0M00P03' (see the StatusRecord
+    class). Its fields are integers:
+        - system_status: 0 normal, 1 magnet quenched, 2 over heated, 4 warming up, 8 fault;
+        - limits: 0 normal, 1 on positive voltage limit, 2 on negative voltage limit, 4 outside negative current limit, 8 outside positive current limit;
+        - activity: 0 hold, 1 to set point, 2 to zero, 4 clamped;
+        - control: 0-3 local/remote and locked/unlocked, 4-7 auto-run-down;
+        - switch_heater: 0 off with magnet at zero, 1 on, 2 off with magnet at field, 5 fault, 8 no switch heater fitted;
+        - sweep_mode: 0 amps fast, 1 field fast, 4 amps slow, 5 field slow;
+        - sweeping: 0 at rest, 1 sweeping, 2 sweep limiting, 3 sweeping and sweep limiting;
+        - polarity, contactors: the polarity and contactors status (P part of the status string).
+    """
+    __slots__ = ('system_status', 'limits', 'activity', 'control', 'switch_heater', 'sweep_mode', 'sweeping', 'polarity', 'contactors')
+    instrument = 'IPS'
+    value_names = {'system_status': {0: 'normal', 1: 'quenched', 2: 'over heated', 4: 'warming up', 8: 'fault'}, 'activity': {0: 'hold', 1: 'to set point', 2: 'to zero', 4: 'clamped'},
+                   'switch_heater': {0: 'off at zero', 1: 'on', 2: 'off at field', 5: 'fault', 8: 'not fitted'}, 'sweep_mode': {0: 'amps fast', 1: 'field fast', 4: 'amps slow', 5: 'field slow'},
+                   'sweeping': {0: 'at rest', 1: 'sweeping', 2: 'sweep limiting', 3: 'sweeping and sweep limiting'}}
+    X_m_messages = {0: 'Magnet NORMAL.', 1: 'Magnet QUENCHED.', 2: 'Power supply OVER HEATED.', 4: 'Magnet is WARMING UP.', 8: 'Magnet is at FAULT.'}
+    X_n_messages = {0: 'Power supply NORMAL.\n', 1: 'Power supply ON POSITIVE VOLTAGE LIMIT.\n', 2: 'Power supply ON NEGATIVE VOLTAGE LIMIT.\n', 4: 'Power supply OUTSIDE NEGATIVE CURRENT LIMIT.\n', 8: 'Power supply OUTSIDE POSITIVE CURRENT LIMIT.\n'}
+    A_messages = {0: 'Power supply output is in HOLD state.\n', 1: 'Power supply output is sweeping TO SET POINT.\n', 2: 'Power supply output is sweeping TO ZERO.\n', 4: 'Power supply output is CLAMPED.\n'}
+    C_messages = {0: 'Power supply in LOCAL AND LOCKED.\n', 1: 'Power supply in REMOTE AND LOCKED.\n', 2: 'Power supply in LOCAL AND UNLOCKED.\n', 3: 'Power supply in REMOTE AND UNLOCKED.\n', 4: 'Power supply in AUTO-RUN-DOWN.\n', 5: 'Power supply in AUTO-RUN-DOWN.\n', 6: 'Power supply in AUTO-RUN-DOWN.\n', 7: 'Power supply in AUTO-RUN-DOWN.\n'}
+    H_messages = {0: 'Switch heater is OFF with MAGNET AT ZERO field.\n', 1: 'Switch heater is ON.\n', 2: 'Switch heater is OFF with MAGNET AT FIELD.\n', 5: 'Switch heater is at FAULT.\n', 8: 'There is NO SWITCH HEATER fitted.\n'}
+    M_m_messages = {0: 'Power supply in AMPS FAST sweep mode.', 1: 'Power supply in FIELD FAST sweep mode.', 4: 'Power supply in AMPS SLOW sweep mode.', 5: 'Power supply in FIELD SLOW sweep mode.'}
+    M_n_messages = {0: 'Power supply is AT REST.\n', 1: 'Power supply is SWEEPING (current in magnet).\n', 2: 'Power supply is SWEEP LIMITING (current in switch)).\n', 3: 'Power supply is SWEEPING (current in magnet) buth with a SWEEP LIMITING in rate.\n'}
+    P_m_messages = {0: 'Polarities: POS, POS, POS.', 1: 'Polarities: POS, POS, NEG.', 2: 'Polarities: POS, NEG, POS.', 3: 'Polarities: POS, NEG, NEG.', 4: 'Polarities: NEG, POS, POS.', 5: 'Polarities: NEG, POS, NEG.', 6: 'Polarities: NEG, NEG, POS.', 7: 'Polarities: NEG, NEG, NEG.'}
+    P_n_messages = {1: 'Negative contactor closed.', 2: 'Positive contactor closed.', 3: 'Both contactors open.', 4: 'Both contactors closed.', 7: 'Output clamped.'}
+
+    @classmethod
+    def _fields_(cls, raw):
+        return tuple(int(raw[i], 16) for i in (1, 2, 4, 6, 8, 10, 11, 13, 14))
+
+    def _render_(self):
+        return (self.X_m_messages.get(self.system_status, '') + ' ' + self.X_n_messages.get(self.limits, '\n') + self.A_messages.get(self.activity, '\n') + self.C_messages.get(self.control, '\n') +
+                self.H_messages.get(self.switch_heater, '\n') + self.M_m_messages.get(self.sweep_mode, '') + ' ' + self.M_n_messages.get(self.sweeping, '\n') + self.P_m_messages.get(self.polarity, '') + ' ' +
+                self.P_n_messages.get(self.contactors, ''))
+
+    @property
+    def at_rest(self):
+        return self.sweeping == 0
+
+    @property
+    def heater_on(self):
+        return self.switch_heater == 1
 
 class OxfordIPS(Cryostat.Cryostat):
     """
     This class is a wrapper used as a container of the function used to interface an Oxford Intelligent Power Supply with a PC employing a IEEE488 (GPIB) interface and/or,
     if equipped with the Oxford ISOBUS, also the Oxford ISOBUS interface.
+
+    The readings that change by themselves during the ramps (output_current, output_voltage, magnet_current, output_field, persistent_current,
+    persistent_field and switch_heater_current) are live: they are queried every time they are read. All the other readings (set points, sweep rates,
+    lead_resistance, magnet_inductance...) are lazy: they are queried the first time they are read, and then updated only by their get_*_reading
+    functions or queried again after being invalidated with the invalidate_readings function.
+
+    The end of the magnet ramps is waited by the wait_for_ramp function, which sleeps until ramp_margin seconds before the predicted end of the ramp (at
+    most ramp_sleep_limit seconds at a time, predicting the end again after each sleep) and then polls the status every ramp_poll_interval seconds. The switch heater is changed by the settle_switch_heater function, which waits according to
+    the calibration profile of the magnet switch (see the switch_heater_profiles dictionary).
     """
-    def __init__(self, manager, GPIB_adress = None, read_terminator = 'CR', write_terminator = 'CR', ISOBUS_master = False, ISOBUS_linked = False, ISOBUS_adress = None, extended_resolution = True, line_feed = False):
+    unlocked_functions = ('set_non_persistent_current', 'set_persistent_current', 'set_non_persistent_field', 'set_persistent_field', 'wait_for_ramp', 'settle_switch_heater')
+    ramp_margin = 1.
+    ramp_poll_interval = 0.1
+    ramp_sleep_limit = 5.
+
+    output_current = Cryostat.LazyReading('get_output_current_reading', live = True)
+    output_voltage = Cryostat.LazyReading('get_output_voltage_reading', live = True)
+    magnet_current = Cryostat.LazyReading('get_magnet_current_reading', live = True)
+    current_set_point = Cryostat.LazyReading('get_current_set_point_reading')
+    current_sweep_rate = Cryostat.LazyReading('get_current_sweep_rate_reading')
+    output_field = Cryostat.LazyReading('get_output_field_reading', live = True)
+    field_set_point = Cryostat.LazyReading('get_field_set_point_reading')
+    field_sweep_rate = Cryostat.LazyReading('get_field_sweep_rate_reading')
+    software_voltage_limit = Cryostat.LazyReading('get_software_voltage_limit_reading')
+    persistent_current = Cryostat.LazyReading('get_persistent_current_reading', live = True)
+    trip_current = Cryostat.LazyReading('get_trip_current_reading')
+    persistent_field = Cryostat.LazyReading('get_persistent_field_reading', live = True)
+    trip_field = Cryostat.LazyReading('get_trip_field_reading')
+    switch_heater_current = Cryostat.LazyReading('get_switch_heater_current_reading', live = True)
+    safe_current_negative_limit = Cryostat.LazyReading('get_safe_current_negative_limit_reading')
+    safe_current_positive_limit = Cryostat.LazyReading('get_safe_current_positive_limit_reading')
+    lead_resistance = Cryostat.LazyReading('get_lead_resistance_reading')
+    magnet_inductance = Cryostat.LazyReading('get_magnet_inductance_reading')
+
+    def __init__(self, manager, GPIB_adress = None, read_terminator = 'CR', write_terminator = 'CR', ISOBUS_master = False, ISOBUS_linked = False, ISOBUS_adress = None, extended_resolution = True, line_feed = False, switch_heater_profile = 'default'):
         """
         This function is used to initialize the object corresponding to the Oxford Intelligent Power Supply instrument.
         
@@ -23,50 +115,18 @@ class OxfordIPS(Cryostat.Cryostat):
             - ISOBUS_adress: if ISOBUS_linked is set to True, this parameter is used to set a single digit number from 1 to 8 that gives the correct ISOBUS adress for the
                 ISOBUS linked instrument;
             - extended_resolution = if set to true, IPS will extend its resolution on field and current measurements by one digit;
-            - line_feed: if set to true, IPS will send a line feed character after each carriage return character.
+            - line_feed: if set to true, IPS will send a line feed character after each carriage return character;
+            - switch_heater_profile: name of the calibration profile of the magnet switch (see the switch_heater_profiles dictionary) or dictionary with
+                the values that differ from the default profile.
         """
+        self.switch_heater_profile = dict(switch_heater_profiles['default'])
+        self.switch_heater_profile.update(switch_heater_profiles[switch_heater_profile] if isinstance(switch_heater_profile, str) else switch_heater_profile)
+        self.switch_heater_time = None
         Cryostat.Cryostat.__init__(self, manager, GPIB_adress_int = GPIB_adress, read_terminator_int = read_terminator, write_terminator_int = write_terminator, ISOBUS_master_int = ISOBUS_master, ISOBUS_linked_int = ISOBUS_linked, ISOBUS_adress_int = ISOBUS_adress)
         self.get_version_string()
         self.set_control_mode(True, True)
         self.set_communication_protocol(extended_resolution, line_feed)
         self.extended_resolution = extended_resolution
-        self.messages = self._messages_dictionary_()
-        self.output_current = None
-        self.output_voltage = None
-        self.magnet_current = None
-        self.current_set_point = None
-        self.current_sweep_rate = None
-        self.output_field = None
-        self.field_set_point = None
-        self.field_sweep_rate = None
-        self.software_voltage_limit = None
-        self.persistent_current = None
-        self.trip_current = None
-        self.persistent_field = None
-        self.trip_field = None
-        self.switch_heater_current = None
-        self.safe_current_negative_limit = None
-        self.safe_current_positive_limit = None
-        self.lead_resistance = None
-        self.magnet_inductance = None
-        self.get_output_current_reading()
-        self.get_output_voltage_reading()
-        self.get_magnet_current_reading()
-        self.get_current_set_point_reading()
-        self.get_current_sweep_rate_reading()
-        self.get_output_field_reading()
-        self.get_field_set_point_reading()
-        self.get_field_sweep_rate_reading()
-        self.get_software_voltage_limit_reading()
-        self.get_persistent_current_reading()
-        self.get_trip_current_reading()
-        self.get_persistent_field_reading()
-        self.get_trip_field_reading()
-        self.get_switch_heater_current_reading()
-        self.get_safe_current_negative_limit_reading()
-        self.get_safe_current_positive_limit_reading()
-        self.get_lead_resistance_reading()
-        self.get_magnet_inductance_reading()
         self.set_activity()
                 
     """
@@ -325,7 +385,7 @@ class OxfordIPS(Cryostat.Cryostat):
         """
         try:
             if 'IPS' in self.identity:
-                string = self.instrument.query(self.buffer_radix + 'R21')[1:]
+                string = self.instrument.query(self.buffer_radix + 'R22')[1:]
                 if '?' in string:
                     raise Errors.PSNotResponding
                 self.safe_current_positive_limit = float(string)
@@ -370,13 +430,10 @@ class OxfordIPS(Cryostat.Cryostat):
         """
         try:
             if 'IPS' in self.identity:
-                self.last_queried_status = self.instrument.query(self.buffer_radix + 'X')
-                if '?' in self.last_queried_status:
-                    raise Errors.PSNotResponding
-                self._status_decoder_(self.last_queried_status)
+                self.get_status_string()
             else:
                 raise Errors.IncorrectInstrumentError
-        except (Errors.IncorrectInstrumentError, Errors.PSNotResponding) as error:
+        except Errors.IncorrectInstrumentError as error:
             error.error_handler
             
     """
@@ -405,7 +462,7 @@ class OxfordIPS(Cryostat.Cryostat):
                 elif clamped:
                     self.instrument.query(self.buffer_radix + 'A4')
                 self.get_status()
-                if (hold and not(self.last_queried_status[4] == '0')) or (to_set_point and not(self.last_queried_status[4] == '1')) or (to_zero and not(self.last_queried_status[4] == '2'))  or (clamped and not(self.last_queried_status[4] == '4')):
+                if (hold and not(self.status.activity == 0)) or (to_set_point and not(self.status.activity == 1)) or (to_zero and not(self.status.activity == 2))  or (clamped and not(self.status.activity == 4)):
                     raise Errors.PSNotResponding
             else:
                 raise Errors.IncorrectInstrumentError
@@ -642,8 +699,10 @@ class OxfordIPS(Cryostat.Cryostat):
                     self.instrument.query(self.buffer_radix + 'H1')
                 else:
                     self.instrument.query(self.buffer_radix + 'H0')
+                self.switch_heater_time = time.monotonic()
+                self.invalidate_readings('switch_heater_current', 'persistent_current', 'persistent_field')
                 self.get_status()
-                if (opened and not(self.last_queried_status[8] == '1')) or (not(opened) and (self.last_queried_status[8] == '0' or self.last_queried_status[8] == '2')):
+                if (opened and not(self.status.switch_heater == 1)) or (not(opened) and self.status.switch_heater == 1):
                     raise Errors.PSNotResponding
             else:
                 raise Errors.IncorrectInstrumentError
@@ -665,6 +724,7 @@ class OxfordIPS(Cryostat.Cryostat):
                     else:
                         self.instrument.query(self.buffer_radix + 'I{0:+.3f}'.format(current))
                     self.get_current_set_point_reading()
+                    self.invalidate_readings('field_set_point')
                     if not (self.current_set_point == current):
                         raise Errors.PSNotResponding
                 else:
@@ -689,6 +749,7 @@ class OxfordIPS(Cryostat.Cryostat):
                     else:
                         self.instrument.query(self.buffer_radix + 'J{0:+.4f}'.format(field))
                     self.get_field_set_point_reading()
+                    self.invalidate_readings('current_set_point')
                     if not (self.field_set_point == field):
                         raise Errors.PSNotResponding
                 else:
@@ -725,10 +786,10 @@ class OxfordIPS(Cryostat.Cryostat):
                         self.instrument.query(self.buffer_radix + 'M4')
                 self.get_status()
                 if field_display:
-                    if (sweep_fast_mode and not(self.last_queried_status[10] == '1')) or (not(sweep_fast_mode) and not(self.last_queried_Status[10] == '5')):
+                    if (sweep_fast_mode and not(self.status.sweep_mode == 1)) or (not(sweep_fast_mode) and not(self.status.sweep_mode == 5)):
                         raise Errors.PSNotResponding
                 else:
-                    if (sweep_fast_mode and not(self.last_queried_status[10] == '0')) or (not(sweep_fast_mode) and not(self.last_queried_Status[10] == '4')):
+                    if (sweep_fast_mode and not(self.status.sweep_mode == 0)) or (not(sweep_fast_mode) and not(self.status.sweep_mode == 4)):
                         raise Errors.PSNotResponding
             else:
                 raise Errors.IncorrectInstrumentError
@@ -775,6 +836,7 @@ class OxfordIPS(Cryostat.Cryostat):
                     else:
                         self.instrument.query(self.buffer_radix + 'S{0:+.3f}'.format(rate))
                     self.get_current_sweep_rate_reading()
+                    self.invalidate_readings('field_sweep_rate')
                     if not(self.current_sweep_rate == rate):
                         Errors.PSNotResponding
                 else:
@@ -799,6 +861,7 @@ class OxfordIPS(Cryostat.Cryostat):
                     else:
                         self.instrument.query(self.buffer_radix + 'T{0:+.3f}'.format(rate))
                     self.get_field_sweep_rate_reading()
+                    self.invalidate_readings('current_sweep_rate')
                     if not(self.field_sweep_rate == rate):
                         Errors.PSNotResponding
                 else:
@@ -830,115 +893,137 @@ class OxfordIPS(Cryostat.Cryostat):
     These commands are supplied in order to automating some of the tasks connected with the use of this class.
     """
 
-    def _messages_dictionary_(self):
-        """
-        This function is used to create a dictionary of the possible messages given by the examine_status function, in order to give them to the
-        status_decoder function in order to translate the status string into a comprehensible message for the user.
-        """
-        keys = ('X', 'A', 'C', 'H', 'M', 'P')
-        X_m_messages = {'0': 'Magnet NORMAL.', '1': 'Magnet QUENCHED.', '2': 'Power supply OVER HEATED.', '4': 'Magnet is WARMING UP.', '8': 'Magnet is at FAULT.'}
-        X_n_messages = {'0': 'Power supply NORMAL.\n', '1': 'Power supply ON POSITIVE VOLTAGE LIMIT.\n', '2': 'Power supply ON NEGATIVE VOLTAGE LIMIT.\n', '4': 'Power supply OUTSIDE NEGATIVE CURRENT LIMIT.\n', '8': 'Power supply OUTSIDE POSITIVE CURRENT LIMIT.\n'}
-        A_messages = {'0': 'Power supply output is in HOLD state.\n', '1': 'Power supply output is sweeping TO SET POINT.\n', '2': 'Power supply output is sweeping TO ZERO.\n', '4': 'Power supply output is CLAMPED.\n'}
-        C_messages = {'0': 'Power supply in LOCAL AND LOCKED.\n', '1': 'Power supply in REMOTE AND LOCKED.\n', '2': 'Power supply in LOCAL AND UNLOCKED.\n', '3': 'Power supply in REMOTE AND UNLOCKED.\n', '4': 'Power supply in AUTO-RUN-DOWN.\n', '5': 'Power supply in AUTO-RUN-DOWN.\n', '6': 'Power supply in AUTO-RUN-DOWN.\n', '7': 'Power supply in AUTO-RUN-DOWN.\n'}
-        H_messages = {'0': 'Switch heater is OFF with MAGNET AT ZERO field.\n', '1': 'Switch heater is ON.\n', '2': 'Switch heater is OFF with MAGNET AT FIELD.\n', '5': 'Switch heater is at FAULT.\n', '8': 'There is NO SWITCH HEATER fitted.\n'}
-        M_m_messages = {'0': 'Power supply in AMPS FAST sweep mode.', '1': 'Power supply in FIELD FAST sweep mode.', '4': 'Power supply in AMPS SLOW sweep mode.', '5': 'Power supply in FIELD SLOW sweep mode.'}
-        M_n_messages = {'0': 'Power supply is AT REST.\n', '1': 'Power supply is SWEEPING (current in magnet).\n', '2': 'Power supply is SWEEP LIMITING (current in switch)).\n', '3': 'Power supply is SWEEPING (current in magnet) buth with a SWEEP LIMITING in rate.\n'}
-        P_m_messages = {'0': 'Polarities: POS, POS, POS.', '1': 'Polarities: POS, POS, NEG.', '2': 'Polarities: POS, NEG, POS.', '3': 'Polarities: POS, NEG, NEG.', '4': 'Polarities: NEG, POS, POS.', '5': 'Polarities: NEG, POS, NEG.', '6': 'Polarities: NEG, NEG, POS.', '7': 'Polarities: NEG, NEG, NEG.'}
-        P_n_messages = {'1': 'Negative contactor closed.', '2': 'Positive contactor closed.', '3': 'Both contactors open.', '4': 'Both contactors closed.', '7': 'Output clamped.'}
-        messages = {}
-        for key in keys:
-            if key == 'X':
-                for m in X_m_messages:
-                    for n in X_n_messages:
-                        messages[key, m, n] = X_m_messages[m] + ' ' + X_n_messages[n]
-            elif key == 'A':
-                for n in A_messages:
-                    messages[key, n] = A_messages[n]
-            elif key == 'C':
-                for n in C_messages:
-                    messages[key, n] = C_messages[n]
-            elif key == 'H':
-                for n in H_messages:
-                    messages[key, n] = H_messages[n]
-            elif key == 'M':
-                for m in M_m_messages:
-                    for n in M_n_messages: 
-                        messages[key, m, n] = M_m_messages[m] + ' ' + M_n_messages[n]
-            elif key == 'P':
-                for m in P_m_messages:
-                    for n in P_n_messages:
-                        messages[key, m, n] = P_m_messages[m] + ' ' + P_n_messages[n]
-        return messages
-        
     def _status_decoder_(self, status):
         """
-        This function is used to decodify the status string (obtained by the examine function) in a message that can be understood by users.
+        This function is used to decodify the status string (obtained by the examine function) in a status record (see the IPSStatus class), whose text
+        can be understood by users.
         
         Parameters:
             - status: string obtained by the examine_status function.
         """
-        self.last_decodified_status = ""
-        status_split = (status[:3], status[3:5], status[5:7], status[7:9], status[9:12], status[12:])
-        for status in status_split:
-            if len(status) == 2:
-                key = status[0]
-                n = status[1:]
-                self.last_decodified_status = self.last_decodified_status + self.messages[key, n]
-            else:
-                key = status[0]
-                m = status[1]
-                n = status[2]
-                self.last_decodified_status = self.last_decodified_status + self.messages[key, m, n]
+        self._update_status_(status, IPSStatus)
+
+    def _ramp_time_(self):
+        """
+        This function returns the time (in seconds) that the output needs to reach its target, predicted from the output reading, the set point (zero when
+        sweeping to zero) and the sweep rate, in field or in current according to the sweep mode.
+        """
+        if self.status.sweep_mode & 1:
+            (output, set_point, rate) = (self.output_field, self.field_set_point, self.field_sweep_rate)
+        else:
+            (output, set_point, rate) = (self.output_current, self.current_set_point, self.current_sweep_rate)
+        if output == None or set_point == None or not rate:
+            return 0.
+        target = 0. if self.status.activity == 2 else set_point
+        return 60. * abs(target - output) / abs(rate)
+
+    def wait_for_ramp(self, timeout = None):
+        """
+        This function is used to wait until the power supply is at rest. Instead of polling the status at a fixed pace, it predicts the end of the ramp (see
+        the _ramp_time_ function) and sleeps until ramp_margin seconds before it, without holding the lock of the instrument, then it polls the status every
+        ramp_poll_interval seconds. Each sleep lasts at most ramp_sleep_limit seconds, after which the status is read and the end of the ramp is predicted
+        again, so that a changed sweep rate or set point is noticed. If the ramp goes on longer than predicted (like when the sweep rate is limited), the
+        prediction is made again after two margins of fast polling. The sweep rates are read again from the power supply at every call, since they can be
+        changed from its front panel.
+
+        Parameters:
+            - timeout: maximum waiting time (in seconds), after which a PSRampTimeout error is reported and raised again to the caller (no limit if None).
+        """
+        try:
+            deadline = time.monotonic() + timeout if timeout != None else None
+            fast_polling_end = 0.
+            self.invalidate_readings('current_sweep_rate', 'field_sweep_rate')
+            self.get_status()
+            while not self.status.at_rest:
+                now = time.monotonic()
+                if deadline != None and now >= deadline:
+                    raise Errors.PSRampTimeout(timeout)
+                sleep_time = self.ramp_poll_interval
+                if now >= fast_polling_end:
+                    remaining = self._ramp_time_() - self.ramp_margin
+                    if remaining > self.ramp_poll_interval:
+                        sleep_time = min(remaining, self.ramp_sleep_limit)
+                    else:
+                        fast_polling_end = now + 2 * self.ramp_margin
+                if deadline != None:
+                    sleep_time = min(sleep_time, max(deadline - now, 0.))
+                time.sleep(sleep_time)
+                self.get_status()
+        except Errors.PSRampTimeout as error:
+            error.warning_handler()
+            raise
+
+    def settle_switch_heater(self, opened):
+        """
+        This function is used to bring the switch heater in the required state and to wait for the superconductive switch to settle. If the heater is
+        already in that state (or no switch heater is fitted) the heater is not cycled. Otherwise the heater is set, its new state is confirmed both by the
+        status and by the switch heater current, and then the function waits until the heating (or cooling) time of the calibration profile has passed
+        since the heater has been set, without holding the lock of the instrument. A PSSwitchHeaterNotSettled error is reported and raised again to the caller
+        if the state is not confirmed within the settle timeout of the profile, so that a sequence can put the magnet in a safe state before stopping.
+
+        Parameters:
+            - opened: if set to True, the heater is turned on (switch resistive), otherwise it is turned off (switch superconductive).
+        """
+        try:
+            profile = self.switch_heater_profile
+            self.get_status()
+            if self.status.switch_heater == 8:
+                return
+            if self.status.heater_on != opened or self.status.switch_heater == 5:
+                self.set_switch_heater(opened = opened)
+                deadline = self.switch_heater_time + profile['settle_timeout']
+                while True:
+                    self.get_status()
+                    if self.status.heater_on == opened:
+                        heater_current = self.switch_heater_current
+                        if heater_current != None and (heater_current >= profile['minimum_heater_current']) == opened:
+                            break
+                    if time.monotonic() >= deadline:
+                        raise Errors.PSSwitchHeaterNotSettled(opened, profile['settle_timeout'])
+                    time.sleep(self.ramp_poll_interval)
+            if self.switch_heater_time != None:
+                dwell = profile['heating_time'] if opened else profile['cooling_time']
+                remaining = self.switch_heater_time + dwell - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+        except Errors.PSSwitchHeaterNotSettled as error:
+            error.warning_handler()
+            raise
 
     def set_non_persistent_current(self, current):
         """
         This command is used to set a new non persistent current set point in a sequence, automating the switch heating and field sweep sequence.
         """
         self.get_status()
-        if not(self.last_queried_status[8] == '1'):
+        if not self.status.heater_on:
             self.get_current_set_point_reading()
-            self.get_persistent_current_reading()
-            if not self.current_set_point == self.persistent_current:
-                self.set_target_current(self.persistent_current)
-            if not(self.last_queried_status[4] == '1'):
+            persistent_current = self.persistent_current
+            if not self.current_set_point == persistent_current:
+                self.set_target_current(persistent_current)
+            if not(self.status.activity == 1):
                 self.set_activity(hold = False, to_set_point = True)
-                self.get_status()
-                while not (self.last_queried_status[11] == '0'):
-                    time.sleep(1)
-                    self.get_status()
-            self.set_switch_heater(opened = True)
-            time.sleep(20)
+                self.wait_for_ramp()
+            self.settle_switch_heater(opened = True)
         self.set_target_current(current)
-        self.get_status()
-        while not (self.last_queried_status[11] == '0'):
-            time.sleep(1)
-            self.get_status()
+        self.wait_for_ramp()
 
     def set_persistent_current(self, current):
         """
         This command is used to set a new persistent current set point in a sequence, automating the switch heating and field sweep sequence.
         """
         self.get_status()
-        if not(self.last_queried_status[8] == '1'):
+        if not self.status.heater_on:
             self.get_current_set_point_reading()
-            self.get_persistent_current_reading()
-            if not self.current_set_point == self.persistent_current:
-                self.set_target_current(self.persistent_current)
-            if not(self.last_queried_status[4] == '1'):
+            persistent_current = self.persistent_current
+            if not self.current_set_point == persistent_current:
+                self.set_target_current(persistent_current)
+            if not(self.status.activity == 1):
                 self.set_activity(hold = False, to_set_point = True)
-                self.get_status()
-                while not (self.last_queried_status[11] == '0'):
-                    time.sleep(1)
-                    self.get_status()
-            self.set_switch_heater(opened = True)
-            time.sleep(20)
+                self.wait_for_ramp()
+            self.settle_switch_heater(opened = True)
         self.set_target_current(current)
-        self.get_status()
-        while not (self.last_queried_status[11] == '0'):
-            time.sleep(1)
-            self.get_status()
-        self.set_switch_heater(opened = False)
-        time.sleep(20)
+        self.wait_for_ramp()
+        self.settle_switch_heater(opened = False)
         self.set_activity(hold = False, to_zero = True)
 
     def set_non_persistent_field(self, field):
@@ -946,56 +1031,50 @@ class OxfordIPS(Cryostat.Cryostat):
         This command is used to set a new non persistent field set point in a sequence, automating the switch heating and field sweep sequence.
         """
         self.get_status()
-        if not(self.last_queried_status[8] == '1'):
+        if not self.status.heater_on:
             self.get_field_set_point_reading()
-            self.get_persistent_field_reading()
-            if not self.field_set_point == self.persistent_field:
-                self.set_target_field(self.persistent_field)
-            if not(self.last_queried_status[4] == '1'):
+            persistent_field = self.persistent_field
+            if not self.field_set_point == persistent_field:
+                self.set_target_field(persistent_field)
+            if not(self.status.activity == 1):
                 self.set_activity(hold = False, to_set_point = True)
-                self.get_status()
-                while not (self.last_queried_status[11] == '0'):
-                    time.sleep(1)
-                    self.get_status()
-            self.set_switch_heater(opened = True)
-            time.sleep(20)
+                self.wait_for_ramp()
+            self.settle_switch_heater(opened = True)
         self.set_target_field(field)
-        self.get_status()
-        while not (self.last_queried_status[11] == '0'):
-            time.sleep(1)
-            self.get_status()
+        self.wait_for_ramp()
 
-    def set_persistent_field(self, current):
+    def set_persistent_field(self, field):
         """
         This command is used to set a new persistent field set point in a sequence, automating the switch heating and field sweep sequence.
         """
         self.get_status()
-        if not(self.last_queried_status[8] == '1'):
+        if not self.status.heater_on:
             self.get_field_set_point_reading()
-            self.get_persistent_field_reading()
-            if not self.field_set_point == self.persistent_field:
-                self.set_target_field(self.persistent_field)
-            if not(self.last_queried_status[4] == '1'):
+            persistent_field = self.persistent_field
+            if not self.field_set_point == persistent_field:
+                self.set_target_field(persistent_field)
+            if not(self.status.activity == 1):
                 self.set_activity(hold = False, to_set_point = True)
-                self.get_status()
-                while not (self.last_queried_status[11] == '0'):
-                    time.sleep(1)
-                    self.get_status()
-            self.set_switch_heater(opened = True)
-            time.sleep(20)
+                self.wait_for_ramp()
+            self.settle_switch_heater(opened = True)
         self.set_target_field(field)
-        self.get_status()
-        while not (self.last_queried_status[11] == '0'):
-            time.sleep(1)
-            self.get_status()
-        self.set_switch_heater(opened = False)
-        time.sleep(20)
+        self.wait_for_ramp()
+        self.settle_switch_heater(opened = False)
         self.set_activity(hold = False, to_zero = True)
 
     def close(self):
         """
         This function is used to put the IPS in a safe state, in which the ILM can be used in LOCAL mode before cutting the link between controller and instrument.
         """
+        if self.closed:
+            return
         self.set_switch_heater(opened=False)
         self.set_activity(hold=False, clamped=True)
-        self._general_close_()
\ No newline at end of file
+        self._general_close_()
+
+class AsyncOxfordIPS(AsyncManager.AsyncDriver):
+    """
+    This class is the asynchronous variant of the OxfordIPS class: all its functions are awaitable and are executed by the executor of the board of the
+    Oxford Intelligent Power Supply (see the AsyncManager.py code).
+    """
+    driver_class = OxfordIPS
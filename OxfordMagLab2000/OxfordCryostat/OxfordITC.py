@@ -1,10 +1,69 @@
-from ..General import Cryostat,Errors
+from ..General import AsyncManager,Cryostat,Errors
+
+class ITCStatus(Cryostat.StatusRecord):
+    """
+    This class is the status record of the Oxford Intelligent Temperature Controller, decoded from a status string like 'X0A0C3S00H1L0' (see the
+    StatusRecord class). Its fields are integers:
+        - system_status: 0 normal;
+        - auto_control: bit 0 set if the heater is in AUTO mode, bit 1 set if the gas flow is in AUTO mode;
+        - control: 0-3 local/remote and locked/unlocked;
+        - sweep_step: 0 if the sweep is not active, otherwise 2n - 1 while sweeping to the step n set temperature and 2n while holding it;
+        - controlling_sensor: the number of the sensor that controls the temperature (1, 2 or 3);
+        - auto_PIDs: 1 if the auto (learned) PIDs are enabled, 0 otherwise.
+    """
+    __slots__ = ('system_status', 'auto_control', 'control', 'sweep_step', 'controlling_sensor', 'auto_PIDs')
+    instrument = 'ITC'
+    value_names = {'auto_control': {0: 'heater manual, gas flow manual', 1: 'heater auto, gas flow manual', 2: 'heater manual, gas flow auto', 3: 'heater auto, gas flow auto'},
+                   'sweep_step': {0: 'not sweeping'}, 'auto_PIDs': {0: 'disabled', 1: 'enabled'}}
+    X_messages = {0: 'Temperature controller NORMAL operative mode.\n'}
+    A_messages = {0: 'Heater in MANUAL mode. Gas flow in MANUAL mode.\n', 1: 'Heater in AUTO mode. Gas flow in MANUAL mode.\n', 2: 'Heater in MANUAL mode. Gas flow in AUTO mode.\n', 3: 'Heater in AUTO mode. Gas flow in AUTO mode.\n'}
+    C_messages = {0: 'Temperature controller in LOCAL and LOCKED state.\n', 1: 'Temperature controller in REMOTE and LOCKED state.\n', 2: 'Temperature controller in LOCAL and UNLOCKED state.\n', 3: 'Temperature controller in REMOTE and UNLOCKED state.\n'}
+    H_messages = {1: 'Temperature is controlled by CHANNEL 1 sensor.\n', 2: 'Temperature is controlled by CHANNEL 2 sensor.\n', 3: 'Temperature is controlled by CHANNEL 3 sensor.\n'}
+    L_messages = {0: 'Auto (learned) PIDs are DISABLED.', 1: 'Auto (learned) PIDs are ENABLED.'}
+
+    @classmethod
+    def _fields_(cls, raw):
+        return (int(raw[1], 16), int(raw[3], 16), int(raw[5], 16), int(raw[7:9]), int(raw[10], 16), int(raw[12], 16))
+
+    def _render_(self):
+        if self.sweep_step == 0:
+            sweep_message = 'Sweep mode is not active.\n'
+        elif self.sweep_step % 2 == 1:
+            sweep_message = 'Sweeping to step number {0:G} set temperature.\n'.format((self.sweep_step + 1) // 2)
+        else:
+            sweep_message = 'Holding the step number {0:G} set temperature.\n'.format(self.sweep_step // 2)
+        return (self.X_messages.get(self.system_status, '\n') + self.A_messages.get(self.auto_control, '\n') + self.C_messages.get(self.control, '\n') + sweep_message +
+                self.H_messages.get(self.controlling_sensor, '\n') + self.L_messages.get(self.auto_PIDs, ''))
+
+    @property
+    def heater_automatic(self):
+        return bool(self.auto_control & 1)
+
+    @property
+    def gas_flow_automatic(self):
+        return bool(self.auto_control & 2)
 
 class OxfordITC(Cryostat.Cryostat):
     """
     This class is a wrapper used as a container of the function used to interface an Oxford Intelligent Temperature Controller with a PC employing a IEEE488
     (GPIB) interface.
+
+    All the fields given by the status string (heater_automatic_control, needle_valve_automatic_control, auto_PIDS_mode, heater_controlling_sensor and
+    sweep_step) are derived from a single X reply each time get_status is called. The R readings that change by themselves (the sensor temperatures and
+    the heater and needle valve operating points) are live: they are queried every time they are read. The other R readings (temperature_set_point and
+    the PID terms) are lazy: they are queried the first time they are read, and then updated only by their get_*_reading functions or queried again
+    after being invalidated with the invalidate_readings function.
     """
+    temperature_set_point = Cryostat.LazyReading('get_temperature_set_point_reading')
+    sensor_1_temperature = Cryostat.LazyReading('get_sensor_1_temperature_reading', live = True)
+    sensor_2_temperature = Cryostat.LazyReading('get_sensor_2_temperature_reading', live = True)
+    sensor_3_temperature = Cryostat.LazyReading('get_sensor_3_temperature_reading', live = True)
+    heater_operating_point = Cryostat.LazyReading('get_heater_operating_point_reading', live = True)
+    needle_valve_operating_point = Cryostat.LazyReading('get_needle_valve_operating_point_reading', live = True)
+    P_term = Cryostat.LazyReading('get_P_term_reading')
+    I_term = Cryostat.LazyReading('get_I_term_reading')
+    D_term = Cryostat.LazyReading('get_D_term_reading')
+
     def __init__(self, manager, GPIB_adress = None, read_terminator = 'CR', write_terminator = 'CR', ISOBUS_master = False, ISOBUS_linked = False, ISOBUS_adress = None, line_feed = False):
         """
         This function is used to initialize the object corresponding to the Oxford Intelligent Temperature Controller instrument.
@@ -28,16 +87,6 @@ class OxfordITC(Cryostat.Cryostat):
         self.get_version_string()
         self.set_control_mode(True, True)
         self.set_communication_protocol(line_feed)
-        self.messages = self._messages_dictionary_()
-        self.temperature_set_point = None
-        self.sensor_1_temperature = None
-        self.sensor_2_temperature = None
-        self.sensor_3_temperature = None
-        self.heater_operating_point = None
-        self.needle_valve_operating_point = None
-        self.P_term = None
-        self.I_term = None
-        self.D_term = None
         self.heater_automatic_control = None
         self.needle_valve_automatic_control = None
         self.auto_PIDS_mode = None
@@ -45,19 +94,6 @@ class OxfordITC(Cryostat.Cryostat):
         self.maximum_heater_output = None
         self.sweep_step = None
         self.get_status()
-        self.get_temperature_set_point_reading()
-        self.get_sensor_1_temperature_reading()
-        self.get_sensor_2_temperature_reading()
-        self.get_sensor_3_temperature_reading()
-        self.get_heater_operating_point_reading()
-        self.get_needle_valve_operating_point_reading()
-        self.get_P_term_reading()
-        self.get_I_term_reading()
-        self.get_D_term_reading()
-        self.get_temperature_control_mode_reading()
-        self.get_auto_PIDs_mode_reading()
-        self.get_heater_controlling_sensor_reading()
-        self.get_sweep_step_reading()
 
     """
     Monitor commands
@@ -225,9 +261,7 @@ class OxfordITC(Cryostat.Cryostat):
         try:
             if 'ITC' in self.identity:
                 self.get_status_string()
-                if '?' in self.last_queried_status:
-                    raise Errors.TCNotResponding
-                self._status_decoder_(self.last_queried_status)
+                self._status_fields_(self.status)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.TCNotResponding, Errors.IncorrectInstrumentError) as error:
@@ -452,7 +486,7 @@ class OxfordITC(Cryostat.Cryostat):
                 else:
                     self.instrument.query(self.buffer_radix + 'L0')
                 self.get_auto_PIDs_mode_reading()
-                if not(self.auto_PIDs_mode == auto_PIDs):
+                if not(self.auto_PIDS_mode == auto_PIDs):
                     raise Errors.TCNotResponding
             else:
                 raise Errors.IncorrectInstrumentError
@@ -479,7 +513,6 @@ class OxfordITC(Cryostat.Cryostat):
             if 'ITC' in self.identity:
                 if percentage >= 0 and percentage <= 100:
                     self.instrument.query(self.buffer_radix + 'G{0:G}'.format(percentage))
-                    self.get_needle_valve_operating_point_reading()
                     if not(self.needle_valve_operating_point == percentage):
                         raise Errors.TCNotResponding
                 else:
@@ -494,7 +527,6 @@ class OxfordITC(Cryostat.Cryostat):
             if 'ITC' in self.identity:
                 if percentage >= 0 and percentage <= 100:
                     self.instrument.query(self.buffer_radix + 'O{0:G}'.format(percentage))
-                    self.get_heater_operating_point_reading()
                     if not(self.heater_operating_point == percentage):
                         raise Errors.TCNotResponding
                 else:
@@ -540,8 +572,8 @@ class OxfordITC(Cryostat.Cryostat):
                         self.instrument.query(self.buffer_radix + 'S0')
                     else:
                         self.instrument.query(self.buffer_radix + 'S{0:G}'.format(starting_point))
-                    self.get_sweep_reading()
-                    if not (self.sweep_step == 0 and stop_sweep) or not (self.sweep_step == starting_point):
+                    self.get_sweep_step_reading()
+                    if (stop_sweep and not (self.sweep_step == 0)) or (not stop_sweep and not (self.sweep_step == starting_point)):
                         raise Errors.TCNotResponding
                 else:
                     raise Errors.TCWrongSweepStartingPoint(starting_point)
@@ -572,93 +604,56 @@ class OxfordITC(Cryostat.Cryostat):
     These commands are supplied in order to automating some of the tasks connected with the use of this class.
     """
 
-    def _messages_dictionary_(self):
-        keys = ('X', 'A', 'C', 'S', 'H', 'L')
-        X_messages = {'0': 'Temperature controller NORMAL operative mode.\n'}
-        A_messages = {'0': 'Heater in MANUAL mode. Gas flow in MANUAL mode.\n', '1': 'Heater in AUTO mode. Gas flow in MANUAL mode.\n', '2': 'Heater in MANUAL mode. Gas flow in AUTO mode.\n', '3': 'Heater in AUTO mode. Gas flow in AUTO mode.\n'}
-        C_messages = {'0': 'Temperature controller in LOCAL and LOCKED state.\n', '1': 'Temperature controller in REMOTE and LOCKED state.\n', '2': 'Temperature controller in LOCAL and UNLOCKED state.\n', '3': 'Temperature controller in REMOTE and UNLOCKED state.\n'}
-        H_messages = {'1': 'Temperature is controlled by CHANNEL 1 sensor.\n', '2': 'Temperature is controlled by CHANNEL 2 sensor.\n', '3': 'Temperature is controlled by CHANNEL 3 sensor.\n'}
-        L_messages = {'0': 'Auto (learned) PIDs are DISABLED.', '1': 'Auto (learned) PIDs are ENABLED.'}
-        messages = {}
-        for key in keys:
-            if key == 'X':
-                for n in X_messages:
-                    messages[key, n] = X_messages[n]
-            elif key == 'A':
-                for n in A_messages:
-                    messages[key, n] = A_messages[n]
-            elif key == 'C':
-                for n in C_messages:
-                    messages[key, n] = C_messages[n]
-            elif key == 'S':
-                messages[key,'00'] = 'Sweep mode is not active.\n'
-                for nn in range(1,32):
-                    if nn % 2 == 1:
-                        messages[key, nn] = 'Sweeping to step number {0:G} set temperature.\n'.format((nn + 1) // 2)
-                    else:
-                        messages[key, nn] = 'Holding the step number {0:G} set temperature.\n'.format(nn // 2)
-            elif key == 'H':
-                for n in H_messages:
-                    messages[key, n] = H_messages[n]
-            elif key == 'L':
-                for n in L_messages:
-                    messages[key, n] = L_messages[n]
-        return messages
-        
     def _status_decoder_(self, status):
-        self.last_decodified_status = ""
-        status_split = (status[:2], status[2:4], status[4:6], status[6:9], status[9:11], status[11:])
-        for string in status_split:
-            if len(string) == 2:
-                key = string[0]
-                n = string[1]
-                self.last_decodified_status = self.last_decodified_status + self.messages[key, n]
-            else:
-                key = string[0]
-                if key == 'S':
-                    nn = string[1:]
-                    self.last_decodified_status = self.last_decodified_status + self.messages[key, nn]
-                else:
-                    m = string[1]
-                    n = string[2]
-                    self.last_decodified_status = self.last_decodified_status + self.messages[key, m, n]
+        """
+        This function is used to decodify the status string (obtained by the get_status function) in a status record (see the ITCStatus class), whose
+        text can be understood by users.
+
+        Parameters:
+            - status: string obtained by the get_status function.
+        """
+        self._update_status_(status, ITCStatus)
 
     def close(self):
         """
         This function is used to put the ILM in a safe state, in which the ILM can be used in LOCAL mode before cutting the link between controller and instrument.
         """
+        if self.closed:
+            return
         self.set_temperature_control_mode(False, False)
         self.set_temperature_set_point(0)
         self.set_manual_heater(0)
         self.set_manual_gas_flow(0)
         self._general_close_()
 
+    def _status_fields_(self, status):
+        """
+        This function is used to derive all the status based fields of the ITC from a single status record.
+
+        Parameters:
+            - status: the status record (see the ITCStatus class) of the status string returned by the X command.
+        """
+        self.heater_automatic_control = status.heater_automatic
+        self.needle_valve_automatic_control = status.gas_flow_automatic
+        self.sweep_step = float(status.sweep_step)
+        self.heater_controlling_sensor = status.controlling_sensor
+        self.auto_PIDS_mode = status.auto_PIDs == 1
+
     def get_temperature_control_mode_reading(self):
         self.get_status()
-        if float(self.last_queried_status[3]) == 0:
-            self.heater_automatic_control = False
-            self.needle_valve_automatic_control = False
-        elif float(self.last_queried_status[3]) == 1:
-            self.heater_automatic_control = True
-            self.needle_valve_automatic_control = False
-        elif float(self.last_queried_status[3]) == 2:
-            self.heater_automatic_control = False
-            self.needle_valve_automatic_control = True
-        elif float(self.last_queried_status[3]) == 3:
-            self.heater_automatic_control = True
-            self.needle_valve_automatic_control = True
 
     def get_auto_PIDs_mode_reading(self):
         self.get_status()
-        if float(self.last_queried_status[12]) == 0:
-            self.auto_PIDS_mode = False
-        elif float(self.last_queried_status[12]) == 1:
-            self.auto_PIDS_mode = True
 
     def get_heater_controlling_sensor_reading(self):
         self.get_status()
-        self.heater_controlling_sensor = int(self.last_queried_status[10])
 
     def get_sweep_step_reading(self):
         self.get_status()
-        self.sweep_step = float(self.last_queried_status[7:9])
\ No newline at end of file
+
+class AsyncOxfordITC(AsyncManager.AsyncDriver):
+    """
+    This class is the asynchronous variant of the OxfordITC class: all its functions are awaitable and are executed by the executor of the board of the
+    Oxford Intelligent Temperature Controller (see the AsyncManager.py code).
+    """
+    driver_class = OxfordITC
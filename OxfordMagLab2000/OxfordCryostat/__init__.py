@@ -1,3 +1,3 @@
-import OxfordILM
-import OxfordIPS
-import OxfordITC
+from OxfordMagLab2000.OxfordCryostat import OxfordILM
+from OxfordMagLab2000.OxfordCryostat import OxfordIPS
+from OxfordMagLab2000.OxfordCryostat import OxfordITC
@@ -1,9 +1,87 @@
-from ..General import Instruments,Errors
+import time
+from ..General import AsyncManager,Instruments,Errors
+
+class InputState:
+    """
+    This class stores the state of one input (A or B) of a Lakeshore Model 340 temperature controller: each field (like kelvin_reading or filter_parameters)
+    is stored with the time at which it has been read from the instrument, so that the controller can tell which fields are stale. Fields that have not
+    been read yet are None, while names that are not input fields (see the fields tuple) raise an AttributeError.
+    """
+    fields = ('alarm_parameters', 'alarm_status', 'celsius_reading', 'filter_parameters', 'input_curve', 'hardware_setup_parameters', 'type', 'kelvin_reading',
+              'linear_data', 'linear_data_status', 'linear_equation', 'maxmin_data', 'maxmin_status', 'maxmin', 'reading_status', 'sensor_units_reading')
+
+    def __init__(self, input):
+        """
+        Parameters:
+            - input: the name of the input ('A' or 'B').
+        """
+        self.input = input
+        self.values = {}
+        self.timestamps = {}
+
+    def __getattr__(self, name):
+        if name not in self.fields:
+            raise AttributeError(name)
+        return self.values.get(name)
+
+    def update(self, field, value):
+        """
+        This function is used to store the value of a field, together with the current time.
+
+        Parameters:
+            - field: the name of the field;
+            - value: the value read from the instrument.
+        """
+        self.values[field] = value
+        self.timestamps[field] = time.time()
+
+    def age(self, field):
+        """
+        This function returns the time (in seconds) elapsed since the field has been read, or None if it has never been read.
+
+        Parameters:
+            - field: the name of the field.
+        """
+        if field not in self.timestamps:
+            return None
+        return time.time() - self.timestamps[field]
+
+    def is_stale(self, field, max_age = None):
+        """
+        This function returns True if the field has never been read or if it is older than max_age.
+
+        Parameters:
+            - field: the name of the field;
+            - max_age: maximum age (in seconds) of a field that is not stale. If None, a field is stale only if it has never been read.
+        """
+        age = self.age(field)
+        return age == None or (max_age != None and age > max_age)
+
+    def invalidate(self, *fields):
+        """
+        This function is used to mark some fields (all the fields, if none is given) as stale.
+        """
+        for field in (fields if fields != () else list(self.timestamps)):
+            self.timestamps.pop(field, None)
 
 class Lakeshore340(Instruments.Instruments):
     """
     This class is a wrapper that contains all the necessary functions to setup temperature measurement with a Lakeshore Model 340 temperature controller.
+
+    The state of each input is kept in an InputState object (see the inputs attribute). The input_A_* and input_B_* attributes are still available, and
+    are stored in (and read from) the InputState of the corresponding input, so that every reading is timestamped. The refresh function reads again only the
+    fields that are stale. The input setting functions skip the write and its check when the input already holds the given parameters (see the shadow
+    registers of the Instruments class).
     """
+    input_fields = {'alarm_parameters': 'get_input_alarm_parameters_reading', 'alarm_status': 'get_input_alarm_status_reading',
+                    'celsius_reading': 'get_celsius_reading', 'filter_parameters': 'get_input_filter_parameters_reading',
+                    'input_curve': 'get_input_curve_number_reading', 'hardware_setup_parameters': 'get_hardware_input_setup_reading',
+                    'type': 'get_hardware_input_setup_parameters_reading', 'kelvin_reading': 'get_kelvin_reading',
+                    'linear_data': 'get_linear_equation_data_reading', 'linear_data_status': 'get_linear_equation_data_status',
+                    'linear_equation': 'get_linear_equation_parameters_reading',
+                    'maxmin_data': 'get_max_min_data', 'maxmin_status': 'get_max_min_status', 'maxmin': 'get_max_min',
+                    'reading_status': 'get_reading_status', 'sensor_units_reading': 'get_sensor_units_reading'}
+    shadow_indexed_headers = ('ALARM', 'FILTER', 'INCRV', 'INSET', 'INTYPE', 'LINEAR', 'MNMX')
 
     def __init__(self, manager, adress, read_terminator = 'CRLF', write_terminator = 'CRLF', end_or_identify = True, reset = True):
         """
@@ -21,38 +99,7 @@ class Lakeshore340(Instruments.Instruments):
             - reset = boolean parameter that enables (when true) or disables (otherwise) the instrument resetting function execution.
         """
         Instruments.Instruments.__init__(self, manager, adress, read_terminator_int = read_terminator, write_terminator_int = write_terminator, end_or_identify_int = end_or_identify)
-        self.input_A_alarm_parameters = None
-        self.input_B_alarm_parameters = None
-        self.input_A_alarm_status = None
-        self.input_B_alarm_status = None
-        self.input_A_celsius_reading = None
-        self.input_B_celsius_reading = None
-        self.input_A_filter_parameters = None
-        self.input_B_filter_parameters = None
-        self.input_A_input_curve = None
-        self.input_B_input_curve = None
-        self.input_A_hardware_setup_parameters = None
-        self.input_B_hardware_setup_parameters = None
-        self.input_A_type = None
-        self.input_B_type = None
-        self.input_A_kelvin_reading = None
-        self.input_B_kelvin_reading = None
-        self.input_A_linear_data = None
-        self.input_B_linear_data = None
-        self.input_A_linear_data_status = None
-        self.input_B_linear_data_status = None
-        self.input_A_linear_equation = None
-        self.input_B_linear_equation = None
-        self.input_A_maxmin_data = None
-        self.input_B_maxmin_data = None
-        self.input_A_maxmin_status = None
-        self.input_B_maxmin_status = None
-        self.input_A_maxmin = None
-        self.input_B_maxmin = None
-        self.input_A_reading_status = None
-        self.input_B_reading_status = None
-        self.input_A_sensor_units_reading = None
-        self.input_B_sensor_units_reading = None
+        self.inputs = {'A': InputState('A'), 'B': InputState('B')}
         self.last_curve_header = None
         self.last_curve_point = None
         self.last_program_line = None
@@ -66,6 +113,40 @@ class Lakeshore340(Instruments.Instruments):
         self.last_logging_record = None
         if reset:
             self._system_reset_()
+
+    def __getattr__(self, name):
+        if name.startswith('input_') and name[6:8] in ('A_', 'B_') and 'inputs' in self.__dict__:
+            return getattr(self.inputs[name[6]], name[8:])
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('input_') and name[6:8] in ('A_', 'B_') and 'inputs' in self.__dict__:
+            self.inputs[name[6]].update(name[8:], value)
+        else:
+            object.__setattr__(self, name, value)
+
+    def refresh(self, inputs = ('A', 'B'), fields = ('kelvin_reading',), max_age = None):
+        """
+        This function is used to read from the instrument only the stale fields of the given inputs, returning the state of the requested fields. For
+        example refresh(('A', 'B'), ('kelvin_reading',), 0.2) gives the temperatures of both inputs, querying only the ones older than 200 ms.
+
+        Parameters:
+            - inputs: the inputs to be refreshed ('A' and/or 'B');
+            - fields: the names of the fields to be refreshed (the keys of the input_fields dictionary);
+            - max_age: maximum age (in seconds) of a field that is not read again. If None, only the fields never read are queried.
+        """
+        for field in fields:
+            if field not in self.input_fields:
+                raise KeyError('{0!r} is not an input field that can be refreshed (see the input_fields dictionary)'.format(field))
+        result = {}
+        for input in inputs:
+            state = self.inputs[str(input)]
+            result[str(input)] = {}
+            for field in fields:
+                if state.is_stale(field, max_age):
+                    getattr(self, self.input_fields[field])(str(input))
+                result[str(input)][field] = state.values.get(field)
+        return result
             
     def _system_reset_(self):
         """
@@ -98,10 +179,13 @@ class Lakeshore340(Instruments.Instruments):
                 buffer = 'ALARM {0},{1:d}'.format(str(input), on)
                 if on:
                     buffer += ',{0:d},{1:E},{2:E},{3:d},{4:d}'.format(source, high_value, low_value, latch_enable, relay_enable)
-                self.instrument.write(buffer)
-                self.get_input_alarm_parameters_reading(input)
-                if not(input == 'A' and self.input_A_alarm_parameters == (on, source, high_value, low_value, latch_enable, relay_enable)) or not(input == 'B' and self.input_B_alarm_parameters == (on, source, high_value, low_value, latch_enable, relay_enable)):
-                    raise Errors.LS340NotResponding
+                with self._shadow_write_(buffer) as filtered:
+                    if filtered:
+                        self.instrument.write(buffer)
+                        self.get_input_alarm_parameters_reading(input)
+                        expected = (on, source, high_value, low_value, latch_enable, relay_enable) if on else (on,)
+                        if not((str(input) == 'A' and self.input_A_alarm_parameters[:len(expected)] == expected) or (str(input) == 'B' and self.input_B_alarm_parameters[:len(expected)] == expected)):
+                            raise Errors.LS340NotResponding
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LS340NotResponding, Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -112,7 +196,7 @@ class Lakeshore340(Instruments.Instruments):
             if '340' in self.identity:
                 string = self.instrument.query('ALARM? {0}'.format(str(input)))
                 string_list = string.split(',')
-                result = (bool(string_list[0]), int(string_list[1]), float(string_list[2]), float(string_list[3]), bool(string_list[4]), bool(string_list[5]))
+                result = (bool(int(string_list[0])), int(string_list[1]), float(string_list[2]), float(string_list[3]), bool(int(string_list[4])), bool(int(string_list[5])))
                 if str(input) == 'A':
                     self.input_A_alarm_parameters = result
                 else:
@@ -127,7 +211,7 @@ class Lakeshore340(Instruments.Instruments):
             if '340' in self.identity:
                 string = self.instrument.query('ALARMST? {0}'.format(str(input)))
                 string_list = string.split(',')
-                result = (bool(string_list[0]), bool(string_list[1]))
+                result = (bool(int(string_list[0])), bool(int(string_list[1])))
                 if str(input) == 'A':
                     self.input_A_alarm_status = result
                 else:
@@ -156,10 +240,13 @@ class Lakeshore340(Instruments.Instruments):
                 buffer = 'FILTER {0},{1:d}'.format(str(input), on)
                 if on:
                     buffer += ',{0:d},{1:d}'.format(points, percentual_window)
-                self.instrument.write(buffer)
-                self.get_input_filter_parameters_reading(input)
-                if not(input == 'A' and self.input_A_filter_parameters == (on, points, percentual_window)) or not(input == 'B' and self.input_B_filter_parameters == (on, points, percentual_window)):
-                    raise Errors.LS340NotResponding
+                with self._shadow_write_(buffer) as filtered:
+                    if filtered:
+                        self.instrument.write(buffer)
+                        self.get_input_filter_parameters_reading(input)
+                        expected = (on, points, percentual_window) if on else (on,)
+                        if not((str(input) == 'A' and self.input_A_filter_parameters[:len(expected)] == expected) or (str(input) == 'B' and self.input_B_filter_parameters[:len(expected)] == expected)):
+                            raise Errors.LS340NotResponding
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LS340NotResponding, Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -170,7 +257,7 @@ class Lakeshore340(Instruments.Instruments):
             if '340' in self.identity:
                 string = self.instrument.query('FILTER? {0}'.format(str(input)))
                 string_list = string.split(',')
-                result = (bool(string_list[0]), int(string_list[1]), int(string_list[2]))
+                result = (bool(int(string_list[0])), int(string_list[1]), int(string_list[2]))
                 if str(input) == 'A':
                     self.input_A_filter_parameters = result
                 else:
@@ -183,10 +270,13 @@ class Lakeshore340(Instruments.Instruments):
     def set_input_curve_number(self, input, curve_number):
         try:
             if '340' in self.identity:
-                self.instrument.write('INCRV {0},{1:d}'.format(str(input), curve_number))
-                self.get_input_curve_number_reading(input)
-                if not(input == 'A' and self.input_A_input_curve == curve_number) or not(input == 'B' and self.input_B_input_curve == curve_number):
-                    raise Errors.LS340NotResponding
+                buffer = 'INCRV {0},{1:d}'.format(str(input), curve_number)
+                with self._shadow_write_(buffer) as filtered:
+                    if filtered:
+                        self.instrument.write(buffer)
+                        self.get_input_curve_number_reading(input)
+                        if not((str(input) == 'A' and self.input_A_input_curve == curve_number) or (str(input) == 'B' and self.input_B_input_curve == curve_number)):
+                            raise Errors.LS340NotResponding
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LS340NotResponding, Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -208,10 +298,13 @@ class Lakeshore340(Instruments.Instruments):
     def set_hardware_input_setup(self, input, enable = True, compensation = False):
         try:
             if '340' in self.identity:
-                self.instrument.write('INSET {0},{1:d},{2:d}'.format(str(input), enable, compensation))
-                self.get_hardware_input_setup_reading(input)
-                if not(input == 'A' and self.input_A_hardware_setup_parameters == (enable, compensation)) or not(input == 'B' and self.input_B_hardware_setup_parameters == (enable, compensation)):
-                    raise Errors.LS340NotResponding
+                buffer = 'INSET {0},{1:d},{2:d}'.format(str(input), enable, compensation)
+                with self._shadow_write_(buffer) as filtered:
+                    if filtered:
+                        self.instrument.write(buffer)
+                        self.get_hardware_input_setup_reading(input)
+                        if not((str(input) == 'A' and self.input_A_hardware_setup_parameters == (enable, compensation)) or (str(input) == 'B' and self.input_B_hardware_setup_parameters == (enable, compensation))):
+                            raise Errors.LS340NotResponding
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LS340NotResponding, Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -222,7 +315,7 @@ class Lakeshore340(Instruments.Instruments):
             if '340' in self.identity:
                 string = self.instrument.query('INSET? {0}'.format(str(input)))
                 string_list = string.split(',')
-                result = (bool(string_list[0]), bool(string_list[1]))
+                result = (bool(int(string_list[0])), bool(int(string_list[1])))
                 if str(input) == 'A':
                     self.input_A_hardware_setup_parameters = result
                 else:
@@ -235,10 +328,13 @@ class Lakeshore340(Instruments.Instruments):
     def set_input_type_parameters(self, input, type, units, coefficient, excitation, range):
         try:
             if '340' in self.identity:
-                self.instrument.write('INTYPE {0},{1:d},{2:d},{3:d},{4:d},{5:d},{6:d}'.format(str(input), type, units, coefficient, excitation, range))
-                self.get_input_type_parameters_reading(input)
-                if not(input == 'A' and self.input_A_type == (type, units, coefficient, excitation, range)) or not(input == 'B' and self.input_B_type == (type, units, coefficient, excitation, range)):
-                    raise Errors.LS340NotResponding
+                buffer = 'INTYPE {0},{1:d},{2:d},{3:d},{4:d},{5:d}'.format(str(input), type, units, coefficient, excitation, range)
+                with self._shadow_write_(buffer) as filtered:
+                    if filtered:
+                        self.instrument.write(buffer)
+                        self.get_hardware_input_setup_parameters_reading(input)
+                        if not((str(input) == 'A' and self.input_A_type == (type, units, coefficient, excitation, range)) or (str(input) == 'B' and self.input_B_type == (type, units, coefficient, excitation, range))):
+                            raise Errors.LS340NotResponding
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LS340NotResponding, Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -290,9 +386,9 @@ class Lakeshore340(Instruments.Instruments):
             if '340' in self.identity:
                 string = self.instrument.query('LDATST? {0}'.format(str(input)))
                 if str(input) == 'A':
-                    self.input_A_linear_data = int(string)
+                    self.input_A_linear_data_status = int(string)
                 else:
-                    self.input_B_linear_data = int(string)
+                    self.input_B_linear_data_status = int(string)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -303,31 +399,41 @@ class Lakeshore340(Instruments.Instruments):
             if '340' in self.identity:
                 buffer = 'LINEAR {0},{1:d},{2:f},{3:d},{4:d}'.format(str(input),equation,m,x_source,b_source)
                 if b_source == 1:
-                    buffer += '{0:f}'.format(b)
-                self.instrument.write(buffer)
-                self.get_linear_equation_parameters_reading(input)
-                if not(str(input) == 'A' and self.input_A_linear_equation == (equation, m, x_source, b_source, b)) or not(str(input) == 'B' and self.input_B_linear_equation == (equation, m, x_source, b_source, b)):
-                    raise Errors.LS340NotResponding
+                    buffer += ',{0:f}'.format(b)
+                with self._shadow_write_(buffer) as filtered:
+                    if filtered:
+                        self.instrument.write(buffer)
+                        self.get_linear_equation_parameters_reading(input)
+                        expected = (equation, m, x_source, b_source, b) if b_source == 1 else (equation, m, x_source, b_source)
+                        if not((str(input) == 'A' and self.input_A_linear_equation[:len(expected)] == expected) or (str(input) == 'B' and self.input_B_linear_equation[:len(expected)] == expected)):
+                            raise Errors.LS340NotResponding
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LS340NotResponding, Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
             error.error_handler()
 
-    def get_linear_equation_parameters(self, input, equation, m, x_source, b_source, b):
+    def get_linear_equation_parameters_reading(self, input):
         try:
             if '340' in self.identity:
                 string = self.instrument.query('LINEAR? {0}'.format(str(input)))
                 string_list = string.split(',')
                 result = (int(string_list[0]), float(string_list[1]), int(string_list[2]), int(string_list[3]), float(string_list[4]))
                 if str(input) == 'A':
-                    self.input_A_linear_data = result
+                    self.input_A_linear_equation = result
                 else:
-                    self.input_B_linear_data = result
+                    self.input_B_linear_equation = result
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
             error.error_handler()
 
+    def get_linear_equation_parameters(self, input, equation = None, m = None, x_source = None, b_source = None, b = None):
+        """
+        This function is kept for the scripts written for the previous versions of the driver: it reads the linear equation parameters of the given input
+            (see the get_linear_equation_parameters_reading function), ignoring the other parameters.
+        """
+        self.get_linear_equation_parameters_reading(input)
+
     def get_max_min_data(self, input):
         try:
             if '340' in self.identity:
@@ -365,10 +471,13 @@ class Lakeshore340(Instruments.Instruments):
                     paused_number = 2
                 else:
                     paused_number = 1
-                self.instrument.write('MNMX {0}, {1}, {2}'.format(str(input),str(paused_number), str(source)))
-                self.get_max_min(input)
-                if not(input == 'A' and self.input_A_maxmin == (paused, source)) or not(input == 'B' and self.input_B_maxmin == (paused, source)):
-                    raise Errors.LS340NotResponding
+                buffer = 'MNMX {0}, {1}, {2}'.format(str(input),str(paused_number), str(source))
+                with self._shadow_write_(buffer) as filtered:
+                    if filtered:
+                        self.instrument.write(buffer)
+                        self.get_max_min(input)
+                        if not((str(input) == 'A' and self.input_A_maxmin == (paused, source)) or (str(input) == 'B' and self.input_B_maxmin == (paused, source))):
+                            raise Errors.LS340NotResponding
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LS340NotResponding, Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -384,9 +493,9 @@ class Lakeshore340(Instruments.Instruments):
                 else:
                     result = (True, int(string_list[1]))
                 if str(input) == 'A':
-                    self.input_A_maxmin_status = result
+                    self.input_A_maxmin = result
                 else:
-                    self.input_B_maxmin_status = result
+                    self.input_B_maxmin = result
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -410,9 +519,9 @@ class Lakeshore340(Instruments.Instruments):
             if '340' in self.identity:
                 string = self.instrument.query('SRDG? {0}'.format(str(input)))
                 if str(input) == 'A':
-                    self.input_A_sensor_units_reading_reading = float(string)
+                    self.input_A_sensor_units_reading = float(string)
                 else:
-                    self.input_B_sensor_units_reading_reading = float(string)
+                    self.input_B_sensor_units_reading = float(string)
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
@@ -667,4 +776,11 @@ class Lakeshore340(Instruments.Instruments):
             else:
                 raise Errors.IncorrectInstrumentError
         except (Errors.LS340NotResponding, Errors.ReportInstrumentInternalError, Errors.IncorrectInstrumentError) as error:
-            error.error_handler()
\ No newline at end of file
+            error.error_handler()
+
+class AsyncLakeshore340(AsyncManager.AsyncDriver):
+    """
+    This class is the asynchronous variant of the Lakeshore340 class: all its functions are awaitable and are executed by the executor of the board of the
+    Lakeshore model 340 Temperature Controller (see the AsyncManager.py code).
+    """
+    driver_class = Lakeshore340
@@ -1 +1 @@
-import Lakeshore340
\ No newline at end of file
+from OxfordMagLab2000.SCPIInstruments import Lakeshore340
\ No newline at end of file
@@ -0,0 +1,66 @@
+import threading
+import unittest
+from OxfordMagLab2000.General import Arbiter, Manager, Simulator
+from OxfordMagLab2000.KeythleyInstruments import Keithley2400
+from OxfordMagLab2000.OxfordCryostat import OxfordIPS, OxfordILM
+
+class ArbiterTest(unittest.TestCase):
+    """
+    Tests of the ISOBUS arbiter shared by the IPS and the ILM on the simulated rig.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(seed = 0)
+        self.manager = Manager.Manager(backend = self.backend)
+        self.IPS = OxfordIPS.OxfordIPS(self.manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_master = True)
+        self.ILM = OxfordILM.OxfordILM(self.manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_linked = True, ISOBUS_adress = 5)
+
+    def tearDown(self):
+        self.ILM.close()
+        self.IPS.close()
+
+    def test_shared_arbiter(self):
+        self.assertIsInstance(self.IPS.instrument, Arbiter.ISOBUSArbiter)
+        self.assertIs(self.IPS.instrument, self.ILM.instrument)
+
+    def test_round_robin(self):
+        arbiter = self.IPS.instrument
+        with arbiter.transaction() as session:
+            replies = [arbiter.submit('query', '@0R7'), arbiter.submit('query', '@0R7'), arbiter.submit('query', '@5R1'), arbiter.submit('query', '@5R1')]
+            order = []
+            for future in replies:
+                future.add_done_callback(lambda future: order.append(replies.index(future)))
+        for future in replies:
+            self.assertTrue(future.result(timeout = 5).startswith('R'))
+        self.assertEqual(order, [0, 2, 1, 3])
+
+    def test_parallel_threads(self):
+        replies = {}
+        def poll(name, driver, command):
+            replies[name] = [driver.instrument.query(driver.buffer_radix + command) for i in range(20)]
+        threads = [threading.Thread(target = poll, args = ('IPS', self.IPS, 'R7')), threading.Thread(target = poll, args = ('ILM', self.ILM, 'R1'))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(len(replies['IPS']), 20)
+        self.assertEqual(len(replies['ILM']), 20)
+        self.assertTrue(all(reply.startswith('R') for reply in replies['IPS'] + replies['ILM']))
+
+    def test_board_lock_holder_can_use_ISOBUS(self):
+        K2400 = Keithley2400.Keithley2400(self.manager, 'GPIB0::23::INSTR')
+        result = []
+        def run():
+            with K2400.lock:
+                result.append(self.IPS.get_output_current_reading())
+            with K2400.transaction():
+                K2400.arm_configuration(2)
+                result.append(self.IPS.get_output_current_reading())
+        thread = threading.Thread(target = run, daemon = True)
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), 'Oxford driver blocked by the board lock')
+        self.assertEqual(len(result), 2)
+        K2400.close()
+
+if __name__ == '__main__':
+    unittest.main()
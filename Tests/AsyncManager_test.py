@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import unittest
+from OxfordMagLab2000.General import AsyncManager, Manager, Simulator
+from OxfordMagLab2000.KeythleyInstruments import Keithley2400
+from OxfordMagLab2000.OxfordCryostat import OxfordIPS, OxfordITC
+
+class AsyncManagerTest(unittest.TestCase):
+    """
+    Tests of the asyncio front-end on the simulated rig.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(latency = 0.01, seed = 0)
+        self.async_manager = AsyncManager.AsyncManager(backend = self.backend)
+
+    def tearDown(self):
+        self.async_manager.close()
+
+    def test_executors(self):
+        executor = self.async_manager.executor('GPIB0::23::INSTR')
+        self.assertIs(self.async_manager.executor('gpib0::23::instr'), executor)
+        self.assertIsNot(self.async_manager.executor('GPIB0::24::INSTR'), executor)
+        async def thread_name():
+            return await self.async_manager.run('GPIB0::23::INSTR', lambda: threading.current_thread().name)
+        self.assertTrue(asyncio.run(thread_name()).startswith('AsyncManager-GPIB0::23::INSTR'))
+
+    def test_async_instrument(self):
+        async def identities():
+            K2400 = await self.async_manager.open_instrument('GPIB0::23::INSTR')
+            K6517A = await self.async_manager.open_instrument('GPIB0::27::INSTR')
+            replies = await asyncio.gather(K2400.query('*IDN?'), K6517A.query('*IDN?'))
+            await K2400.close()
+            await K6517A.close()
+            return replies
+        (K2400_identity, K6517A_identity) = asyncio.run(identities())
+        self.assertIn('MODEL 2400', K2400_identity)
+        self.assertIn('MODEL 6517A', K6517A_identity)
+        self.assertEqual(self.async_manager.manager.sessions, {})
+
+    def test_async_drivers(self):
+        async def readings():
+            IPS = await OxfordIPS.AsyncOxfordIPS.create(self.async_manager, 'GPIB0::25::INSTR', ISOBUS_master = True)
+            ITC = await OxfordITC.AsyncOxfordITC.create(self.async_manager, 'GPIB0::24::INSTR')
+            K2400 = await Keithley2400.AsyncKeithley2400.create(self.async_manager, 'GPIB0::23::INSTR')
+            self.assertIsInstance(IPS.driver, OxfordIPS.OxfordIPS)
+            self.assertIn('MODEL 2400', K2400.identity)
+            await asyncio.gather(IPS.get_output_current_reading(), ITC.get_sensor_1_temperature_reading())
+            result = (await IPS.magnet_inductance, await ITC.sensor_1_temperature, IPS.driver.__dict__.get('output_current'))
+            await IPS.close()
+            await ITC.close()
+            await K2400.close()
+            return result
+        self.assertEqual(asyncio.run(readings()), (20.3, 300., 0.))
+
+if __name__ == '__main__':
+    unittest.main()
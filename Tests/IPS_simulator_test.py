@@ -0,0 +1,120 @@
+import threading
+import time
+import unittest
+from OxfordMagLab2000.General import Errors, Manager, Simulator
+from OxfordMagLab2000.OxfordCryostat import OxfordIPS
+
+class IPSSimulatorTest(unittest.TestCase):
+    """
+    Tests of the OxfordIPS driver on the simulated power supply of the rig.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(seed = 0)
+        self.manager = Manager.Manager(backend = self.backend)
+        self.IPS = OxfordIPS.OxfordIPS(self.manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_master = True,
+                                       switch_heater_profile = {'heating_time': 0.3, 'cooling_time': 0.2, 'settle_timeout': 1.})
+        self.device = self.backend.devices['GPIB0::25::INSTR'][0]
+        self.session = self.backend.opened_resources[-1]
+        self.IPS.set_mode(field_display = False)
+
+    def tearDown(self):
+        self.IPS.close()
+
+    def _start_ramp_(self, current, rate):
+        self.IPS.set_current_sweep_rate(rate)
+        self.IPS.set_switch_heater(opened = True)
+        self.IPS.set_target_current(current)
+        self.IPS.set_activity(hold = False, to_set_point = True)
+
+    def test_lazy_and_live_readings(self):
+        self.session.command_count.clear()
+        self.assertEqual(self.IPS.magnet_inductance, 20.3)
+        self.assertEqual(self.IPS.magnet_inductance, 20.3)
+        self.assertEqual(self.session.command_count['R'], 1)
+        self.IPS.output_current
+        self.IPS.output_current
+        self.assertEqual(self.session.command_count['R'], 3)
+        self.IPS.invalidate_readings('magnet_inductance')
+        self.IPS.magnet_inductance
+        self.assertEqual(self.session.command_count['R'], 4)
+
+    def test_safe_current_limits(self):
+        self.assertEqual(self.IPS.safe_current_negative_limit, -98.46)
+        self.assertEqual(self.IPS.safe_current_positive_limit, 98.46)
+
+    def test_set_switch_heater(self):
+        self.IPS.set_switch_heater(opened = True)
+        self.assertEqual(self.IPS.status.switch_heater, 1)
+        self.IPS.set_switch_heater(opened = False)
+        self.assertIn(self.IPS.status.switch_heater, (0, 2))
+
+    def test_set_persistent_field(self):
+        self.IPS.set_current_sweep_rate(15.)
+        self.IPS.set_persistent_field(field = 0.005)
+        self.assertIn(self.device.switch_heater, (0, 2))
+        self.assertAlmostEqual(self.device.magnet_current * self.device.field_constant, 0.005, places = 4)
+        self.assertAlmostEqual(self.IPS.persistent_field, 0.005, places = 4)
+
+    def test_status_events(self):
+        events = []
+        self.IPS.get_status()
+        self.IPS.subscribe(lambda event: events.append((event.field, event.previous, event.current, self.IPS.lock._is_owned())), fields = ('activity',))
+        self.IPS.set_activity(hold = False, to_zero = True)
+        self.assertEqual(events, [('activity', 0, 2, True)])
+        self.IPS.get_status()
+        self.assertEqual(len(events), 1)
+
+    def test_wait_for_ramp(self):
+        self._start_ramp_(0.1, 15.)
+        start = time.monotonic()
+        self.IPS.wait_for_ramp()
+        self.assertLess(time.monotonic() - start, 2.)
+        self.assertTrue(self.IPS.status.at_rest)
+        self.assertEqual(self.device.output_current, 0.1)
+
+    def test_wait_for_ramp_reads_the_sweep_rate(self):
+        self._start_ramp_(0.5, 6.)
+        self.device.current_sweep_rate = 60.
+        start = time.monotonic()
+        self.IPS.wait_for_ramp()
+        self.assertLess(time.monotonic() - start, 2.)
+        self.assertEqual(self.IPS.current_sweep_rate, 60.)
+
+    def test_wait_for_ramp_sleep_limit(self):
+        self.IPS.ramp_sleep_limit = 0.3
+        self._start_ramp_(1., 6.)
+        def speed_up():
+            time.sleep(0.2)
+            self.device.current_sweep_rate = 120.
+        thread = threading.Thread(target = speed_up)
+        thread.start()
+        start = time.monotonic()
+        self.IPS.wait_for_ramp()
+        thread.join()
+        self.assertLess(time.monotonic() - start, 2.)
+        self.assertEqual(self.device.output_current, 1.)
+
+    def test_wait_for_ramp_timeout(self):
+        self._start_ramp_(5., 6.)
+        with self.assertRaises(Errors.PSRampTimeout):
+            self.IPS.wait_for_ramp(timeout = 0.3)
+        self.assertFalse(self.IPS.status.at_rest)
+
+    def test_settle_switch_heater(self):
+        start = time.monotonic()
+        self.IPS.settle_switch_heater(opened = True)
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertEqual(self.device.switch_heater, 1)
+        self.session.command_count.clear()
+        self.IPS.settle_switch_heater(opened = True)
+        self.assertEqual(self.session.command_count['H'], 0)
+        self.IPS.settle_switch_heater(opened = False)
+        self.assertNotEqual(self.device.switch_heater, 1)
+
+    def test_switch_heater_not_settled(self):
+        self.IPS.switch_heater_profile['minimum_heater_current'] = 1e6
+        with self.assertRaises(Errors.PSSwitchHeaterNotSettled):
+            self.IPS.settle_switch_heater(opened = True)
+
+if __name__ == '__main__':
+    unittest.main()
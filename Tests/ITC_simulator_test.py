@@ -0,0 +1,42 @@
+import unittest
+from OxfordMagLab2000.General import Manager, Simulator
+from OxfordMagLab2000.OxfordCryostat import OxfordITC
+
+class ITCSimulatorTest(unittest.TestCase):
+    """
+    Tests of the OxfordITC driver on the simulated Intelligent Temperature Controller of the rig.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(seed = 0)
+        self.manager = Manager.Manager(backend = self.backend)
+        self.ITC = OxfordITC.OxfordITC(self.manager, GPIB_adress = 'GPIB0::24::INSTR')
+        self.session = self.backend.opened_resources[-1]
+
+    def tearDown(self):
+        self.ITC.close()
+
+    def reads(self, name, times):
+        """
+        This function returns the number of R commands sent while reading the given attribute the given number of times.
+        """
+        before = self.session.command_count['R']
+        for i in range(times):
+            getattr(self.ITC, name)
+        return self.session.command_count['R'] - before
+
+    def test_live_readings(self):
+        for name in ('sensor_1_temperature', 'sensor_2_temperature', 'sensor_3_temperature', 'heater_operating_point', 'needle_valve_operating_point'):
+            self.assertEqual(self.reads(name, 3), 3, name)
+
+    def test_lazy_readings(self):
+        for name in ('temperature_set_point', 'P_term', 'I_term', 'D_term'):
+            self.assertEqual(self.reads(name, 3), 1, name)
+            self.ITC.invalidate_readings(name)
+            self.assertEqual(self.reads(name, 1), 1, name)
+
+    def test_manual_heater(self):
+        self.ITC.set_manual_heater(25)
+        self.assertEqual(self.ITC.heater_operating_point, 25)
+
+if __name__ == '__main__':
+    unittest.main()
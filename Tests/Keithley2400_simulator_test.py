@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+import unittest
+from OxfordMagLab2000.General import Manager, Simulator, Writers
+from OxfordMagLab2000.KeythleyInstruments import Keithley2400
+
+class Keithley2400SimulatorTest(unittest.TestCase):
+    """
+    Tests of the Keithley2400 driver on the simulated SourceMeter of the rig.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(seed = 0)
+        self.manager = Manager.Manager(backend = self.backend)
+        self.K2400 = Keithley2400.Keithley2400(self.manager, 'GPIB0::23::INSTR')
+        self.device = self.backend.devices['GPIB0::23::INSTR'][0]
+        self.session = self.backend.opened_resources[-1]
+        self.K2400.arm_configuration(1)
+        self.K2400.trigger_configuration(4)
+
+    def tearDown(self):
+        self.K2400.close()
+
+    def test_binary_readings(self):
+        ascii_readings = self.K2400._read_readings_()
+        self.K2400.format_configuration(data_format = 'Real32', normal_order = True)
+        self.assertEqual(self.K2400.data_format, 'REAL,32')
+        binary_readings = self.K2400._read_readings_()
+        self.assertEqual(ascii_readings.dtype.names, ('voltage', 'current', 'resistance', 'time', 'status'))
+        self.assertEqual(binary_readings.dtype.names, ('voltage', 'current', 'resistance', 'time'))
+        self.assertEqual(len(binary_readings), 4)
+        self.assertEqual(binary_readings.dtype['voltage'].str, '>f4')
+
+    def test_aborted_transaction_keeps_format(self):
+        with self.assertRaises(RuntimeError):
+            with self.K2400.transaction():
+                self.K2400.format_configuration(data_format = 'Real32')
+                raise RuntimeError('aborted')
+        self.assertEqual(self.K2400.data_format, 'ASC')
+        self.assertEqual(self.device.settings['FORM'], 'ASC')
+        self.assertEqual(len(self.K2400._read_readings_()), 4)
+
+    def test_committed_transaction_sets_format(self):
+        with self.K2400.transaction():
+            self.K2400.format_configuration(data_format = 'Real32')
+            self.assertEqual(self.K2400.data_format, 'ASC')
+        self.assertEqual(self.K2400.data_format, 'REAL,32')
+        self.assertEqual(len(self.K2400._read_readings_()), 4)
+
+    def test_transaction(self):
+        writes = self.session.write_count
+        self.K2400.arm_configuration(2)
+        self.assertEqual(self.session.write_count - writes, 3)
+        self.session.command_count.clear()
+        writes = self.session.write_count
+        with self.K2400.transaction():
+            self.K2400.arm_configuration(3)
+            with self.K2400.transaction():
+                self.K2400.trigger_configuration(5)
+            self.K2400.voltage_sense_configuration(NPLCs = 1)
+            self.assertEqual(self.session.write_count, writes)
+            self.assertEqual(self.device.settings['ARM:COUN'], '2')
+        self.assertEqual(self.session.write_count - writes, 3)
+        self.assertEqual(self.session.command_count['*OPC?'], 1)
+        self.assertEqual(self.session.command_count[':SYST:ERR?'], 1)
+        self.assertEqual((self.device.settings['ARM:COUN'], self.device.settings['TRIG:COUN']), ('3', '5'))
+
+    def test_transaction_errors(self):
+        with self.assertRaises(SystemExit):
+            with self.K2400.transaction():
+                self.K2400.arm_configuration(4)
+                self.device.add_error('-222,"Data out of range"')
+        self.assertEqual(self.K2400.last_internal_error, ['-222', 'Data out of range'])
+        self.assertEqual(self.K2400.shadow_registers, {})
+
+    def test_shadow_registers(self):
+        self.K2400.voltage_sense_configuration(NPLCs = 1)
+        writes = self.session.write_count
+        self.K2400.voltage_sense_configuration(NPLCs = 1)
+        self.K2400.arm_configuration(1)
+        self.assertEqual(self.session.write_count, writes)
+        self.K2400.trigger_configuration(6)
+        self.assertEqual(self.session.write_count - writes, 3)
+        self.assertEqual(self.device.settings['TRIG:COUN'], '6')
+        self.K2400.invalidate_shadow()
+        writes = self.session.write_count
+        self.K2400.voltage_sense_configuration(NPLCs = 1)
+        self.assertEqual(self.session.write_count - writes, 3)
+
+    def test_shadow_reset(self):
+        self.K2400.trigger_configuration(6)
+        self.K2400.system_configuration()
+        self.assertEqual(self.device.settings['TRIG:COUN'], '1')
+        writes = self.session.write_count
+        self.K2400.trigger_configuration(6)
+        self.assertEqual(self.session.write_count - writes, 3)
+        self.assertEqual(self.device.settings['TRIG:COUN'], '6')
+
+    def test_configuration_cache(self):
+        self.K2400.system_configuration()
+        self.K2400.voltage_source_sweep_configuration(points = 4)
+        self.K2400.arm_configuration(2)
+        self.session.command_count.clear()
+        with tempfile.TemporaryDirectory() as folder:
+            self.K2400.acquire_sweeps(folder + os.sep, 'sample', 'IV', print_datas = False)
+            Writers.wait_writers()
+            self.assertEqual(len(os.listdir(folder)), 4)
+        self.assertEqual(self.session.command_count[':SYST:RSEN?'], 0)
+        self.assertEqual(self.session.command_count[':SOUR:SWE:SPAC?'], 0)
+
+    def test_configuration_queries(self):
+        self.K2400.arm_configuration(2)
+        self.K2400.invalidate_shadow()
+        self.session.command_count.clear()
+        with tempfile.TemporaryDirectory() as folder:
+            self.K2400.acquire_sweeps(folder + os.sep, 'sample', 'IV', print_datas = False)
+            self.K2400.acquire_sweeps(folder + os.sep, 'sample', 'IV', print_datas = False)
+            Writers.wait_writers()
+        self.assertEqual(self.session.command_count[':SYST:RSEN?'], 1)
+        self.assertEqual(self.session.command_count[':SOUR:SWE:SPAC?'], 1)
+
+    def test_iter_measurements(self):
+        measurements = self.K2400.iter_measurements(repetitions = None)
+        for (i, data) in enumerate(measurements):
+            self.assertEqual(len(data), 4)
+            self.assertEqual(self.device.settings['OUTP:STAT'], 'ON')
+            if i == 2:
+                break
+        measurements.close()
+        self.assertEqual(self.device.settings['OUTP:STAT'], 'OFF')
+
+    def test_lock_released_between_yields(self):
+        measurements = self.K2400.iter_measurements(repetitions = 2)
+        next(measurements)
+        acquired = []
+        def acquire():
+            acquired.append(self.K2400.lock.acquire(timeout = 5))
+            self.K2400.lock.release()
+        thread = threading.Thread(target = acquire)
+        thread.start()
+        thread.join(10)
+        self.assertEqual(acquired, [True])
+        self.assertEqual(len(list(measurements)), 1)
+        self.assertEqual(self.device.settings['OUTP:STAT'], 'OFF')
+
+    def test_iter_sweeps(self):
+        self.K2400.arm_configuration(3)
+        sweeps = list(self.K2400.iter_sweeps())
+        self.assertEqual(len(sweeps), 3)
+        self.assertTrue(all(len(data) == 4 for data in sweeps))
+        self.assertEqual(self.device.settings['OUTP:STAT'], 'OFF')
+
+if __name__ == '__main__':
+    unittest.main()
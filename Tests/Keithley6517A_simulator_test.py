@@ -0,0 +1,45 @@
+import unittest
+from OxfordMagLab2000.General import Manager, Simulator
+from OxfordMagLab2000.KeythleyInstruments import Keithley6517A
+
+class Keithley6517ASimulatorTest(unittest.TestCase):
+    """
+    Tests of the Keithley6517A driver on the simulated Electrometer of the rig.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(seed = 0)
+        self.manager = Manager.Manager(backend = self.backend)
+        self.K6517A = Keithley6517A.Keithley6517A(self.manager, 'GPIB0::27::INSTR')
+        self.device = self.backend.devices['GPIB0::27::INSTR'][0]
+
+    def tearDown(self):
+        self.K6517A.close()
+
+    def test_binary_readings(self):
+        for (data_format, datatype) in (('Sreal', '<f4'), ('Dreal', '<f8'), ('Real64', '<f8')):
+            self.K6517A.format_configuration(data_format = data_format, data_elements = 'READ,RNUM,TST')
+            readings = self.K6517A._join_fresh_([self.K6517A._fresh_reading_(), self.K6517A._fresh_reading_()])
+            self.assertEqual(readings.dtype.names, ('reading', 'timestamp', 'reading_number'))
+            self.assertEqual(readings.dtype['reading'].str, datatype)
+            self.assertEqual(readings['reading_number'][1] - readings['reading_number'][0], 1)
+
+    def test_aborted_transaction_keeps_format(self):
+        with self.assertRaises(RuntimeError):
+            with self.K6517A.transaction():
+                self.K6517A.format_configuration(data_format = 'Sreal', data_elements = 'READ,TST')
+                raise RuntimeError('aborted')
+        self.assertEqual(self.K6517A.data_format, 'ASC')
+        self.assertEqual(self.K6517A.data_elements, ['READ', 'TST', 'RNUM', 'CHAN', 'STAT'])
+        self.assertEqual(self.device.settings['FORM'], 'ASC')
+        readings = self.K6517A._join_fresh_([self.K6517A._fresh_reading_()])
+        self.assertEqual(readings.dtype.names, ('reading', 'timestamp', 'reading_number', 'channel'))
+
+    def test_committed_transaction_sets_format(self):
+        with self.K6517A.transaction():
+            self.K6517A.format_configuration(data_format = 'Sreal', data_elements = 'READ,TST')
+            self.assertEqual(self.K6517A.data_format, 'ASC')
+        self.assertEqual(self.K6517A.data_format, 'SRE')
+        self.assertEqual(self.K6517A._join_fresh_([self.K6517A._fresh_reading_()]).dtype.names, ('reading', 'timestamp'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
-from OxfordMagLab2000.General import Manager
+from OxfordMagLab2000.General import Manager, Readings
 from OxfordMagLab2000.KeythleyInstruments import Keithley6517A
+
+# Here we parse a reply in the default format (READ,CHAN,RNUM,UNIT,TST,STAT), whose elements are sent in the fixed order of the instrument.
+elements = [element for element in Readings.ordered_elements('READ,CHAN,RNUM,UNIT,TST,STAT', Keithley6517A.Keithley6517A.output_elements) if element not in Keithley6517A.Keithley6517A.suffix_elements]
+readings = Readings.parse_ascii_readings('+1.0362E-12NADC,+0000012.445secs,+00023RDNG#,00EXTCHAN', elements)
+print(readings)
+assert readings['reading'][0] == 1.0362e-12 and readings['timestamp'][0] == 12.445 and readings['reading_number'][0] == 23 and readings['channel'][0] == '00EXTCHAN'
     
 rm = Manager.Manager()
 # Here we apply tested functions to the correct instrument.
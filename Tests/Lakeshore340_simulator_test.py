@@ -0,0 +1,77 @@
+import time
+import unittest
+from OxfordMagLab2000.General import Manager, Simulator
+from OxfordMagLab2000.SCPIInstruments import Lakeshore340
+
+class Lakeshore340SimulatorTest(unittest.TestCase):
+    """
+    Tests of the Lakeshore340 driver on the simulated temperature controller of the rig.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(seed = 0)
+        self.manager = Manager.Manager(backend = self.backend)
+        self.LS340 = Lakeshore340.Lakeshore340(self.manager, 'GPIB0::12::INSTR')
+        self.session = self.backend.opened_resources[-1]
+
+    def tearDown(self):
+        self.LS340.close()
+
+    def test_refresh_max_age(self):
+        result = self.LS340.refresh(('A', 'B'), ('kelvin_reading',), max_age = 0.2)
+        self.assertAlmostEqual(result['A']['kelvin_reading'], 4.2, delta = 0.01)
+        self.assertAlmostEqual(result['B']['kelvin_reading'], 4.5, delta = 0.01)
+        self.assertEqual(self.session.command_count['KRDG?'], 2)
+        self.assertEqual(self.LS340.refresh(('A', 'B'), ('kelvin_reading',), max_age = 0.2), result)
+        self.assertEqual(self.session.command_count['KRDG?'], 2)
+        time.sleep(0.25)
+        self.LS340.refresh(('A',), ('kelvin_reading',), max_age = 0.2)
+        self.assertEqual(self.session.command_count['KRDG?'], 3)
+        self.LS340.refresh(('B',), ('kelvin_reading',))
+        self.assertEqual(self.session.command_count['KRDG?'], 3)
+
+    def test_refresh_linear_equation(self):
+        result = self.LS340.refresh(('A',), ('linear_equation',))
+        self.assertEqual(result['A']['linear_equation'], (1, 1.0, 1, 1, 0.0))
+        self.assertEqual(self.LS340.input_A_linear_equation, (1, 1.0, 1, 1, 0.0))
+
+    def test_refresh_unknown_field(self):
+        with self.assertRaises(KeyError):
+            self.LS340.refresh(('A',), ('kelvin_reading', 'temperature'))
+        self.assertEqual(self.session.command_count['KRDG?'], 0)
+
+    def test_input_setters_check_the_written_input(self):
+        self.LS340.set_input_alarm_parameters('B', on = True, source = 1, high_value = 300, low_value = 2, latch_enable = True)
+        self.assertEqual(self.LS340.input_B_alarm_parameters, (True, 1, 300., 2., True, False))
+        self.LS340.set_input_alarm_parameters('B', on = False)
+        self.assertEqual(self.LS340.input_B_alarm_parameters, (False, 1, 300., 2., True, False))
+        self.LS340.set_input_filter_parameters('A', on = True, points = 8, percentual_window = 5)
+        self.assertEqual(self.LS340.input_A_filter_parameters, (True, 8, 5))
+        self.LS340.set_input_curve_number('A', 21)
+        self.assertEqual(self.LS340.input_A_input_curve, 21)
+        self.LS340.set_hardware_input_setup('B', enable = True, compensation = True)
+        self.assertEqual(self.LS340.input_B_hardware_setup_parameters, (True, True))
+        self.LS340.set_input_type_parameters('A', 2, 1, 1, 0, 0)
+        self.assertEqual(self.LS340.input_A_type, (2, 1, 1, 0, 0))
+        self.LS340.set_linear_equation_parameters('A', 2, 0.5, 1, 1, 3.0)
+        self.assertEqual(self.LS340.input_A_linear_equation, (2, 0.5, 1, 1, 3.0))
+        self.LS340.set_max_min('B', paused = False, source = 2)
+        self.assertEqual(self.LS340.input_B_maxmin, (False, 2))
+
+    def test_ignored_input_setting_is_reported(self):
+        device = self.backend.devices['GPIB0::12::INSTR'][0]
+        device.command = lambda header, arguments: None
+        with self.assertRaises(SystemExit):
+            self.LS340.set_input_curve_number('B', 21)
+
+    def test_repeated_input_setting_is_skipped(self):
+        self.LS340.set_input_filter_parameters('A', on = True, points = 8, percentual_window = 5)
+        self.assertEqual(self.session.command_count['FILTER'], 1)
+        self.assertEqual(self.session.command_count['FILTER?'], 1)
+        self.LS340.set_input_filter_parameters('A', on = True, points = 8, percentual_window = 5)
+        self.assertEqual(self.session.command_count['FILTER'], 1)
+        self.assertEqual(self.session.command_count['FILTER?'], 1)
+        self.LS340.set_input_filter_parameters('B', on = True, points = 8, percentual_window = 5)
+        self.assertEqual(self.session.command_count['FILTER'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+from OxfordMagLab2000.General import Locking, Manager, Simulator
+from OxfordMagLab2000.KeythleyInstruments import Keithley2400, Keithley6517A
+
+class Driver:
+    """
+    Minimal driver used to test the Locking.py functions.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+
+    def owned(self):
+        return self.lock._is_owned()
+
+    def nested(self):
+        return self.owned()
+
+    def waiting(self):
+        return self.lock._is_owned()
+
+    def readings(self, count):
+        for i in range(count):
+            yield self.lock._is_owned()
+
+Locking.lock_functions(Driver, unlocked_functions = ('waiting',))
+
+class LockingTest(unittest.TestCase):
+    """
+    Tests of the atomic driver functions and of the board locks.
+    """
+    def test_atomic_functions(self):
+        driver = Driver()
+        self.assertTrue(driver.owned())
+        self.assertTrue(driver.nested())
+        self.assertFalse(driver.waiting())
+        self.assertFalse(driver.lock._is_owned())
+
+    def test_atomic_generators(self):
+        driver = Driver()
+        for held in driver.readings(3):
+            self.assertTrue(held)
+            self.assertFalse(driver.lock._is_owned())
+        generator = driver.readings(3)
+        next(generator)
+        generator.close()
+        self.assertFalse(driver.lock._is_owned())
+
+    def test_atomic_function_blocks_other_threads(self):
+        driver = Driver()
+        times = []
+        def slow():
+            with driver.lock:
+                time.sleep(0.2)
+        thread = threading.Thread(target = slow)
+        thread.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        driver.owned()
+        times.append(time.monotonic() - start)
+        thread.join()
+        self.assertGreater(times[0], 0.1)
+
+    def test_board_locks(self):
+        devices = Simulator.simulated_rig()
+        devices['GPIB1::23::INSTR'] = Simulator.SimulatedKeithley2400()
+        manager = Manager.Manager(backend = Simulator.SimulatedResourceManager(devices, seed = 0))
+        K2400 = Keithley2400.Keithley2400(manager, 'GPIB0::23::INSTR')
+        K6517A = Keithley6517A.Keithley6517A(manager, 'GPIB0::27::INSTR')
+        other_K2400 = Keithley2400.Keithley2400(manager, 'GPIB1::23::INSTR')
+        self.assertIs(K2400.lock, K6517A.lock)
+        self.assertIsNot(K2400.lock, other_K2400.lock)
+        results = []
+        def poll():
+            results.append(other_K2400._operation_complete_query_())
+        with K2400.lock:
+            thread = threading.Thread(target = poll)
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(len(results), 1)
+        for driver in (other_K2400, K6517A, K2400):
+            driver.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import time
+import unittest
+from OxfordMagLab2000.General import Manager, Simulator
+
+class DiscoveryTest(unittest.TestCase):
+    """
+    Tests of the cached resource discovery of the Manager class.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(seed = 0)
+
+    def test_cached_discovery(self):
+        manager = Manager.Manager(backend = self.backend)
+        self.assertEqual(self.backend.scans, 1)
+        manager.open_instrument('GPIB0::23::INSTR')
+        manager.open_instrument('GPIB0::27::INSTR')
+        self.assertEqual(self.backend.scans, 1)
+
+    def test_expired_discovery(self):
+        manager = Manager.Manager(backend = self.backend, discovery_ttl = 0.1)
+        manager.open_instrument('GPIB0::23::INSTR')
+        self.assertEqual(self.backend.scans, 1)
+        time.sleep(0.15)
+        manager.open_instrument('GPIB0::27::INSTR')
+        self.assertEqual(self.backend.scans, 2)
+        manager.open_instrument('GPIB0::12::INSTR')
+        self.assertEqual(self.backend.scans, 2)
+
+    def test_new_instrument(self):
+        manager = Manager.Manager(backend = self.backend)
+        self.backend.devices['GPIB0::3::INSTR'] = {0: Simulator.SimulatedKeithley2182()}
+        self.assertNotEqual(manager.open_instrument('GPIB0::3::INSTR'), None)
+        self.assertEqual(self.backend.scans, 2)
+        self.assertIn('GPIB0::3::INSTR', manager.resources)
+
+    def test_invalidate_resources(self):
+        manager = Manager.Manager(backend = self.backend)
+        manager.invalidate_resources('GPIB0')
+        manager.open_instrument('GPIB0::23::INSTR')
+        self.assertEqual(self.backend.scans, 2)
+
+    def test_trust_adress(self):
+        manager = Manager.Manager(backend = self.backend, trust_adress = True)
+        self.assertEqual(self.backend.scans, 0)
+        manager.open_instrument('GPIB0::23::INSTR')
+        self.assertEqual(self.backend.scans, 0)
+        with self.assertRaises(SystemExit):
+            manager.open_instrument('GPIB0::30::INSTR')
+        self.assertEqual(self.backend.scans, 1)
+
+class SessionPoolTest(unittest.TestCase):
+    """
+    Tests of the sessions shared by the instruments opened at the same adress.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(seed = 0)
+        self.manager = Manager.Manager(backend = self.backend)
+
+    def test_reference_count(self):
+        session = self.manager.open_instrument('GPIB0::25::INSTR')
+        self.assertIs(self.manager.open_instrument('GPIB0::25::INSTR'), session)
+        self.assertEqual(self.manager.session_references['GPIB0::25::INSTR'], 2)
+        self.assertEqual(len(self.backend.opened_resources), 1)
+        self.manager.close_instrument('GPIB0::25::INSTR')
+        self.assertFalse(session.closed)
+        self.manager.close_instrument('GPIB0::25::INSTR')
+        self.assertTrue(session.closed)
+        self.assertNotIn('GPIB0::25::INSTR', self.manager.sessions)
+        self.manager.close_instrument('GPIB0::25::INSTR')
+        self.assertNotEqual(self.manager.open_instrument('GPIB0::25::INSTR'), session)
+
+    def test_ISOBUS_arbiter(self):
+        arbiter = self.manager.open_ISOBUS_instrument('GPIB0::25::INSTR')
+        self.assertIs(self.manager.open_ISOBUS_instrument('GPIB0::25::INSTR'), arbiter)
+        self.assertIsNot(self.manager.open_ISOBUS_instrument('GPIB0::24::INSTR'), arbiter)
+        self.manager.close_instrument('GPIB0::25::INSTR')
+        self.assertIn('GPIB0::25::INSTR', self.manager.arbiters)
+        self.manager.close_instrument('GPIB0::25::INSTR')
+        self.assertNotIn('GPIB0::25::INSTR', self.manager.arbiters)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import numpy
+from OxfordMagLab2000.General import Readings
+
+class ReadingsTest(unittest.TestCase):
+    """
+    Tests of the parsing and decoding functions of the readings sent by the SCPI instruments.
+    """
+    def test_ordered_elements(self):
+        output_order = ('VOLT', 'CURR', 'RES', 'TIME', 'STAT')
+        self.assertEqual(Readings.element_list(' volt, "CURR" ,,'), ['VOLT', 'CURR'])
+        self.assertEqual(Readings.ordered_elements('TIME,CURRENT,VOLT', output_order), ['VOLT', 'CURR', 'TIME'])
+        self.assertEqual(Readings.ordered_elements('"STATUS,RES"', output_order), ['RES', 'STAT'])
+
+    def test_parse_ascii_readings(self):
+        text = '+1.2345E-12NADC,+0000001.234secs,+00001RDNG#,-2.5000E-12NADC,+0000002.468secs,+00002RDNG#,+1.0E-12NADC\n'
+        readings = Readings.parse_ascii_readings(text, ['READ', 'TST', 'RNUM'])
+        self.assertEqual(readings.dtype.names, ('reading', 'timestamp', 'reading_number'))
+        self.assertEqual(len(readings), 2)
+        numpy.testing.assert_allclose(readings['reading'], [1.2345e-12, -2.5e-12])
+        numpy.testing.assert_allclose(readings['timestamp'], [1.234, 2.468])
+        numpy.testing.assert_array_equal(readings['reading_number'], [1, 2])
+
+    def test_parse_text_elements(self):
+        readings = Readings.parse_ascii_readings('+1.0E+00, 101 ,+2.0E+00,102', ['READ', 'CHAN'])
+        self.assertEqual(readings.dtype['channel'].kind, 'U')
+        self.assertEqual(list(readings['channel']), ['101', '102'])
+        numpy.testing.assert_array_equal(readings['reading'], [1., 2.])
+
+    def test_decode_binary_block(self):
+        values = numpy.array([[1.5, 2., 3.], [-4., 5.25, 6.]])
+        for (datatype, is_big_endian) in (('f', False), ('f', True), ('d', False)):
+            data = values.astype(('>' if is_big_endian else '<') + datatype).tobytes()
+            for block in (b'#' + str(len(str(len(data)))).encode() + str(len(data)).encode() + data + b'\n', b'#0' + data):
+                readings = Readings.decode_binary_block(block, ['READ', 'TST', 'RNUM'], datatype, is_big_endian)
+                self.assertEqual(readings.dtype.names, ('reading', 'timestamp', 'reading_number'))
+                self.assertEqual(len(readings), 2)
+                numpy.testing.assert_array_equal(readings['timestamp'], values[:, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import numpy
+from OxfordMagLab2000.General import Errors, Manager, Recorder, Simulator
+from OxfordMagLab2000.KeythleyInstruments import Keithley2400
+from OxfordMagLab2000.OxfordCryostat import OxfordIPS, OxfordILM
+from OxfordMagLab2000.SCPIInstruments import Lakeshore340
+
+class RecorderTest(unittest.TestCase):
+    """
+    Tests of the session recorder and of the replay of its traces.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'trace.jsonl.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _measure_(self, backend, recorder = None):
+        manager = Manager.Manager(backend = backend, recorder = recorder)
+        IPS = OxfordIPS.OxfordIPS(manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_master = True)
+        ILM = OxfordILM.OxfordILM(manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_linked = True, ISOBUS_adress = 5)
+        K2400 = Keithley2400.Keithley2400(manager, 'GPIB0::23::INSTR')
+        LS340 = Lakeshore340.Lakeshore340(manager, 'GPIB0::12::INSTR')
+        K2400.arm_configuration(1)
+        K2400.trigger_configuration(3)
+        ascii_readings = K2400._read_readings_()
+        K2400.format_configuration(data_format = 'Real32')
+        binary_readings = K2400._read_readings_()
+        LS340.get_kelvin_reading('A')
+        result = (IPS.output_current, ILM.channel_1_level, LS340.input_A_kelvin_reading, ascii_readings, binary_readings)
+        for driver in (LS340, K2400, ILM, IPS):
+            driver.close()
+        return result
+
+    def test_record_and_replay(self):
+        recorder = Recorder.SessionRecorder(self.filename)
+        recorded = self._measure_(Simulator.SimulatedResourceManager(seed = 0), recorder)
+        recorder.close()
+        replay = Recorder.ReplayResourceManager(self.filename)
+        self.assertEqual(replay.list_resources(), ('GPIB0::12::INSTR', 'GPIB0::23::INSTR', 'GPIB0::25::INSTR'))
+        replayed = self._measure_(replay)
+        self.assertEqual(replayed[:3], recorded[:3])
+        numpy.testing.assert_array_equal(replayed[3], recorded[3])
+        numpy.testing.assert_array_equal(replayed[4], recorded[4])
+        self.assertEqual(set(replay.remaining().values()), {0})
+
+    def test_mismatch(self):
+        recorder = Recorder.SessionRecorder(self.filename)
+        session = Recorder.RecordingSession(Simulator.SimulatedResourceManager(seed = 0).open_resource('GPIB0::23::INSTR'), 'GPIB0::23::INSTR', recorder)
+        session.query('*IDN?')
+        session.write(':SOUR:VOLT 1')
+        recorder.close()
+        replay_session = Recorder.ReplayResourceManager(self.filename).open_resource('GPIB0::23::INSTR')
+        with self.assertRaises(Errors.ReplayMismatchError):
+            replay_session.query('*OPT?')
+        replay_session = Recorder.ReplayResourceManager(self.filename, strict = False).open_resource('GPIB0::23::INSTR')
+        self.assertIn('MODEL 2400', replay_session.query('*OPT?'))
+
+    def test_paced_replay(self):
+        recorder = Recorder.SessionRecorder(self.filename)
+        session = Recorder.RecordingSession(Simulator.SimulatedResourceManager(latency = 0.1, seed = 0).open_resource('GPIB0::23::INSTR'), 'GPIB0::23::INSTR', recorder)
+        session.query('*IDN?')
+        recorder.close()
+        replay_session = Recorder.ReplayResourceManager(self.filename, paced = True, speed = 2.).open_resource('GPIB0::23::INSTR')
+        start = time.monotonic()
+        replay_session.query('*IDN?')
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import time
+import unittest
+import pyvisa as visa
+from OxfordMagLab2000.General import Manager, Simulator
+from OxfordMagLab2000.OxfordCryostat import OxfordIPS, OxfordILM, OxfordITC
+from OxfordMagLab2000.KeythleyInstruments import Keithley2400, Keithley6517A
+from OxfordMagLab2000.SCPIInstruments import Lakeshore340
+
+class SimulatorTest(unittest.TestCase):
+    """
+    Tests of the simulated VISA backend and of the bring-up of all the drivers on the simulated rig.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(latency = 0.005, jitter = 0.001, seed = 0)
+
+    def tearDown(self):
+        self.backend.close()
+
+    def test_list_resources(self):
+        self.assertEqual(self.backend.list_resources(), ('GPIB0::12::INSTR', 'GPIB0::23::INSTR', 'GPIB0::24::INSTR', 'GPIB0::25::INSTR', 'GPIB0::27::INSTR', 'GPIB0::2::INSTR'))
+        self.assertEqual(self.backend.list_resources('GPIB0::2?*'), ('GPIB0::23::INSTR', 'GPIB0::24::INSTR', 'GPIB0::25::INSTR', 'GPIB0::27::INSTR', 'GPIB0::2::INSTR'))
+        self.assertEqual(self.backend.scans, 2)
+        with self.assertRaises(visa.errors.VisaIOError):
+            self.backend.open_resource('GPIB0::30::INSTR')
+
+    def test_rig_bring_up(self):
+        manager = Manager.Manager(backend = self.backend)
+        self.assertEqual(manager.resources, self.backend.list_resources())
+        IPS = OxfordIPS.OxfordIPS(manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_master = True)
+        ILM = OxfordILM.OxfordILM(manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_linked = True, ISOBUS_adress = 5)
+        ITC = OxfordITC.OxfordITC(manager, GPIB_adress = 'GPIB0::24::INSTR')
+        K2400 = Keithley2400.Keithley2400(manager, 'GPIB0::23::INSTR')
+        K6517A = Keithley6517A.Keithley6517A(manager, 'GPIB0::27::INSTR')
+        LS340 = Lakeshore340.Lakeshore340(manager, 'GPIB0::12::INSTR')
+        self.assertTrue(IPS.identity.startswith('IPS120-10'))
+        self.assertTrue(ILM.identity.startswith('ILM200'))
+        self.assertTrue(ITC.identity.startswith('ITC503'))
+        self.assertIn('MODEL 2400', K2400.identity)
+        self.assertIn('MODEL 6517A', K6517A.identity)
+        self.assertIn('MODEL340', LS340.identity)
+        self.assertEqual(ILM.channel_1_level, 75.5)
+        self.assertEqual(ITC.sensor_1_temperature, 300.)
+        sessions = {session.resource_name: session for session in self.backend.opened_resources}
+        self.assertEqual(len(sessions), len(self.backend.opened_resources))
+        self.assertEqual(sessions['GPIB0::23::INSTR'].command_count['*IDN?'], 1)
+        self.assertEqual(sessions['GPIB0::25::INSTR'].command_count['V'], 2)
+        for session in self.backend.opened_resources:
+            self.assertGreaterEqual(session.write_count, session.read_count)
+            self.assertGreater(session.bytes_read, 0)
+        for driver in (LS340, K6517A, K2400, ITC, ILM, IPS):
+            driver.close()
+
+    def test_ISOBUS_routing(self):
+        session = self.backend.open_resource('GPIB0::25::INSTR')
+        session.read_termination = '\r'
+        self.assertTrue(session.query('V').startswith('IPS120-10'))
+        self.assertTrue(session.query('@0V').startswith('IPS120-10'))
+        self.assertTrue(session.query('@5V').startswith('ILM200'))
+        self.assertEqual(session.query('@0Z'), '?Z')
+        self.assertEqual(session.command_count['V'], 3)
+
+    def test_SCPI_settings_and_errors(self):
+        session = self.backend.open_resource('GPIB0::23::INSTR')
+        session.read_termination = '\n'
+        session.write(':SOUR:VOLT:LEV 1.5')
+        self.assertEqual(session.query(':SOUR:VOLT:LEV?'), '1.5')
+        self.assertEqual(session.query(':SYST:ERR?'), '0,"No error"')
+        self.backend.devices['GPIB0::23::INSTR'][0].add_error('-222,"Data out of range"')
+        self.assertEqual(session.query('*OPC?;:SYST:ERR?'), '1;-222,"Data out of range"')
+
+    def test_latency_and_timeout(self):
+        backend = Simulator.SimulatedResourceManager(latency = 0.02, command_latencies = {'X': 0.1}, seed = 0)
+        session = backend.open_resource('GPIB0::24::INSTR')
+        start = time.time()
+        session.query('V')
+        self.assertGreaterEqual(time.time() - start, 0.02)
+        start = time.time()
+        session.query('X')
+        self.assertGreaterEqual(time.time() - start, 0.1)
+        session.timeout = 50
+        with self.assertRaises(visa.errors.VisaIOError):
+            session.read()
+        session.write('V')
+        session.clear()
+        with self.assertRaises(visa.errors.VisaIOError):
+            session.read()
+
+    def test_reproducible_noise(self):
+        readings = []
+        for i in range(2):
+            session = Simulator.SimulatedResourceManager(seed = 1).open_resource('GPIB0::12::INSTR')
+            readings.append([session.query('KRDG? A') for j in range(3)])
+        self.assertEqual(readings[0], readings[1])
+        self.assertEqual(len(set(readings[0])), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from OxfordMagLab2000.OxfordCryostat import OxfordILM, OxfordIPS, OxfordITC
+
+class ILMStatusTablesTest(unittest.TestCase):
+    """
+    Tests of the status decode tables of the ILM.
+    """
+    def test_decode_status(self):
+        text = OxfordILM.decode_status('X210S0C0800R00')
+        lines = text.splitlines()
+        self.assertEqual(lines[0], 'Channel 1 used for pulsed helium level metering. Channel 2 used for nitrogen level metering. Channel 3 not in use.')
+        self.assertIn('Helium probe in SLOW rate.', lines[1])
+        self.assertIn('FILLING.', lines[2])
+        self.assertIn('END FILLING.', lines[3])
+        self.assertNotIn('RELAY', text)
+        self.assertIn('RELAY 1 is active.', OxfordILM.decode_status('X210S0C0800R11'))
+        self.assertIn('In SHUT DOWN state.', OxfordILM.decode_status('X210S0C0800R11'))
+
+    def test_cached_decoding(self):
+        OxfordILM.decode_status.cache_clear()
+        first = OxfordILM.decode_status('X210S0C0800R00')
+        self.assertIs(OxfordILM.decode_status('X210S0C0800R00'), first)
+        self.assertEqual(OxfordILM.decode_status.cache_info().hits, 1)
+        self.assertIs(OxfordILM.decode_channel_status(1, 0x0C), OxfordILM.decode_channel_status(1, 0x0C))
+
+class StatusRecordTest(unittest.TestCase):
+    """
+    Tests of the status records of the IPS, the ILM and the ITC.
+    """
+    def test_fields(self):
+        IPS = OxfordIPS.IPSStatus.decode('X00A0C3H1M10P03')
+        self.assertEqual((IPS.activity, IPS.control, IPS.switch_heater, IPS.sweep_mode, IPS.sweeping), (0, 3, 1, 1, 0))
+        ITC = OxfordITC.ITCStatus.decode('X0A3C3S00H1L0')
+        self.assertEqual((ITC.auto_control, ITC.control, ITC.sweep_step, ITC.controlling_sensor, ITC.auto_PIDs), (3, 3, 0, 1, 0))
+        ILM = OxfordILM.ILMStatus.decode('X210S0C0800R00')
+        self.assertEqual((ILM.channel_modes, ILM.channel_statuses, ILM.relays), ((2, 1, 0), (0x0C, 0x08, 0), 0))
+        self.assertTrue(ILM.helium_channel(1))
+        self.assertTrue(ILM.slow_rate(1))
+        self.assertFalse(ILM.fast_rate(1))
+
+    def test_cache_and_immutability(self):
+        status = OxfordIPS.IPSStatus.decode('X00A0C3H1M10P03')
+        self.assertIs(OxfordIPS.IPSStatus.decode('X00A0C3H1M10P03'), status)
+        self.assertEqual(status, OxfordIPS.IPSStatus('X00A0C3H1M10P03', *OxfordIPS.IPSStatus._fields_('X00A0C3H1M10P03')))
+        self.assertNotEqual(status, OxfordIPS.IPSStatus.decode('X00A1C3H1M10P03'))
+        with self.assertRaises(AttributeError):
+            status.sweeping = 1
+        with self.assertRaises(AttributeError):
+            del status.raw
+
+    def test_text(self):
+        status = OxfordIPS.IPSStatus.decode('X00A0C3H1M10P03')
+        self.assertIn('Switch heater is ON.', status.text)
+        self.assertIs(str(status), status.text)
+        self.assertEqual(OxfordILM.ILMStatus.decode('X210S0C0800R00').text, OxfordILM.decode_status('X210S0C0800R00'))
+        self.assertIn('Temperature is controlled by CHANNEL 1 sensor.', OxfordITC.ITCStatus.decode('X0A3C3S00H1L0').text)
+
+    def test_changes(self):
+        previous = OxfordIPS.IPSStatus.decode('X00A0C3H1M10P03')
+        status = OxfordIPS.IPSStatus.decode('X00A1C3H1M11P03')
+        self.assertEqual(status.changes(previous), [('activity', 0, 1), ('sweeping', 0, 1)])
+        self.assertEqual(status.value_name('activity', 1), 'to set point')
+        self.assertEqual(status.value_name('control', 3), 3)
+        ILM = OxfordILM.ILMStatus.decode('X210S0C0800R00')
+        self.assertEqual(ILM.changes(OxfordILM.ILMStatus.decode('X210S0A1000R00')), [('channel_1_flags', 2, 4), ('channel_2_filling', 2, 1)])
+        self.assertEqual(ILM.value_name('channel_2_filling', 1), 'filling')
+
+if __name__ == '__main__':
+    unittest.main()
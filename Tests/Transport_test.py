@@ -0,0 +1,141 @@
+import threading
+import time
+import unittest
+import pyvisa as visa
+from OxfordMagLab2000.General import Errors, Manager, Simulator, Transport
+from OxfordMagLab2000.KeythleyInstruments import Keithley2400
+from OxfordMagLab2000.OxfordCryostat import OxfordIPS, OxfordILM
+
+class InstrumentationTest(unittest.TestCase):
+    """
+    Tests of the latency instrumentation of the sessions.
+    """
+    def setUp(self):
+        self.backend = Simulator.SimulatedResourceManager(command_latencies = {'*IDN?': 0.05}, seed = 0)
+        self.instrumentation = Transport.Instrumentation()
+        self.manager = Manager.Manager(backend = self.backend, instrumentation = self.instrumentation)
+
+    def test_command_mnemonic(self):
+        self.assertEqual(Transport.command_mnemonic('@5R1'), 'R1')
+        self.assertEqual(Transport.command_mnemonic('X'), 'X')
+        self.assertEqual(Transport.command_mnemonic('H1'), 'H')
+        self.assertEqual(Transport.command_mnemonic(':SOUR:VOLT 1.5;*OPC?'), ':SOUR:VOLT;*OPC?')
+        self.assertEqual(Transport.command_instrument('GPIB0::25::INSTR', '@5R1'), 'GPIB0::25::INSTR@5')
+        self.assertEqual(Transport.command_instrument('GPIB0::25::INSTR', 'R7'), 'GPIB0::25::INSTR')
+
+    def test_latency_histogram(self):
+        histogram = Transport.LatencyHistogram()
+        for latency in (0.001, 0.002, 0.003, 0.1):
+            histogram.add(latency)
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.mean(), 0.0265)
+        self.assertEqual((histogram.minimum, histogram.maximum), (0.001, 0.1))
+        self.assertLess(histogram.percentile(50), 0.003)
+        self.assertEqual(histogram.percentile(100), 0.1)
+        self.assertEqual(Transport.LatencyHistogram().percentile(50), None)
+
+    def test_records(self):
+        records = []
+        self.instrumentation.add_hook(records.append)
+        K2400 = Keithley2400.Keithley2400(self.manager, 'GPIB0::23::INSTR')
+        self.assertIsInstance(K2400.instrument, Transport.InstrumentedSession)
+        self.assertEqual(len(records), len(self.instrumentation.records))
+        identity = [record for record in records if record.mnemonic == '*IDN?']
+        self.assertEqual(len(identity), 1)
+        self.assertEqual(identity[0].adress, 'GPIB0::23::INSTR')
+        self.assertGreaterEqual(identity[0].wall_time, 0.05)
+        self.assertEqual(identity[0].bytes_received, len(K2400.identity))
+        self.assertEqual(self.instrumentation.summary()[0][:3], ('GPIB0::23::INSTR', '*IDN?', 1))
+        self.assertIn('*IDN?', self.instrumentation.report())
+        self.assertEqual(self.instrumentation.bytes_sent['GPIB0::23::INSTR'], sum(record.bytes_sent for record in records))
+        K2400.close()
+        self.instrumentation.reset()
+        self.assertEqual(self.instrumentation.summary(), [])
+
+    def test_ISOBUS_instruments(self):
+        IPS = OxfordIPS.OxfordIPS(self.manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_master = True)
+        ILM = OxfordILM.OxfordILM(self.manager, GPIB_adress = 'GPIB0::25::INSTR', ISOBUS_linked = True, ISOBUS_adress = 5)
+        ILM.get_channel_1_level_reading()
+        adresses = set(adress for (adress, mnemonic) in self.instrumentation.command_histograms)
+        self.assertEqual(adresses, {'GPIB0::25::INSTR@0', 'GPIB0::25::INSTR@5'})
+        self.assertIn(('GPIB0::25::INSTR@5', 'R1'), self.instrumentation.command_histograms)
+        ILM.close()
+        IPS.close()
+
+class SlowFirstReply(Simulator.SimulatedResourceManager):
+    """
+    Simulated backend whose instruments miss the deadline of the first command listed in slow_commands.
+    """
+    slow_commands = ()
+
+    def command_latency(self, command):
+        if command in self.slow_commands:
+            index = self.slow_commands.index(command)
+            self.slow_commands = self.slow_commands[:index] + self.slow_commands[index + 1:]
+            return 5.
+        return Simulator.SimulatedResourceManager.command_latency(self, command)
+
+class DeadlineTest(unittest.TestCase):
+    """
+    Tests of the deadline sessions, of their retries and of the watchdog.
+    """
+    def setUp(self):
+        self.backend = SlowFirstReply(seed = 0)
+        self.instrumentation = Transport.Instrumentation()
+        self.manager = Manager.Manager(backend = self.backend, instrumentation = self.instrumentation, default_deadline = 0.2, watchdog_interval = None)
+        self.session = self.manager.open_instrument('GPIB0::12::INSTR')
+        self.session.read_termination = '\r\n'
+
+    def test_is_read_only(self):
+        for message in ('R7', '@5R1', 'X', 'V', '*IDN?', ':FORM:ELEM?;*OPC?'):
+            self.assertTrue(Transport.is_read_only(message), message)
+        for message in ('H1', 'A1', 'I1.5', ':SOUR:VOLT 1.5;*OPC?', ':READ?;:SYST:TIME:RES', ''):
+            self.assertFalse(Transport.is_read_only(message), message)
+
+    def test_deadlines_are_opt_in(self):
+        manager = Manager.Manager(backend = Simulator.SimulatedResourceManager(seed = 0))
+        self.assertIsInstance(manager.open_instrument('GPIB0::12::INSTR'), Simulator.SimulatedResource)
+        self.assertEqual(manager.watchdog, None)
+        self.assertIsInstance(self.session, Transport.DeadlineSession)
+        self.assertEqual(self.session.deadline('KRDG? A'), 0.2)
+        self.assertEqual(self.session.deadline('*OPC?'), 30.)
+
+    def test_read_only_query_retried(self):
+        self.backend.slow_commands = ('KRDG? A',)
+        start = time.monotonic()
+        self.assertAlmostEqual(float(self.session.query('KRDG? A')), 4.2, delta = 0.01)
+        self.assertLess(time.monotonic() - start, 1.)
+        self.assertEqual(self.session.timeouts, 1)
+        self.assertEqual([record.retried for record in self.instrumentation.records if record.mnemonic == 'KRDG?'], [False, True])
+        self.assertAlmostEqual(float(self.session.query('KRDG? B')), 4.5, delta = 0.01)
+
+    def test_timeout_error(self):
+        self.backend.slow_commands = ('KRDG? A', 'KRDG? A')
+        with self.assertRaises(Errors.InstrumentTimeoutError):
+            self.session.query('KRDG? A')
+        self.assertEqual(self.session.timeouts, 2)
+        self.assertAlmostEqual(float(self.session.query('KRDG? A')), 4.2, delta = 0.01)
+
+    def test_setting_query_not_retried(self):
+        self.backend.slow_commands = ('INCRV A,21;*OPC?',)
+        with self.assertRaises(Errors.InstrumentTimeoutError):
+            self.session.query('INCRV A,21;*OPC?')
+        self.assertEqual(self.session.timeouts, 1)
+        self.assertEqual(self.backend.opened_resources[-1].command_count['INCRV'], 1)
+
+    def test_watchdog(self):
+        watchdog = Transport.Watchdog(check_interval = 0.05, grace = 0.05)
+        session = Simulator.SimulatedResourceManager(command_latencies = {'V': 5.}, seed = 0).open_resource('GPIB0::24::INSTR')
+        session.timeout = None
+        token = watchdog.watch(session, 'GPIB0::24::INSTR', 0.1)
+        session.write('V')
+        start = time.monotonic()
+        with self.assertRaises(visa.errors.VisaIOError):
+            session.read()
+        self.assertLess(time.monotonic() - start, 1.)
+        self.assertTrue(watchdog.release(token))
+        self.assertEqual(watchdog.clears['GPIB0::24::INSTR'], 1)
+        watchdog.stop()
+
+if __name__ == '__main__':
+    unittest.main()
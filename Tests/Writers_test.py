@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy
+from OxfordMagLab2000.General import Errors, Writers
+
+class WritersTest(unittest.TestCase):
+    """
+    Tests of the streaming data writers.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.folder = self.directory.name
+        self.readings = numpy.array([(1.5, -2e-6, 'A'), (2.5, 3e-6, 'B')], dtype = [('voltage', 'f8'), ('current', 'f8'), ('channel', 'U16')])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_legacy_text_file(self):
+        filename = os.path.join(self.folder, 'sample.txt')
+        with Writers.open_writer(filename, {'sample': 'S1', 'T': 300}) as writer:
+            self.assertIsInstance(writer, Writers.CSVWriter)
+            writer.write(self.readings)
+            writer.write(self.readings[:1])
+        with open(filename) as data_file:
+            self.assertEqual(data_file.read().splitlines(), ['+1.500000E+00,-2.000000E-06,A', '+2.500000E+00,+3.000000E-06,B', '+1.500000E+00,-2.000000E-06,A'])
+        with open(filename + '.json') as sidecar:
+            description = json.load(sidecar)
+        self.assertEqual(description['metadata'], {'sample': 'S1', 'T': 300})
+        self.assertEqual(description['rows'], 3)
+
+    def test_text_header(self):
+        filename = os.path.join(self.folder, 'sample.csv')
+        with Writers.open_writer(filename, {'sample': 'S1'}, header = True) as writer:
+            writer.write(self.readings[['voltage', 'current']])
+        self.assertFalse(os.path.exists(filename + '.json'))
+        with open(filename) as data_file:
+            self.assertEqual(data_file.read().splitlines()[:2], ['# sample = S1', '# voltage,current'])
+        numpy.testing.assert_array_equal(numpy.loadtxt(filename, delimiter = ','), [[1.5, -2e-6], [2.5, 3e-6]])
+
+    def test_binary_files(self):
+        for extension in ('.bin', '.npy', '.npz'):
+            filename = os.path.join(self.folder, 'sample' + extension)
+            with Writers.open_writer(filename, {'sample': 'S1'}) as writer:
+                writer.write(self.readings)
+                writer.flush()
+                writer.write(self.readings)
+            if extension == '.bin':
+                (readings, metadata) = Writers.read_binary(filename)
+                self.assertEqual(metadata, {'sample': 'S1'})
+            elif extension == '.npy':
+                readings = numpy.load(filename)
+            else:
+                with numpy.load(filename) as archive:
+                    readings = archive['readings']
+                    self.assertEqual(json.loads(str(archive['metadata'])), {'sample': 'S1'})
+            numpy.testing.assert_array_equal(readings, numpy.concatenate([self.readings, self.readings]))
+
+    def test_errors(self):
+        writer = Writers.open_writer(os.path.join(self.folder, 'sample.bin'))
+        writer.write(self.readings)
+        writer.write(self.readings[['voltage']])
+        with self.assertRaises(Errors.DataWriterError):
+            writer.flush()
+        with self.assertRaises(Errors.DataWriterError):
+            writer.write(self.readings)
+        with self.assertRaises(Errors.DataWriterError):
+            writer.close()
+        writer = Writers.open_writer(os.path.join(self.folder, 'missing', 'sample.txt'))
+        writer.write(self.readings)
+        with self.assertRaises(Errors.DataWriterError):
+            writer.close()
+
+    def test_abandoned_writer(self):
+        filename = os.path.join(self.folder, 'sample.txt')
+        script = ('import numpy\nfrom OxfordMagLab2000.General import Writers\n'
+                  'writer = Writers.open_writer({0!r}, flush_interval = 0.1)\nwriter.write(numpy.array([(1.,), (2.,)], dtype = [("voltage", "f8")]))\n').format(filename)
+        subprocess.run([sys.executable, '-c', script], cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__))), timeout = 30, check = True)
+        self.assertEqual(numpy.loadtxt(filename).tolist(), [1., 2.])
+        with open(filename + '.json') as sidecar:
+            self.assertEqual(json.load(sidecar)['rows'], 2)
+
+if __name__ == '__main__':
+    unittest.main()